@@ -0,0 +1,29 @@
+"""Contacts keyset index over coalesced last name
+
+Revision ID: 5e2b8c4a9f17
+Revises: d27a9c3e6f18
+Create Date: 2026-10-17 14:05:12.517342
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e2b8c4a9f17'
+down_revision: Union[str, None] = 'd27a9c3e6f18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.drop_index('ix_contacts_user_id_last_name_id', table_name='contacts')
+    op.create_index('ix_contacts_user_id_last_name_id', 'contacts',
+                    ['user_id', sa.text("coalesce(last_name, '')"), 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_contacts_user_id_last_name_id', table_name='contacts')
+    op.create_index('ix_contacts_user_id_last_name_id', 'contacts', ['user_id', 'last_name', 'id'], unique=False)
@@ -0,0 +1,33 @@
+"""Contacts birthday day of year
+
+Revision ID: d27a9c3e6f18
+Revises: 8b41d6e0c5f3
+Create Date: 2026-10-17 12:20:07.551630
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd27a9c3e6f18'
+down_revision: Union[str, None] = '8b41d6e0c5f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('contacts', sa.Column('birthday_doy', sa.SmallInteger(), nullable=True))
+    # Day of year on the leap-year calendar, see src.db.models.birthday_day_of_year
+    op.execute(
+        "UPDATE contacts SET birthday_doy = EXTRACT(DOY FROM make_date(2000, EXTRACT(MONTH FROM birthday)::int, "
+        "EXTRACT(DAY FROM birthday)::int)) WHERE birthday IS NOT NULL"
+    )
+    op.create_index('ix_contacts_user_id_birthday_doy', 'contacts', ['user_id', 'birthday_doy'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_contacts_user_id_birthday_doy', table_name='contacts')
+    op.drop_column('contacts', 'birthday_doy')
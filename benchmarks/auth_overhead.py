@@ -0,0 +1,87 @@
+"""
+Per-request authentication overhead of ``Auth.get_current_user``.
+
+Compares the legacy ``pickle`` of a live ORM ``User`` with the ``CachedUser`` JSON projection,
+both as raw (de)serialization cost and as full ``get_current_user`` calls on a cache hit, with
+and without the verified token claims cache. Redis is replaced by an in-process dict so only the CPU side is measured.
+
+Requires the usual application settings in the environment or ``.env``.
+
+Usage:
+    python benchmarks/auth_overhead.py --iterations 20000
+"""
+import argparse
+import asyncio
+import os
+import pickle
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.db.models import User  # noqa: E402
+from src.services.auth import Auth  # noqa: E402
+from src.services.token_cache import ClaimsCache  # noqa: E402
+from src.services.user_cache import CachedUser  # noqa: E402
+
+
+class DictRedis:
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = value
+
+
+def per_call_us(func, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+async def per_call_async_us(func, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        await func()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+async def run(iterations: int):
+    user = User(id=1, username="deadpool", email="deadpool@example.com", password="$2b$12$" + "x" * 53,
+                avatar="https://www.gravatar.com/avatar/00000000000000000000000000000000", confirmed=True,
+                created_at=datetime(2023, 9, 1, 12, 0), refresh_token="y" * 200)
+    legacy = pickle.dumps(user)
+    cached = CachedUser.from_user(user)
+    slim = cached.dumps()
+
+    print(f"payload size: pickle(User) {len(legacy)} B, CachedUser {len(slim)} B")
+    print(f"dumps:  pickle {per_call_us(lambda: pickle.dumps(user), iterations):7.2f} us, "
+          f"CachedUser {per_call_us(cached.dumps, iterations):7.2f} us")
+    print(f"loads:  pickle {per_call_us(lambda: pickle.loads(legacy), iterations):7.2f} us, "
+          f"CachedUser {per_call_us(lambda: CachedUser.loads(slim), iterations):7.2f} us")
+
+    auth = Auth()
+    auth.r = DictRedis()
+    auth.r.data[f"user:{user.email}"] = slim
+    token = await auth.create_access_token(data={"sub": user.email})
+    for label, claims in (("jwt.decode", ClaimsCache(0)), ("claims cache", ClaimsCache(1000))):
+        auth.claims = claims
+        elapsed = await per_call_async_us(lambda: auth.get_current_user(token, None), iterations)
+        print(f"get_current_user (user cache hit, {label:>12}): {elapsed:7.2f} us/request, "
+              f"{1e6 / elapsed:,.0f} requests/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+    asyncio.run(run(args.iterations))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Load benchmark for GET /api/contacts/.
+
+Fires ``--requests`` authenticated requests at a running server with ``--concurrency``
+requests in flight and prints the achieved requests/sec and latency percentiles.
+Run it once against the build before the change and once after to compare.
+The route's rate limit must be relaxed for the benchmark user (a tier in
+``RATE_LIMIT_USER_TIERS`` with a high ``read_contacts`` limit), otherwise most
+responses are 429 and the numbers measure the limiter instead of the database.
+
+Usage:
+    python benchmarks/contacts_load.py --url http://localhost:8000 --token <access_token>
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+async def worker(client: httpx.AsyncClient, path: str, queue: asyncio.Queue, latencies: list, errors: list):
+    while True:
+        try:
+            queue.get_nowait()
+        except asyncio.QueueEmpty:
+            return
+        started = time.perf_counter()
+        response = await client.get(path)
+        latencies.append(time.perf_counter() - started)
+        if response.status_code != 200:
+            errors.append(response.status_code)
+
+
+async def run(url: str, token: str, path: str, total: int, concurrency: int):
+    queue = asyncio.Queue()
+    for i in range(total):
+        queue.put_nowait(i)
+    latencies, errors = [], []
+    headers = {"Authorization": f"Bearer {token}"}
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, headers=headers, limits=limits) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client, path, queue, latencies, errors) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    print(f"requests:    {total} (concurrency {concurrency}, non-200: {len(errors)})")
+    print(f"throughput:  {total / elapsed:.1f} req/s")
+    print(f"latency p50: {statistics.median(latencies) * 1000:.1f} ms")
+    print(f"latency p95: {latencies[int(len(latencies) * 0.95) - 1] * 1000:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--token", required=True, help="Access token of an existing user")
+    parser.add_argument("--path", default="/api/contacts/?limit=10")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(run(args.url, args.token, args.path, args.requests, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
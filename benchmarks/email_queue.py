@@ -0,0 +1,82 @@
+"""
+Email delivery throughput against a local fake SMTP server.
+
+Compares one SMTP connection per message (what ``FastMail.send_message`` does) with the
+background ``EmailQueue`` worker that reuses one connection and sends in batches. Both render
+the same template; no TLS is involved, so real-world handshake savings are larger. The small
+reset template is the default so that transport cost, not rendering, dominates.
+
+Requires the usual application settings in the environment or ``.env``.
+
+Usage:
+    python benchmarks/email_queue.py --messages 2000 --batch-size 50
+    python benchmarks/email_queue.py --template confirm
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import aiosmtplib
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.services.email_queue import EmailJob, EmailQueue  # noqa: E402
+from tests.fake_smtp import FakeSMTPServer, confirm_job, smtp_config  # noqa: E402
+
+TEMPLATES = {
+    "confirm": confirm_job,
+    "reset": lambda recipient: EmailJob(recipient=recipient, subject="Password Reset",
+                                       template_name="reset_password/password_reset_email.html",
+                                       template_body={"host": "http://localhost/", "username": "deadpool",
+                                                      "token": "token"}),
+}
+
+
+async def per_message_connection(queue: EmailQueue, jobs: list[EmailJob], port: int) -> float:
+    started = time.perf_counter()
+    for job in jobs:
+        await aiosmtplib.send(queue.render(job), hostname="127.0.0.1", port=port)
+    return time.perf_counter() - started
+
+
+async def queued(queue: EmailQueue, jobs: list[EmailJob]) -> float:
+    started = time.perf_counter()
+    for job in jobs:
+        queue.enqueue(job)
+    enqueued = time.perf_counter() - started
+    await queue.queue.join()
+    print(f"  enqueue cost: {enqueued / len(jobs) * 1e6:.1f} us/message")
+    return time.perf_counter() - started
+
+
+async def run(messages: int, batch_size: int, template: str):
+    server = FakeSMTPServer()
+    await server.start()
+    queue = EmailQueue(smtp_config(server.port), maxsize=messages, batch_size=batch_size, max_attempts=3,
+                       retry_backoff=1, idle_timeout=30, dead_letter_size=100)
+    jobs = [TEMPLATES[template](f"user{i}@example.com") for i in range(messages)]
+
+    elapsed = await per_message_connection(queue, jobs, server.port)
+    print(f"connection per message: {messages / elapsed:8.0f} messages/s ({server.connections} connections)")
+
+    server.connections = 0
+    await queue.start()
+    elapsed = await queued(queue, jobs)
+    print(f"queue, batch of {batch_size:<4}:   {messages / elapsed:8.0f} messages/s ({server.connections} connections)")
+    await queue.stop()
+    await server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--template", choices=TEMPLATES, default="reset")
+    args = parser.parse_args()
+    asyncio.run(run(args.messages, args.batch_size, args.template))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Email template rendering throughput.
+
+Compares the fastapi-mail path (a fresh ``Environment`` from ``ConnectionConfig.template_engine``
+per message, which parses and compiles the template every time) with ``email_templates.render``
+on the shared, precompiled environment, and reports the cost of building the full MIME message
+on top of the shared render.
+
+Requires the usual application settings in the environment or ``.env``.
+
+Usage:
+    python benchmarks/email_render.py --iterations 2000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.services.email import conf, email_queue  # noqa: E402
+from src.services.email_queue import EmailJob  # noqa: E402
+from src.services.email_templates import compile_templates, render  # noqa: E402
+
+TEMPLATES = ("registration/confirm.html", "reset_password/password_reset_email.html")
+
+
+def per_second(func, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return iterations / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    compiled = compile_templates()
+    print(f"compile_templates: {compiled} templates in {(time.perf_counter() - started) * 1e3:.1f} ms")
+
+    context = {"host": "http://localhost:8000/", "username": "deadpool", "token": "x" * 160}
+    for name in TEMPLATES:
+        legacy = per_second(lambda: conf.template_engine().get_template(name).render(**context),
+                            max(args.iterations // 20, 10))
+        shared = per_second(lambda: render(name, **context), args.iterations)
+        job = EmailJob(recipient="deadpool@example.com", subject="Subject", template_name=name, template_body=context)
+        message = per_second(lambda: email_queue.render(job), args.iterations)
+        print(f"{name:<42} fresh environment {legacy:9,.0f}/s, shared {shared:9,.0f}/s, "
+              f"MIME message {message:9,.0f}/s")
+
+
+if __name__ == "__main__":
+    main()
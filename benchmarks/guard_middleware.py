@@ -0,0 +1,118 @@
+"""
+Per-request overhead of the IP and user-agent guard on a trivial endpoint.
+
+Drives ``GET /ping`` of a bare FastAPI app straight through its ASGI interface, without a server
+or network, in three configurations: no guard, the previous three ``app.middleware("http")``
+functions, and the single pure-ASGI :class:`GuardMiddleware`. All of them check against the same
+compiled ban list snapshot, so the difference is the middleware machinery itself.
+
+Requires the usual application settings in the environment or ``.env``.
+
+Usage:
+    python benchmarks/guard_middleware.py --iterations 20000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+from fastapi import FastAPI, Request, status
+from fastapi.responses import JSONResponse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.middlewares.ban_lists import ban_lists  # noqa: E402
+from src.middlewares.middlewares import GuardMiddleware  # noqa: E402
+
+SCOPE = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+         "path": "/ping", "raw_path": b"/ping", "root_path": "", "query_string": b"",
+         "headers": [(b"host", b"localhost"), (b"user-agent", b"Mozilla/5.0 (X11; Linux x86_64) Firefox/118.0")],
+         "client": ("127.0.0.1", 51000), "server": ("127.0.0.1", 8000)}
+
+
+def trivial_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {"pong": True}
+
+    return app
+
+
+def legacy_app() -> FastAPI:
+    app = trivial_app()
+
+    async def ban_ips_middleware(request: Request, call_next):
+        if ban_lists.current.ip_filter.is_banned(request.client.host):
+            return JSONResponse(status_code=status.HTTP_403_FORBIDDEN, content={"detail": "You are banned"})
+        return await call_next(request)
+
+    async def limit_access_by_ip(request: Request, call_next):
+        if not ban_lists.current.ip_filter.is_allowed(request.client.host):
+            return JSONResponse(status_code=status.HTTP_403_FORBIDDEN, content={"detail": "Not allowed IP address"})
+        return await call_next(request)
+
+    async def user_agent_ban_middleware(request: Request, call_next):
+        if ban_lists.current.user_agents.is_banned(request.headers.get("user-agent")):
+            return JSONResponse(status_code=status.HTTP_403_FORBIDDEN, content={"detail": "You are banned"})
+        return await call_next(request)
+
+    app.middleware("http")(ban_ips_middleware)
+    app.middleware("http")(limit_access_by_ip)
+    app.middleware("http")(user_agent_ban_middleware)
+    return app
+
+
+def guard_app() -> FastAPI:
+    app = trivial_app()
+    app.add_middleware(GuardMiddleware)
+    return app
+
+
+def receiver():
+    messages = iter([{"type": "http.request", "body": b"", "more_body": False}])
+
+    async def receive():
+        message = next(messages, None)
+        if message is None:
+            # Like a server, block after the body until the client goes away, which here it never does.
+            await asyncio.Event().wait()
+        return message
+
+    return receive
+
+
+async def per_request_us(app: FastAPI, iterations: int) -> float:
+    statuses = []
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            statuses.append(message["status"])
+
+    await app(dict(SCOPE), receiver(), send)
+    assert statuses == [200], statuses
+    started = time.perf_counter()
+    for _ in range(iterations):
+        await app(dict(SCOPE), receiver(), send)
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+async def run(iterations: int):
+    baseline = await per_request_us(trivial_app(), iterations)
+    print(f"{'no guard':>28}: {baseline:7.1f} us/request")
+    for label, app in (("3 x app.middleware('http')", legacy_app()), ("GuardMiddleware (ASGI)", guard_app())):
+        elapsed = await per_request_us(app, iterations)
+        print(f"{label:>28}: {elapsed:7.1f} us/request, {elapsed - baseline:+7.1f} us overhead")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+    asyncio.run(run(args.iterations))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Per-request cost of the IP allow/deny check.
+
+Builds ``--rules`` random IPv4 networks (a mix of single addresses and /16-/30 blocks) and
+compares the legacy check, ``ip_address(host)`` followed by a scan of a list of addresses, with a
+lookup in the compiled :class:`IPRangeSet`. The legacy list only holds the single addresses, as it
+cannot express CIDR blocks, and is scanned for ``--legacy-iterations`` lookups only.
+
+Requires the usual application settings in the environment or ``.env``.
+
+Usage:
+    python benchmarks/ip_filter.py --rules 100000 --iterations 200000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from ipaddress import IPv4Address, IPv4Network, ip_address
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.middlewares.ip_ranges import IPRangeSet  # noqa: E402
+
+
+def random_rules(count: int, rng: random.Random) -> list[str]:
+    rules = []
+    for _ in range(count):
+        prefix = rng.choice((32, 32, 32, 30, 28, 24, 16))
+        rules.append(str(IPv4Network((rng.getrandbits(32), prefix), strict=False)))
+    return rules
+
+
+def per_call_us(check, hosts: list[str], iterations: int) -> float:
+    started = time.perf_counter()
+    for i in range(iterations):
+        check(hosts[i % len(hosts)])
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rules", type=int, default=100000)
+    parser.add_argument("--iterations", type=int, default=200000)
+    parser.add_argument("--legacy-iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    rules = random_rules(args.rules, rng)
+    hosts = [str(IPv4Address(rng.getrandbits(32))) for _ in range(1000)]
+
+    started = time.perf_counter()
+    compiled = IPRangeSet(rules)
+    print(f"compiled {compiled.rules} rules into {len(compiled)} intervals in "
+          f"{time.perf_counter() - started:.2f} s")
+
+    legacy = [ip_address(rule.split("/")[0]) for rule in rules if rule.endswith("/32")]
+    legacy_us = per_call_us(lambda host: ip_address(host) in legacy, hosts, args.legacy_iterations)
+    compiled_us = per_call_us(compiled.__contains__, hosts, args.iterations)
+    print(f"list scan ({len(legacy)} addresses): {legacy_us:10.2f} us/request")
+    print(f"IPRangeSet ({args.rules} rules):     {compiled_us:10.2f} us/request, "
+          f"{legacy_us / compiled_us:,.0f}x faster")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Login CPU cost per password hashing setting.
+
+For each scheme and cost, times ``CryptContext.verify`` (the work done by a login) and
+``CryptContext.hash`` (signup, or a login that upgrades an outdated hash) on one thread, and
+reports the resulting logins per second per core. argon2 settings are skipped when
+``argon2-cffi`` is not installed.
+
+Requires the usual application settings in the environment or ``.env``.
+
+Usage:
+    python benchmarks/password_hashing.py --iterations 20
+    python benchmarks/password_hashing.py --bcrypt-rounds 10 11 12 13 --argon2 2:19456 3:65536
+"""
+import argparse
+import os
+import sys
+import time
+
+from passlib.exc import MissingBackendError
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.services.hashing import password_context  # noqa: E402
+
+
+def per_call_ms(func, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - started) / iterations * 1e3
+
+
+def report(label: str, context, iterations: int):
+    try:
+        hashed = context.hash("correct horse battery staple")
+    except MissingBackendError:
+        print(f"{label:<28} skipped (backend not installed)")
+        return
+    verify = per_call_ms(lambda: context.verify("correct horse battery staple", hashed), iterations)
+    rehash = per_call_ms(lambda: context.hash("correct horse battery staple"), iterations)
+    print(f"{label:<28} verify {verify:8.2f} ms, hash {rehash:8.2f} ms, {1e3 / verify:8.1f} logins/s/core")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--bcrypt-rounds", type=int, nargs="*", default=[10, 11, 12, 13])
+    parser.add_argument("--argon2", nargs="*", default=["2:19456", "3:65536"],
+                        help="time_cost:memory_cost_kib pairs")
+    args = parser.parse_args()
+
+    for rounds in args.bcrypt_rounds:
+        report(f"bcrypt rounds={rounds}", password_context("bcrypt", bcrypt_rounds=rounds), args.iterations)
+    for pair in args.argon2:
+        time_cost, memory_cost = map(int, pair.split(":"))
+        report(f"argon2 t={time_cost} m={memory_cost}KiB",
+               password_context("argon2", argon2_time_cost=time_cost, argon2_memory_cost=memory_cost),
+               args.iterations)
+
+
+if __name__ == "__main__":
+    main()
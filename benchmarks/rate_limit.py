@@ -0,0 +1,81 @@
+"""
+Per-request cost and Redis round trips of the contacts rate limiter.
+
+``--users`` users send ``--requests`` requests in total to one route whose limit never trips.
+Redis is replaced by an in-process bucket store that sleeps ``--rtt-ms`` per round trip, and
+the :class:`RateLimitEngine` is compared with checking the shared bucket on every request, as
+fastapi-limiter did with its Lua script.
+
+Requires the usual application settings in the environment or ``.env``.
+
+Usage:
+    python benchmarks/rate_limit.py --users 100 --requests 20000 --rtt-ms 0.5
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from unittest.mock import MagicMock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.services.rate_limit import RateLimitEngine  # noqa: E402
+from src.services.user_cache import CachedUser  # noqa: E402
+
+
+class SlowBuckets:
+    def __init__(self, rtt: float):
+        self.rtt = rtt
+        self.tokens = {}
+        self.round_trips = 0
+
+    async def settle(self, entries):
+        self.round_trips += 1
+        await asyncio.sleep(self.rtt)
+        balances = []
+        for key, capacity, _, consumed in entries:
+            self.tokens[key] = self.tokens.get(key, capacity) - consumed
+            balances.append(self.tokens[key])
+        return balances
+
+
+async def run(users: int, requests: int, rtt: float):
+    people = [CachedUser(id=i, username=None, email=f"user{i}@example.com", avatar=None, confirmed=True,
+                         created_at=None) for i in range(users)]
+    limit = requests * 10
+
+    remote = SlowBuckets(rtt)
+    started = time.perf_counter()
+    for i in range(requests):
+        await remote.settle([(f"rate-limit:read_contacts:{people[i % users].id}", limit, limit / 60, 1)])
+    per_request = (time.perf_counter() - started) / requests * 1e6
+    print(f"round trip per request: {per_request:8.2f} us/request, {remote.round_trips} round trips")
+
+    remote = SlowBuckets(rtt)
+    limiter = RateLimitEngine(MagicMock(), {"default": {"*": limit}}, {}, window=60, sync_interval=0.05,
+                              sync_batch=50, maxsize=100000)
+    limiter._settle_remote = remote.settle
+    await limiter.start()
+    started = time.perf_counter()
+    for i in range(requests):
+        await limiter.hit("read_contacts", people[i % users])
+        if i % 100 == 0:
+            await asyncio.sleep(0)
+    per_request = (time.perf_counter() - started) / requests * 1e6
+    await limiter.stop()
+    print(f"local token buckets:    {per_request:8.2f} us/request, {remote.round_trips} round trips, "
+          f"{limiter.metrics.settled_buckets} buckets settled")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--rtt-ms", type=float, default=0.5)
+    args = parser.parse_args()
+    asyncio.run(run(args.users, args.requests, args.rtt_ms / 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Per-request cost of the user-agent ban check.
+
+Compares the legacy loop calling ``re.search`` once per banned pattern with
+:class:`UserAgentMatcher`, both as a single combined expression and with its verdict cache, for
+``--patterns`` literal bot names matched against a mix of browser and bot user agents.
+
+Requires the usual application settings in the environment or ``.env``.
+
+Usage:
+    python benchmarks/user_agents.py --patterns 500 --iterations 20000
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.middlewares.user_agents import UserAgentMatcher  # noqa: E402
+
+USER_AGENTS = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/118.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 14_0) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.0 Safari/605.1.15",
+    "Mozilla/5.0 (X11; Linux x86_64; rv:118.0) Gecko/20100101 Firefox/118.0",
+    "okhttp/4.11.0",
+    "python-requests/2.31.0",
+]
+
+
+def per_call_us(check, iterations: int) -> float:
+    started = time.perf_counter()
+    for i in range(iterations):
+        check(USER_AGENTS[i % len(USER_AGENTS)])
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--patterns", type=int, default=500)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    patterns = [f"BadBot{i}/" for i in range(args.patterns)]
+
+    def legacy(user_agent):
+        for pattern in patterns:
+            if re.search(pattern, user_agent):
+                return True
+        return False
+
+    uncached = UserAgentMatcher(patterns, cache_size=0)
+    cached = UserAgentMatcher(patterns, cache_size=10000)
+    for label, check in (("re.search loop", legacy), ("combined regex", uncached.is_banned),
+                         ("combined regex + cache", cached.is_banned)):
+        print(f"{label:>24}: {per_call_us(check, args.iterations):9.2f} us/request")
+
+
+if __name__ == "__main__":
+    main()
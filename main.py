@@ -8,10 +8,17 @@ Attributes:
 """
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-
-from src.middlewares.middlewares import startup_event, ban_ips_middleware, limit_access_by_ip, \
-    user_agent_ban_middleware
-from src.routes import contacts, auth, users
+from fastapi.staticfiles import StaticFiles
+
+from src.middlewares.ban_lists import ban_lists
+from src.middlewares.middlewares import GuardMiddleware
+from src.conf.config import settings
+from src.routes import contacts, auth, users, metrics
+from src.services.email import email_queue
+from src.services.email_templates import compile_templates
+from src.services.hashing import password_hasher
+from src.services.rate_limit import rate_limiter
+from src.services.user_cache import start_invalidation_listener, stop_invalidation_listener
 
 origins = ["https://localhost:3000"]
 
@@ -20,8 +27,22 @@ app = FastAPI()
 app.include_router(auth.router, prefix='/api')
 app.include_router(contacts.router, prefix="/api")
 app.include_router(users.router, prefix="/api")
-
-app.add_event_handler("startup", startup_event)
+app.include_router(metrics.router, prefix="/api")
+
+if settings.avatar_storage == "local":
+    app.mount(settings.avatar_base_url, StaticFiles(directory=settings.avatar_local_dir, check_dir=False),
+              name="avatars")
+
+app.add_event_handler("startup", start_invalidation_listener)
+app.add_event_handler("startup", compile_templates)
+app.add_event_handler("startup", email_queue.start)
+app.add_event_handler("startup", ban_lists.start)
+app.add_event_handler("startup", rate_limiter.start)
+app.add_event_handler("shutdown", stop_invalidation_listener)
+app.add_event_handler("shutdown", password_hasher.shutdown)
+app.add_event_handler("shutdown", email_queue.stop)
+app.add_event_handler("shutdown", ban_lists.stop)
+app.add_event_handler("shutdown", rate_limiter.stop)
 
 app.add_middleware(
     CORSMiddleware,
@@ -29,9 +50,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
-app.middleware("http")(ban_ips_middleware)
-app.middleware("http")(limit_access_by_ip)
-app.middleware("http")(user_agent_ban_middleware)
+app.add_middleware(GuardMiddleware, paths=settings.guard_paths)
 
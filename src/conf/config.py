@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -7,18 +9,65 @@ class Settings(BaseSettings):
     postgres_name: str
     postgres_domain: str
     postgres_port: int
-    secret_key: str
-    algorithm: str
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    contacts_import_chunk_size: int = 1000
+    secret_key: str | None = None
+    algorithm: str = 'HS256'
+    jwt_keys_dir: str | None = None
+    jwt_active_kid: str | None = None
+    password_scheme: Literal['bcrypt', 'argon2'] = 'bcrypt'
+    password_bcrypt_rounds: int = 12
+    password_argon2_time_cost: int = 2
+    password_argon2_memory_cost: int = 19456
+    password_argon2_parallelism: int = 1
+    password_hash_workers: int = 4
+    password_hash_queue_limit: int = 64
     mail_username: str
     mail_password: str
     mail_from: str
     mail_port: int
     mail_server: str
+    email_queue_size: int = 10000
+    email_batch_size: int = 50
+    email_max_attempts: int = 5
+    email_retry_backoff: float = 2
+    email_idle_timeout: float = 30
+    email_dead_letter_size: int = 1000
+    email_template_cache_dir: str | None = None
     redis_host: str = 'localhost'
     redis_port: int = 6379
+    user_cache_local_size: int = 10000
+    user_cache_local_ttl: float = 60
+    token_cache_size: int = 10000
+    ip_allow_list: list[str] = ['127.0.0.1', '192.168.1.1']
+    ip_deny_list: list[str] = []
+    ip_allow_file: str | None = None
+    ip_deny_file: str | None = None
+    user_agent_ban_list: list[str] = []
+    user_agent_cache_size: int = 10000
+    ban_list_poll_interval: float = 2
+    guard_paths: dict[str, list[Literal['deny_ip', 'allow_ip', 'user_agent']]] = {}
+    rate_limit_window: float = 60
+    rate_limits: dict[str, dict[str, int]] = {
+        'default': {'create_contact': 5, 'import_contacts': 2, 'export_contacts': 2, '*': 10},
+    }
+    rate_limit_user_tiers: dict[str, str] = {}
+    rate_limit_sync_interval: float = 1
+    rate_limit_sync_batch: int = 5
+    rate_limit_local_size: int = 100000
+    metrics_token: str | None = None
     cloudinary_name: str
     cloudinary_api_key: str
     cloudinary_api_secret: str
+    avatar_storage: Literal['cloudinary', 'local'] = 'cloudinary'
+    avatar_local_dir: str = 'media/avatars'
+    avatar_base_url: str = '/media/avatars'
+    avatar_resize: bool = True
+    avatar_max_bytes: int = 5 * 1024 * 1024
 
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8",case_sensitive=False)
 
@@ -1,13 +1,27 @@
-from sqlalchemy.orm import sessionmaker, relationship
-from sqlalchemy import Column, Integer, String, TIMESTAMP, func, DateTime, ForeignKey, Boolean
-from sqlalchemy.ext.declarative import declarative_base
+from datetime import date
 
-from src.db.db_connect import engine
+from sqlalchemy.orm import relationship, validates
+from sqlalchemy import Column, Integer, SmallInteger, String, TIMESTAMP, func, DateTime, ForeignKey, Boolean, Index
+from sqlalchemy.ext.declarative import declarative_base
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 
+def birthday_day_of_year(value: date) -> int:
+    """
+        Day of the year of a birthday on the leap-year calendar (Feb 29 is always 60).
+
+        Using a fixed leap year keeps every month/day on the same number regardless of the
+        year, so birthdays can be compared and indexed independently of the birth year.
+
+        :param value: The birthday (date or datetime).
+        :type value: date
+        :return: Day of the year in range 1..366.
+        :rtype: int
+    """
+    return date(2000, value.month, value.day).timetuple().tm_yday
+
+
 class Contact(Base):
     __tablename__ = 'contacts'
 
@@ -17,9 +31,26 @@ class Contact(Base):
     email = Column(String, index=True)
     phone_number = Column(String, unique=True, index=True)
     birthday = Column(TIMESTAMP)
+    birthday_doy = Column(SmallInteger, nullable=True)
     user_id = Column('user_id', ForeignKey('users.id', ondelete='CASCADE'), default=None)
     user = relationship('User', backref="contacts")
 
+    __table_args__ = (
+        Index('ix_contacts_user_id_last_name_id', user_id, func.coalesce(last_name, ''), id),
+        Index('ix_contacts_user_id_birthday_doy', 'user_id', 'birthday_doy'),
+        Index('ix_contacts_first_name_trgm', 'first_name', postgresql_using='gin',
+              postgresql_ops={'first_name': 'gin_trgm_ops'}),
+        Index('ix_contacts_last_name_trgm', 'last_name', postgresql_using='gin',
+              postgresql_ops={'last_name': 'gin_trgm_ops'}),
+        Index('ix_contacts_email_trgm', 'email', postgresql_using='gin',
+              postgresql_ops={'email': 'gin_trgm_ops'}),
+    )
+
+    @validates('birthday')
+    def sync_birthday_doy(self, key, value):
+        self.birthday_doy = birthday_day_of_year(value) if value is not None else None
+        return value
+
 
 class User(Base):
     __tablename__ = "users"
@@ -30,5 +61,6 @@ class User(Base):
     password = Column(String(255), nullable=False)
     created_at = Column('crated_at', DateTime, default=func.now())
     avatar = Column(String(255), nullable=True)
+    # Unused since refresh tokens moved to Redis (src/services/refresh_tokens.py); kept for rollback.
     refresh_token = Column(String(255), nullable=True)
     confirmed = Column(Boolean, default=False)
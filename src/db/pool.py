@@ -0,0 +1,68 @@
+import time
+from dataclasses import dataclass
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+
+@dataclass
+class PoolMetrics:
+    """
+    Cumulative connection checkout counters shared by every :class:`MeteredQueuePool`.
+
+    Attributes:
+        checkouts (int): Number of successful connection checkouts.
+        timeouts (int): Number of checkouts that gave up after ``pool_timeout``.
+        wait_seconds_total (float): Total time spent waiting for a connection.
+        wait_seconds_max (float): Longest single wait for a connection.
+    """
+    checkouts: int = 0
+    timeouts: int = 0
+    wait_seconds_total: float = 0.0
+    wait_seconds_max: float = 0.0
+
+    def observe(self, waited: float):
+        self.checkouts += 1
+        self.wait_seconds_total += waited
+        if waited > self.wait_seconds_max:
+            self.wait_seconds_max = waited
+
+
+pool_metrics = PoolMetrics()
+
+
+class MeteredQueuePool(AsyncAdaptedQueuePool):
+    """
+    Async queue pool that records how long each checkout waited for a free connection.
+    """
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            pool_metrics.timeouts += 1
+            raise
+        pool_metrics.observe(time.perf_counter() - started)
+        return connection
+
+
+def pool_status(pool) -> dict:
+    """
+        Snapshot of the pool occupancy together with the cumulative checkout counters.
+
+        :param pool: The engine connection pool.
+        :type pool: MeteredQueuePool
+        :return: Pool size, checked-out, idle and overflow connections and wait statistics.
+        :rtype: dict
+    """
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "idle": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "checkouts": pool_metrics.checkouts,
+        "timeouts": pool_metrics.timeouts,
+        "wait_seconds_total": pool_metrics.wait_seconds_total,
+        "wait_seconds_max": pool_metrics.wait_seconds_max,
+    }
@@ -0,0 +1,201 @@
+import asyncio
+import logging
+import re
+import sys
+from dataclasses import dataclass
+from ipaddress import ip_network
+
+import redis.asyncio as redis
+from starlette.concurrency import run_in_threadpool
+
+from src.conf.config import settings
+from src.middlewares.ip_ranges import IPFilter
+from src.middlewares.user_agents import UserAgentMatcher
+
+logger = logging.getLogger(__name__)
+
+KINDS = ("allow", "deny", "user-agent")
+VERSION_KEY = "ban-lists:version"
+
+
+@dataclass(frozen=True, slots=True)
+class BanSnapshot:
+    """
+    One compiled, immutable generation of the ban lists.
+
+    The middlewares read ``ban_lists.current`` once per request, so a reload that swaps in a new
+    snapshot is atomic: a request sees either the old lists or the new ones, never a mix.
+
+    Attributes:
+        version (int | None): The Redis version the snapshot was built from; None before the first load.
+        ip_filter (IPFilter): The compiled allow and deny lists.
+        user_agents (UserAgentMatcher): The compiled banned user-agent patterns.
+    """
+
+    version: int | None
+    ip_filter: IPFilter
+    user_agents: UserAgentMatcher
+
+
+class BanLists:
+    """
+    IP and user-agent ban lists shared by every worker through Redis.
+
+    The lists configured in settings and feed files are the static base; entries added at run
+    time live in one Redis set per kind next to a version counter that every change increments.
+    Each worker polls the counter every ``poll_interval`` seconds and, when it moved, loads the
+    sets, compiles them off the event loop and swaps the new :class:`BanSnapshot` in. Requests
+    never touch Redis.
+
+    Attributes:
+        r (redis.Redis): The Redis client holding the shared lists.
+        poll_interval (float): Seconds between version checks.
+        current (BanSnapshot): The snapshot the middlewares check requests against.
+        reloads (int): Snapshots compiled from Redis.
+        failures (int): Version checks or reloads that failed.
+    """
+
+    def __init__(self, r: redis.Redis, poll_interval: float):
+        self.r = r
+        self.poll_interval = poll_interval
+        self.current = self.compile(None, [], [], [])
+        self.reloads = self.failures = 0
+        self._watcher: asyncio.Task | None = None
+
+    @staticmethod
+    def key(kind: str) -> str:
+        if kind not in KINDS:
+            raise ValueError(f"Unknown ban list {kind!r}, expected one of {', '.join(KINDS)}")
+        return f"ban-lists:{kind}"
+
+    @staticmethod
+    def compile(version: int | None, allow: list[str], deny: list[str], user_agents: list[str]) -> BanSnapshot:
+        """
+        Compile the static lists from settings together with the entries from Redis. Blocking.
+
+        Args:
+            version (int | None): The version of the Redis entries.
+            allow (list[str]): Allowed addresses or networks from Redis.
+            deny (list[str]): Banned addresses or networks from Redis.
+            user_agents (list[str]): Banned user-agent patterns from Redis.
+
+        Returns:
+            BanSnapshot: The compiled snapshot.
+        """
+        ip_filter = IPFilter.load(allow=settings.ip_allow_list + sorted(allow),
+                                  deny=settings.ip_deny_list + sorted(deny))
+        user_agents = UserAgentMatcher(settings.user_agent_ban_list + sorted(user_agents), settings.user_agent_cache_size)
+        return BanSnapshot(version, ip_filter, user_agents)
+
+    async def add(self, kind: str, *entries: str) -> int:
+        """
+        Add entries to a shared list; every worker picks them up within ``poll_interval`` seconds
+
+        Args:
+            kind (str): ``allow``, ``deny`` or ``user-agent``.
+            entries (str): Addresses or CIDR blocks, or user-agent regular expressions.
+
+        Returns:
+            int: The new version of the lists.
+
+        Raises:
+            ValueError: If the kind is unknown or an entry is not a valid network or pattern.
+        """
+        return await self._change("sadd", kind, entries)
+
+    async def remove(self, kind: str, *entries: str) -> int:
+        """
+        Remove entries from a shared list
+
+        Args:
+            kind (str): ``allow``, ``deny`` or ``user-agent``.
+            entries (str): The entries to remove, as they were added.
+
+        Returns:
+            int: The new version of the lists.
+        """
+        return await self._change("srem", kind, entries)
+
+    async def _change(self, command: str, kind: str, entries: tuple[str, ...]) -> int:
+        key = self.key(kind)
+        for entry in entries:
+            if kind == "user-agent":
+                try:
+                    re.compile(entry)
+                except re.error as e:
+                    raise ValueError(f"Invalid user-agent pattern {entry!r}: {e}") from None
+            else:
+                ip_network(entry, strict=False)
+        async with self.r.pipeline(transaction=True) as pipe:
+            getattr(pipe, command)(key, *entries)
+            pipe.incr(VERSION_KEY)
+            _, version = await pipe.execute()
+        return version
+
+    async def refresh(self) -> bool:
+        """
+        Reload the lists if their version in Redis changed since the current snapshot
+
+        Returns:
+            bool: Whether a new snapshot was swapped in.
+        """
+        version = int(await self.r.get(VERSION_KEY) or 0)
+        if version == self.current.version:
+            return False
+        async with self.r.pipeline(transaction=True) as pipe:
+            pipe.get(VERSION_KEY)
+            for kind in KINDS:
+                pipe.smembers(self.key(kind))
+            version, allow, deny, user_agents = await pipe.execute()
+        snapshot = await run_in_threadpool(self.compile, int(version or 0), list(allow), list(deny), list(user_agents))
+        self.current = snapshot
+        self.reloads += 1
+        return True
+
+    async def watch(self) -> None:
+        """
+        Worker loop: check the version every ``poll_interval`` seconds, keeping the last good snapshot on errors
+        """
+        while True:
+            try:
+                await self.refresh()
+            except (redis.RedisError, OSError, ValueError) as e:
+                # OSError covers an unreadable feed file, e.g. one being replaced.
+                self.failures += 1
+                logger.warning("Ban list reload failed: %s", e)
+            except Exception:
+                self.failures += 1
+                logger.exception("Ban list reload failed")
+            await asyncio.sleep(self.poll_interval)
+
+    async def start(self) -> None:
+        self._watcher = asyncio.create_task(self.watch())
+
+    async def stop(self) -> None:
+        if self._watcher is not None:
+            self._watcher.cancel()
+            self._watcher = None
+
+    def stats(self) -> dict:
+        snapshot = self.current
+        user_agents = snapshot.user_agents.stats()
+        return {"version": snapshot.version, "allow_rules": snapshot.ip_filter.allow.rules,
+                "deny_rules": snapshot.ip_filter.deny.rules, "user_agent_patterns": user_agents["patterns"],
+                "user_agent_cache_hits": user_agents["cache_hits"],
+                "user_agent_cache_misses": user_agents["cache_misses"], "reloads": self.reloads,
+                "failures": self.failures}
+
+
+ban_lists = BanLists(redis.Redis(host=settings.redis_host, port=settings.redis_port, db=0, decode_responses=True),
+                     settings.ban_list_poll_interval)
+
+
+async def main(command: str, kind: str, entries: list[str]) -> None:
+    version = await (ban_lists.add if command == "add" else ban_lists.remove)(kind, *entries)
+    print(f"Ban lists are now at version {version}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 4 or sys.argv[1] not in ("add", "remove"):
+        sys.exit(f"Usage: python -m src.middlewares.ban_lists add|remove {'|'.join(KINDS)} ENTRY...")
+    asyncio.run(main(sys.argv[1], sys.argv[2], sys.argv[3:]))
@@ -1,50 +1,84 @@
-from ipaddress import ip_address
-from typing import Callable
-import re
-
-from fastapi import Request, HTTPException, status
+from fastapi import status
 from fastapi.responses import JSONResponse
-from fastapi_limiter import FastAPILimiter
-import redis.asyncio as redis
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from src.middlewares.ban_lists import BanLists, ban_lists
+
 
-from src.conf.config import settings
+# The lists are configured through IP_ALLOW_LIST, IP_DENY_LIST, USER_AGENT_BAN_LIST and the feed files,
+# and extended at run time with `python -m src.middlewares.ban_lists add deny 203.0.113.0/24`.
 
+CHECKS = frozenset({"deny_ip", "allow_ip", "user_agent"})
 
-# banned_ips = [ip_address("192.168.1.0"), ip_address("127.0.0.0")]
-allowed_ips = [ip_address('192.168.1.1'),  ip_address("127.0.0.1")]
-# user_agent_ban_list = [r"Gecko", r"Python-urllib"]
 
-banned_ips = []
-# allowed_ips = []
-user_agent_ban_list = []
+class GuardMiddleware:
+    """
+    Pure ASGI middleware rejecting banned IP addresses, addresses outside the allow list and
+    banned user agents.
 
+    All checks run on the raw ASGI scope against the current ban list snapshot, before any
+    ``Request`` object, task or stream is created; allowed requests are passed straight to the
+    application. Which checks apply is configured per path prefix in ``paths``, a mapping of
+    prefix to any of ``deny_ip``, ``allow_ip`` and ``user_agent``; the longest matching prefix
+    wins and paths matching no prefix get every check.
 
-async def startup_event():
-    r = await redis.Redis(host=settings.redis_host, port=settings.redis_port, db=0, encoding="utf-8",
-                          decode_responses=True)
-    await FastAPILimiter.init(r)
+    Attributes:
+        app (ASGIApp): The wrapped application.
+        lists (BanLists): The ban lists to check against.
+    """
 
+    def __init__(self, app: ASGIApp, paths: dict[str, list[str]] | None = None, lists: BanLists = ban_lists):
+        self.app = app
+        self.lists = lists
+        self._paths: list[tuple[str, frozenset[str]]] = []
+        for prefix, checks in (paths or {}).items():
+            unknown = set(checks) - CHECKS
+            if unknown:
+                raise ValueError(f"Unknown guard checks for {prefix}: {', '.join(sorted(unknown))}")
+            self._paths.append((prefix, frozenset(checks)))
+        self._paths.sort(key=lambda item: len(item[0]), reverse=True)
 
-async def ban_ips_middleware(request: Request, call_next: Callable):
-    ip = ip_address(request.client.host)
-    if ip in banned_ips:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You are banned")
-    response = await call_next(request)
-    return response
+    def checks(self, path: str) -> frozenset[str]:
+        for prefix, checks in self._paths:
+            if path.startswith(prefix):
+                return checks
+        return CHECKS
 
+    def verdict(self, scope: Scope) -> str | None:
+        """
+        Run the checks configured for the request path
 
-async def limit_access_by_ip(request: Request, call_next: Callable):
-    ip = ip_address(request.client.host)
-    if ip not in allowed_ips:
-        return JSONResponse(status_code=status.HTTP_403_FORBIDDEN, content={"detail": "Not allowed IP address"})
-    response = await call_next(request)
-    return response
+        Args:
+            scope (Scope): The ASGI connection scope.
 
+        Returns:
+            str | None: The reason the request is rejected, or None if it may pass.
+        """
+        checks = self.checks(scope["path"])
+        if not checks:
+            return None
+        snapshot = self.lists.current
+        client = scope.get("client")
+        host = client[0] if client else None
+        if "deny_ip" in checks and snapshot.ip_filter.is_banned(host):
+            return "You are banned"
+        if "allow_ip" in checks and not snapshot.ip_filter.is_allowed(host):
+            return "Not allowed IP address"
+        if "user_agent" in checks:
+            user_agent = next((value.decode("latin-1") for name, value in scope["headers"] if name == b"user-agent"),
+                              None)
+            if snapshot.user_agents.is_banned(user_agent):
+                return "You are banned"
+        return None
 
-async def user_agent_ban_middleware(request: Request, call_next: Callable):
-    user_agent = request.headers.get("user-agent")
-    for ban_pattern in user_agent_ban_list:
-        if re.search(ban_pattern, user_agent):
-            return JSONResponse(status_code=status.HTTP_403_FORBIDDEN, content={"detail": "You are banned"})
-    response = await call_next(request)
-    return response
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+        detail = self.verdict(scope)
+        if detail is None:
+            await self.app(scope, receive, send)
+        elif scope["type"] == "websocket":
+            await send({"type": "websocket.close", "code": 1008})
+        else:
+            await JSONResponse(status_code=status.HTTP_403_FORBIDDEN, content={"detail": detail})(scope, receive, send)
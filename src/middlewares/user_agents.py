@@ -0,0 +1,97 @@
+import logging
+import re
+from functools import lru_cache
+from typing import Iterable
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_FLAGS = re.compile(r"^\(\?([imsx]+)\)")
+# Numbered backreferences and conditionals (``\1``, ``(?(1)...)``), but not an escaped backslash followed by a digit.
+NUMBERED_REFERENCE = re.compile(r"(?<!\\)(?:\\\\)*\\[1-9]|\(\?\(\d")
+MAX_CACHED_LENGTH = 512
+
+
+def scoped(pattern: str) -> str:
+    """
+    Turn leading global flags such as ``(?i)`` into a scoped group, which may appear inside an alternation
+
+    Args:
+        pattern (str): A user-agent regular expression.
+
+    Returns:
+        str: An equivalent pattern that can be embedded in a larger one.
+    """
+    flags = GLOBAL_FLAGS.match(pattern)
+    if flags is None:
+        return f"(?:{pattern})"
+    return f"(?{flags.group(1)}:{pattern[flags.end():]})"
+
+
+class UserAgentMatcher:
+    """
+    Banned user-agent patterns compiled into one regular expression.
+
+    The patterns are joined into a single alternation, so a header is scanned once however many
+    patterns there are. Joining renumbers capture groups, so patterns with numbered backreferences
+    are kept out of the alternation and matched one by one. Verdicts are memoized in a bounded LRU
+    cache keyed by the header, since a handful of clients send most of the traffic; headers longer
+    than ``MAX_CACHED_LENGTH`` are matched without caching. A matcher is immutable, so it and its
+    cache are simply rebuilt when the list changes.
+
+    Attributes:
+        patterns (tuple[str, ...]): The banned patterns, matched with ``re.search`` semantics.
+    """
+
+    def __init__(self, patterns: Iterable[str], cache_size: int):
+        self.patterns = tuple(dict.fromkeys(patterns))
+        self._search = self._compile(self.patterns)
+        self._cached = lru_cache(maxsize=cache_size)(self._match)
+
+    @staticmethod
+    def _compile(patterns: tuple[str, ...]):
+        if not patterns:
+            return None
+        combined, compiled = [], []
+        for pattern in patterns:
+            if NUMBERED_REFERENCE.search(pattern):
+                compiled.append(re.compile(pattern))
+            else:
+                combined.append(pattern)
+        if combined:
+            try:
+                compiled.insert(0, re.compile("|".join(scoped(pattern) for pattern in combined)))
+            except re.error as e:
+                # Patterns that cannot share one expression (e.g. duplicate group names) are matched one by one.
+                logger.warning("User-agent patterns could not be combined, matching them separately: %s", e)
+                compiled = [re.compile(pattern) for pattern in patterns]
+        if len(compiled) == 1:
+            return compiled[0].search
+        return lambda user_agent: any(regex.search(user_agent) for regex in compiled)
+
+    def _match(self, user_agent: str) -> bool:
+        return bool(self._search(user_agent))
+
+    def is_banned(self, user_agent: str | None) -> bool:
+        """
+        Check a ``User-Agent`` header against the banned patterns
+
+        Args:
+            user_agent (str | None): The header value; a missing header is matched as an empty string.
+
+        Returns:
+            bool: Whether any pattern matches.
+        """
+        if self._search is None:
+            return False
+        user_agent = user_agent or ""
+        if len(user_agent) > MAX_CACHED_LENGTH:
+            return self._match(user_agent)
+        return self._cached(user_agent)
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    def stats(self) -> dict:
+        info = self._cached.cache_info()
+        return {"patterns": len(self.patterns), "cache_size": info.currsize, "cache_hits": info.hits,
+                "cache_misses": info.misses}
@@ -1,16 +1,22 @@
-from typing import Type
-from datetime import datetime, timedelta
+from typing import Type, AsyncIterator, Sequence
+from datetime import date, timedelta
 
 from fastapi import HTTPException, status
-from sqlalchemy import text, and_
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, or_, case, delete, select, update, tuple_, Select, Row, func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.db.models import Contact, User
-from src.schemas import ContactRequest
+from src.db.models import Contact, User, birthday_day_of_year
+from src.schemas import ContactRequest, ContactPatch
+from src.utils.cursor import decode_cursor
+
+# ``ON CONFLICT`` is dialect-specific; SQLite is what the tests run against.
+DIALECT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
 
 
 async def create_contact(contact: ContactRequest,
-                         db: Session,
+                         db: AsyncSession,
                          current_user: User) -> Contact:
     """
         Create a new contact for the current user.
@@ -18,26 +24,70 @@ async def create_contact(contact: ContactRequest,
         :param contact: The contact data to create.
         :type contact: ContactRequest
         :param db: The database session.
-        :type db: Session
+        :type db: AsyncSession
         :param current_user: The current user.
         :type current_user: User
         :return: The created contact.
         :rtype: Contact
         :raises HTTPException 400: If the phone number already exists for the current user.
     """
-    if db.query(Contact).filter(
-            and_(Contact.phone_number == contact.phone_number, Contact.user_id == current_user.id)).first():
+    existing = await db.execute(select(Contact).where(
+        and_(Contact.phone_number == contact.phone_number, Contact.user_id == current_user.id)))
+    if existing.scalars().first():
         raise HTTPException(status_code=400, detail="Phone number already exists")
-    db_contact = Contact(**contact.model_dump(), user=current_user)
+    db_contact = Contact(**contact.model_dump(), user_id=current_user.id)
     db.add(db_contact)
-    db.commit()
-    db.refresh(db_contact)
+    await db.commit()
+    await db.refresh(db_contact)
 
     return db_contact
 
 
+async def create_contacts_bulk(contacts: list[ContactRequest],
+                               db: AsyncSession,
+                               current_user: User) -> tuple[int, list[ContactRequest]]:
+    """
+        Insert a chunk of contacts for the current user with a single statement.
+
+        Phone numbers are unique across the whole ``contacts`` table. The chunk is
+        de-duplicated within itself and inserted with one executemany
+        ``INSERT ... ON CONFLICT (phone_number) DO NOTHING RETURNING phone_number``, so rows
+        whose phone number is already stored, including by a concurrent import, are skipped
+        by the database and reported as duplicates while the rest of the chunk is kept.
+
+        :param contacts: The validated contacts of one chunk.
+        :type contacts: list[ContactRequest]
+        :param db: The database session.
+        :type db: AsyncSession
+        :param current_user: The current user.
+        :type current_user: User
+        :return: The number of inserted contacts and the skipped duplicates.
+        :rtype: tuple[int, list[ContactRequest]]
+    """
+    if not contacts:
+        return 0, []
+    seen, candidates, rows, duplicates = set(), [], [], []
+    for contact in contacts:
+        if contact.phone_number in seen:
+            duplicates.append(contact)
+            continue
+        seen.add(contact.phone_number)
+        candidates.append(contact)
+        rows.append({**contact.model_dump(), "birthday_doy": birthday_day_of_year(contact.birthday),
+                     "user_id": current_user.id})
+    dialect_insert = DIALECT_INSERTS[db.get_bind().dialect.name]
+    result = await db.execute(dialect_insert(Contact)
+                              .on_conflict_do_nothing(index_elements=[Contact.phone_number])
+                              .returning(Contact.phone_number), rows)
+    stored = set(result.scalars().all())
+    await db.commit()
+    duplicates += [contact for contact in candidates if contact.phone_number not in stored]
+
+    return len(stored), duplicates
+
+
 async def get_contact(contact_id: int,
-                      db: Session,
+                      db: AsyncSession,
                       current_user: User) -> Type[Contact]:
     """
         Create a new contact for the current user.
@@ -45,24 +95,57 @@ async def get_contact(contact_id: int,
         :param contact: The contact data to create.
         :type contact: ContactRequest
         :param db: The database session.
-        :type db: Session
+        :type db: AsyncSession
         :param current_user: The current user.
         :type current_user: User
         :return: The created contact.
         :rtype: Contact
         :raises HTTPException 400: If the phone number already exists for the current user.
     """
-    contact = db.query(Contact).filter(and_(Contact.id == contact_id, Contact.user_id == current_user.id)).first()
+    result = await db.execute(select(Contact).where(and_(Contact.id == contact_id, Contact.user_id == current_user.id)))
+    contact = result.scalars().first()
     if contact is None:
         raise HTTPException(status_code=404, detail="Contact not found")
 
     return contact
 
 
+def paginate(stmt: Select, skip: int, limit: int, cursor: str | None) -> Select:
+    """
+        Apply offset or keyset pagination to a contacts query.
+
+        With a cursor the query is ordered by ``(last_name, id)`` and resumes right after
+        the cursor position, so deep pages cost the same as the first one; an empty cursor
+        starts keyset paging from the first contact. Contacts without a last name sort as an
+        empty one, so they are paged too. Without a cursor the legacy ``offset``/``limit``
+        behaviour is kept.
+
+        :param stmt: The contacts query to paginate.
+        :type stmt: Select
+        :param skip: The number of contacts to skip in offset mode.
+        :type skip: int
+        :param limit: The maximum number of contacts to return.
+        :type limit: int
+        :param cursor: Opaque cursor returned with the previous page, ``""`` for the first page, or None.
+        :type cursor: str | None
+        :return: The paginated query.
+        :rtype: Select
+    """
+    if cursor is None:
+        return stmt.offset(skip).limit(limit)
+    # Must match the expression of ix_contacts_user_id_last_name_id and encode_cursor's NULL handling.
+    key = (func.coalesce(Contact.last_name, ""), Contact.id)
+    if cursor:
+        last_name, contact_id = decode_cursor(cursor)
+        stmt = stmt.where(tuple_(*key) > tuple_(last_name, contact_id))
+    return stmt.order_by(*key).limit(limit)
+
+
 async def get_contacts(skip: int,
                        limit: int,
-                       db: Session,
-                       current_user: User) -> list[Type[Contact]]:
+                       db: AsyncSession,
+                       current_user: User,
+                       cursor: str | None = None) -> list[Type[Contact]]:
     """
         Get a list of contacts for the current user with pagination.
 
@@ -71,20 +154,51 @@ async def get_contacts(skip: int,
         :param limit: The maximum number of contacts to return.
         :type limit: int
         :param db: The database session.
-        :type db: Session
+        :type db: AsyncSession
         :param current_user: The current user.
         :type current_user: User
+        :param cursor: Keyset cursor from the previous page; ``skip`` is ignored when given.
+        :type cursor: str | None
         :return: A list of contacts.
         :rtype: List[Contact]
     """
-    contacts = db.query(Contact).filter(Contact.user_id == current_user.id).offset(skip).limit(limit).all()
+    result = await db.execute(paginate(select(Contact).where(Contact.user_id == current_user.id), skip, limit, cursor))
 
-    return contacts
+    return list(result.scalars().all())
+
+
+async def stream_contacts(db: AsyncSession,
+                          current_user: User,
+                          batch_size: int = 1000) -> AsyncIterator[Sequence[Row]]:
+    """
+        Stream all contacts of the current user in batches through a server-side cursor.
+
+        Only plain columns are selected, so no ORM objects are built and memory use is bounded
+        by ``batch_size`` regardless of the address book size.
+
+        :param db: The database session.
+        :type db: AsyncSession
+        :param current_user: The current user.
+        :type current_user: User
+        :param batch_size: Number of rows fetched from the cursor at a time.
+        :type batch_size: int
+        :return: Batches of rows with id, names, email, phone number and birthday.
+        :rtype: AsyncIterator[Sequence[Row]]
+    """
+    result = await db.stream(
+        select(Contact.id, Contact.first_name, Contact.last_name, Contact.email, Contact.phone_number,
+               Contact.birthday)
+        .where(Contact.user_id == current_user.id)
+        .order_by(Contact.id)
+        .execution_options(yield_per=batch_size)
+    )
+    async for partition in result.partitions():
+        yield partition
 
 
 async def update_contact(contact_id: int,
                          updated_contact: ContactRequest,
-                         db: Session,
+                         db: AsyncSession,
                          current_user: User) -> Type[Contact]:
     """
         Update a specific contact for the current user by ID.
@@ -94,28 +208,29 @@ async def update_contact(contact_id: int,
         :param updated_contact: The updated contact data.
         :type updated_contact: ContactRequest
         :param db: The database session.
-        :type db: Session
+        :type db: AsyncSession
         :param current_user: The current user.
         :type current_user: User
         :return: The updated contact.
         :rtype: Contact
         :raises HTTPException 404: If the contact is not found.
     """
-    contact = db.query(Contact).filter(and_(Contact.id == contact_id, Contact.user_id == current_user.id)).first()
+    result = await db.execute(select(Contact).where(and_(Contact.id == contact_id, Contact.user_id == current_user.id)))
+    contact = result.scalars().first()
     if contact is None:
         raise HTTPException(status_code=404, detail="Contact not found")
 
     for attr, value in updated_contact.model_dump().items():
         setattr(contact, attr, value)
 
-    db.commit()
-    db.refresh(contact)
+    await db.commit()
+    await db.refresh(contact)
 
     return contact
 
 
 async def delete_contact(contact_id: int,
-                         db: Session,
+                         db: AsyncSession,
                          current_user: User) -> Type[Contact]:
     """
         Delete a specific contact for the current user by ID.
@@ -123,30 +238,106 @@ async def delete_contact(contact_id: int,
         :param contact_id: The ID of the contact to delete.
         :type contact_id: int
         :param db: The database session.
-        :type db: Session
+        :type db: AsyncSession
         :param current_user: The current user.
         :type current_user: User
         :return: The deleted contact.
         :rtype: Contact
         :raises HTTPException 404: If the contact is not found.
     """
-    contact = db.query(Contact).filter(and_(Contact.id == contact_id, Contact.user_id == current_user.id)).first()
+    result = await db.execute(select(Contact).where(and_(Contact.id == contact_id, Contact.user_id == current_user.id)))
+    contact = result.scalars().first()
     if contact is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Contact not found")
-    db.delete(contact)
-    db.commit()
+    await db.delete(contact)
+    await db.commit()
 
     return contact
 
 
+async def update_contacts_bulk(patches: list[ContactPatch],
+                               db: AsyncSession,
+                               current_user: User) -> list[Contact]:
+    """
+        Apply partial updates to many contacts of the current user in one transaction.
+
+        The updates are sent as a single executemany ``UPDATE ... WHERE id = :id AND user_id = :user``
+        and the resulting rows are read back with one ``id IN (...)`` query. Ids that do not
+        exist or belong to another user are silently left out of the result.
+
+        :param patches: The partial updates, each carrying the contact ID.
+        :type patches: list[ContactPatch]
+        :param db: The database session.
+        :type db: AsyncSession
+        :param current_user: The current user.
+        :type current_user: User
+        :return: The updated contacts ordered by ID.
+        :rtype: List[Contact]
+        :raises HTTPException 409: If an update collides with an existing phone number.
+    """
+    rows = []
+    for patch in patches:
+        values = patch.model_dump(exclude_none=True)
+        if "birthday" in values:
+            values["birthday_doy"] = birthday_day_of_year(values["birthday"])
+        if len(values) > 1:
+            rows.append(values)
+    try:
+        if rows:
+            await db.execute(update(Contact).where(Contact.user_id == current_user.id)
+                             .execution_options(synchronize_session=None), rows)
+        result = await db.execute(select(Contact)
+                                  .where(Contact.id.in_({patch.id for patch in patches}),
+                                         Contact.user_id == current_user.id)
+                                  .order_by(Contact.id)
+                                  .execution_options(populate_existing=True))
+        contacts = list(result.scalars().all())
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Phone number already exists")
+
+    return contacts
+
+
+async def delete_contacts_bulk(ids: list[int],
+                               db: AsyncSession,
+                               current_user: User) -> list[Contact]:
+    """
+        Delete many contacts of the current user with one ``DELETE ... RETURNING`` statement.
+
+        :param ids: The IDs of the contacts to delete.
+        :type ids: list[int]
+        :param db: The database session.
+        :type db: AsyncSession
+        :param current_user: The current user.
+        :type current_user: User
+        :return: The deleted contacts; ids not owned by the user are ignored.
+        :rtype: List[Contact]
+    """
+    result = await db.execute(delete(Contact)
+                              .where(Contact.id.in_(set(ids)), Contact.user_id == current_user.id)
+                              .returning(Contact))
+    contacts = list(result.scalars().all())
+    await db.commit()
+
+    return contacts
+
+
 async def search_contacts(q: str,
                           skip: int,
                           limit: int,
-                          db: Session,
-                          current_user: User) -> list[Type[Contact]]:
+                          db: AsyncSession,
+                          current_user: User,
+                          cursor: str | None = None) -> list[Type[Contact]]:
     """
         Search for contacts by query string with pagination.
 
+        On PostgreSQL the ``ILIKE`` filters are served by the ``pg_trgm`` GIN indexes on
+        ``first_name``, ``last_name`` and ``email``, and offset pages are ranked by trigram
+        similarity to the query. Other databases (SQLite in tests) fall back to a plain
+        ``ILIKE`` scan ordered as stored.
+
         :param q: The search query.
         :type q: str
         :param skip: The number of contacts to skip.
@@ -154,39 +345,60 @@ async def search_contacts(q: str,
         :param limit: The maximum number of contacts to return.
         :type limit: int
         :param db: The database session.
-        :type db: Session
+        :type db: AsyncSession
         :param current_user: The current user.
         :type current_user: User
+        :param cursor: Keyset cursor from the previous page; ``skip`` is ignored when given.
+        :type cursor: str | None
         :return: A list of contacts matching the query.
         :rtype: List[Contact]
     """
-    contacts = db.query(Contact).filter(and_(
+    stmt = select(Contact).where(and_(
         (Contact.first_name.ilike(f"%{q}%")
          | Contact.last_name.ilike(f"%{q}%")
          | Contact.email.ilike(f"%{q}%")), Contact.user_id == current_user.id)
-    ).offset(skip).limit(limit).all()
+    )
+    if cursor is None and db.get_bind().dialect.name == "postgresql":
+        rank = func.greatest(func.similarity(Contact.first_name, q),
+                             func.similarity(Contact.last_name, q),
+                             func.similarity(Contact.email, q))
+        stmt = stmt.order_by(rank.desc(), Contact.id)
+    result = await db.execute(paginate(stmt, skip, limit, cursor))
 
-    return contacts
+    return list(result.scalars().all())
 
 
-async def upcoming_birthdays(db: Session,
-                             current_user: User) -> list[Type[Contact]]:
+async def upcoming_birthdays(db: AsyncSession,
+                             current_user: User,
+                             days: int = 7) -> list[Type[Contact]]:
     """
-        Get a list of upcoming birthdays for the current user within the next 7 days.
+        Get a list of upcoming birthdays for the current user within the next ``days`` days.
+
+        The lookup uses the stored ``birthday_doy`` column and the ``(user_id, birthday_doy)``
+        index. Windows crossing the end of the year wrap around to January, and results are
+        ordered by how soon the birthday comes.
 
         :param db: The database session.
-        :type db: Session
+        :type db: AsyncSession
         :param current_user: The current user.
         :type current_user: User
+        :param days: How many days after today to look ahead.
+        :type days: int
         :return: A list of contacts with upcoming birthdays.
         :rtype: List[Contact]
     """
-    today = datetime.today()
-    seven_days_later = today + timedelta(days=7)
+    today = date.today()
+    start = birthday_day_of_year(today)
+    end = birthday_day_of_year(today + timedelta(days=days))
+
+    if end >= start:
+        in_window = Contact.birthday_doy.between(start, end)
+    else:
+        in_window = or_(Contact.birthday_doy >= start, Contact.birthday_doy <= end)
+    days_until = case((Contact.birthday_doy >= start, Contact.birthday_doy - start),
+                      else_=Contact.birthday_doy + 366 - start)
 
-    upcoming_birthdays_this_year = db.query(Contact).filter(
-        and_(text("TO_CHAR(birthday, 'MM-DD') BETWEEN :start_date AND :end_date"),
-             Contact.user_id == current_user.id)).params(start_date=today.strftime('%m-%d'),
-                                                         end_date=seven_days_later.strftime('%m-%d')).all()
+    result = await db.execute(select(Contact).where(and_(Contact.user_id == current_user.id, in_window))
+                              .order_by(days_until, Contact.id))
 
-    return upcoming_birthdays_this_year
+    return list(result.scalars().all())
@@ -1,49 +1,47 @@
-from libgravatar import Gravatar
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.db.models import User
 from src.schemas import UserModel
+from src.services import gravatar
+from src.services.refresh_tokens import refresh_tokens
+from src.services.user_cache import invalidate_user
 
 
-async def get_user_by_email(email: str, db: Session) -> User:
+async def get_user_by_email(email: str, db: AsyncSession) -> User:
     """
         Retrieve a user by their email address.
 
         :param email: The email address of the user to retrieve.
         :type email: str
         :param db: The database session.
-        :type db: Session
+        :type db: AsyncSession
         :return: The user with the specified email address.
         :rtype: User
     """
-    return db.query(User).filter(User.email == email).first()
+    result = await db.execute(select(User).where(User.email == email))
+    return result.scalars().first()
 
 
-async def create_user(body: UserModel, db: Session) -> User:
+async def create_user(body: UserModel, db: AsyncSession) -> User:
     """
        Create a new user with the provided user data.
 
        :param body: The user data to create.
        :type body: UserModel
        :param db: The database session.
-       :type db: Session
+       :type db: AsyncSession
        :return: The newly created user.
        :rtype: User
     """
-    avatar = None
-    try:
-        g = Gravatar(body.email)
-        avatar = g.get_image()
-    except Exception as e:
-        print(e)
-    new_user = User(**body.model_dump(), avatar=avatar)
+    new_user = User(**body.model_dump(), avatar=gravatar.avatar_url(body.email))
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
     return new_user
 
 
-async def update_token(user: User, token: str | None, db: Session) -> None:
+async def update_token(user: User, token: str | None, db: AsyncSession) -> None:
     """
        Update the refresh token for a user.
 
@@ -52,27 +50,29 @@ async def update_token(user: User, token: str | None, db: Session) -> None:
        :param token: The new refresh token or None.
        :type token: str | None
        :param db: The database session.
-       :type db: Session
+       :type db: AsyncSession
     """
     user.refresh_token = token
-    db.commit()
+    await db.commit()
+    await invalidate_user(user.email)
 
 
-async def confirmed_email(email: str, db: Session) -> None:
+async def confirmed_email(email: str, db: AsyncSession) -> None:
     """
        Confirm a user's email address.
 
        :param email: The email address to confirm.
        :type email: str
        :param db: The database session.
-       :type db: Session
+       :type db: AsyncSession
     """
     user = await get_user_by_email(email, db)
     user.confirmed = True
-    db.commit()
+    await db.commit()
+    await invalidate_user(email)
 
 
-async def update_avatar(email: str, url: str, db: Session) -> User:
+async def update_avatar(email: str, url: str, db: AsyncSession) -> User:
     """
         Update the avatar URL for a user.
 
@@ -81,30 +81,74 @@ async def update_avatar(email: str, url: str, db: Session) -> User:
         :param url: The new avatar URL.
         :type url: str
         :param db: The database session.
-        :type db: Session
+        :type db: AsyncSession
         :return: The user with the updated avatar URL.
         :rtype: User
     """
     user = await get_user_by_email(email, db)
     user.avatar = url
-    db.commit()
+    await db.commit()
+    await invalidate_user(email)
     return user
 
 
-async def set_new_password(email: str, new_password: str, db: Session):
+async def set_new_password(email: str, new_password: str, db: AsyncSession, revoke_tokens: bool = True):
     """
        Set a new password for a user.
 
+       A changed password revokes every refresh token family of the user, so sessions
+       started with the old password, stolen ones included, cannot be refreshed any more.
+
        :param email: The email address of the user whose password is to be updated.
        :type email: str
        :param new_password: The new password.
        :type new_password: str
        :param db: The database session.
-       :type db: Session
+       :type db: AsyncSession
+       :param revoke_tokens: False when only the hash of the same password is upgraded.
+       :type revoke_tokens: bool
        :return: The user with the updated password.
        :rtype: User
     """
     user = await get_user_by_email(email, db)
     user.password = new_password
-    db.commit()
+    await db.commit()
+    await invalidate_user(email)
+    if revoke_tokens:
+        await refresh_tokens.revoke_user(email)
     return user
+
+
+async def get_users_without_avatar(db: AsyncSession, after_id: int = 0, limit: int = 1000) -> list[User]:
+    """
+       Retrieve a batch of users that have no avatar, in ID order.
+
+       :param db: The database session.
+       :type db: AsyncSession
+       :param after_id: Only users with a greater ID are returned.
+       :type after_id: int
+       :param limit: The maximum number of users to return.
+       :type limit: int
+       :return: The users without an avatar.
+       :rtype: list[User]
+    """
+    stmt = select(User).where(User.avatar.is_(None), User.id > after_id).order_by(User.id).limit(limit)
+    result = await db.execute(stmt)
+    return list(result.scalars().all())
+
+
+async def update_avatars_bulk(avatars: dict[int, str], db: AsyncSession) -> None:
+    """
+       Set the avatar URL of many users in one statement.
+
+       The caller is responsible for invalidating the cached users.
+
+       :param avatars: New avatar URLs by user ID.
+       :type avatars: dict[int, str]
+       :param db: The database session.
+       :type db: AsyncSession
+    """
+    if not avatars:
+        return
+    await db.execute(update(User), [{"id": user_id, "avatar": url} for user_id, url in avatars.items()])
+    await db.commit()
@@ -1,6 +1,6 @@
-from fastapi import APIRouter, HTTPException, Depends, status, Security
+from fastapi import APIRouter, HTTPException, Depends, Response, status, Security
 from fastapi.security import OAuth2PasswordRequestForm, HTTPAuthorizationCredentials, HTTPBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.db.db_connect import get_db
 from src.schemas import UserModel, UserResponse, TokenModel
@@ -12,68 +12,79 @@ security = HTTPBearer()
 
 
 @router.post("/signup", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-async def signup(body: UserModel, db: Session = Depends(get_db)):
+async def signup(body: UserModel, db: AsyncSession = Depends(get_db)):
     """
         Sign up a new user.
 
         :param body: The user data to sign up.
         :type body: UserModel
         :param db: The database session.
-        :type db: Session
+        :type db: AsyncSession
         :return: The newly created user and a success message.
         :rtype: dict
     """
     exist_user = await repository_users.get_user_by_email(body.email, db)
     if exist_user:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Account already exists")
-    body.password = auth_service.get_password_hash(body.password)
+    body.password = await auth_service.get_password_hash(body.password)
     new_user = await repository_users.create_user(body, db)
     return {"user": new_user, "detail": "User successfully created"}
 
 
 @router.post("/login", response_model=TokenModel)
-async def login(body: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login(body: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
     """
         Log in a user and generate an access token and a refresh token.
 
         :param body: The login credentials.
         :type body: OAuth2PasswordRequestForm
         :param db: The database session.
-        :type db: Session
+        :type db: AsyncSession
         :return: The access token and refresh token.
         :rtype: dict
     """
     user = await repository_users.get_user_by_email(body.username, db)
     if user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid email")
-    if not auth_service.verify_password(body.password, user.password):
+    verified, new_hash = await auth_service.verify_and_update_password(body.password, user.password)
+    if not verified:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid password")
+    if new_hash is not None:
+        # Same password under an upgraded hash, so the user's other sessions stay valid.
+        await repository_users.set_new_password(user.email, new_hash, db, revoke_tokens=False)
     access_token = await auth_service.create_access_token(data={"sub": user.email})
     refresh_token = await auth_service.create_refresh_token(data={"sub": user.email})
-    await repository_users.update_token(user, refresh_token, db)
     return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
 
 
 @router.get('/refresh_token', response_model=TokenModel)
-async def refresh_token(credentials: HTTPAuthorizationCredentials = Security(security), db: Session = Depends(get_db)):
+async def refresh_token(credentials: HTTPAuthorizationCredentials = Security(security)):
     """
         Refresh an access token using a refresh token.
 
+        The refresh token is rotated: the presented token stops working, and presenting it again
+        revokes every token issued from the same login.
+
         :param credentials: The authorization credentials.
         :type credentials: HTTPAuthorizationCredentials
-        :param db: The database session.
-        :type db: Session
         :return: The new access token and refresh token.
         :rtype: dict
     """
-    token = credentials.credentials
-    email = await auth_service.decode_refresh_token(token)
-    user = await repository_users.get_user_by_email(email, db)
-    if user.refresh_token != token:
-        await repository_users.update_token(user, None, db)
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token")
-
+    email, refresh_token = await auth_service.rotate_refresh_token(credentials.credentials)
     access_token = await auth_service.create_access_token(data={"sub": email})
-    refresh_token = await auth_service.create_refresh_token(data={"sub": email})
-    await repository_users.update_token(user, refresh_token, db)
-    return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
\ No newline at end of file
+    return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
+
+
+@router.get('/jwks.json')
+async def jwks(response: Response):
+    """
+        Publish the public token verification keys as a JWK Set.
+
+        Services that only need to check access tokens can verify them locally with these keys
+        instead of sharing the signing secret. HMAC secrets are never published.
+
+        :return: The JWK Set.
+        :rtype: dict
+    """
+    response.headers["Cache-Control"] = "public, max-age=300"
+    return auth_service.keyring.jwks()
@@ -1,21 +1,51 @@
 from typing import List
 
-from fastapi import Depends, Query, APIRouter, status
-from sqlalchemy.orm import Session
-from fastapi_limiter.depends import RateLimiter
+from fastapi import Depends, Query, APIRouter, status, Response, UploadFile, File, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.db.models import User
-from src.schemas import ContactRequest, ContactResponse
+from src.conf.config import settings
+from src.schemas import ContactRequest, ContactResponse, ContactImportResponse, ContactBatchUpdate, \
+    ContactBatchDelete
 from src.db.db_connect import get_db
 from src.repository import contacts as repository_contacts
+from src.utils.contacts_io import IMPORT_FORMATS, EXPORT_FORMATS, EXPORT_EXTENSIONS, detect_format, parse_contacts, \
+    take, export_header, export_rows
+from src.utils.cursor import encode_cursor
 from src.services.auth import auth_service
+from src.services.birthdays import birthday_digest
+from src.services.rate_limit import rate_limit
 
 router = APIRouter(prefix="/contacts", tags=['contacts'])
 
+MAX_IMPORT_ERRORS = 100
+
+
+def set_next_cursor(response: Response, contacts: list, limit: int, cursor: str | None):
+    """
+        Expose the keyset cursor of the next page in the ``X-Next-Cursor`` header.
+
+        Only keyset pages (requested with a cursor, ``cursor=`` for the first one) are in
+        ``(last_name, id)`` order, so offset pages get no cursor.
+
+        :param response: The outgoing response.
+        :type response: Response
+        :param contacts: The contacts of the current page.
+        :type contacts: list
+        :param limit: The requested page size.
+        :type limit: int
+        :param cursor: The cursor the page was requested with, or None in offset mode.
+        :type cursor: str | None
+    """
+    if cursor is not None and contacts and len(contacts) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(contacts[-1].last_name, contacts[-1].id)
+
 
 @router.post("/", response_model=ContactResponse, description='No more than 5 request per minute',
-             dependencies=[Depends(RateLimiter(times=5, seconds=60))], status_code=status.HTTP_201_CREATED)
-async def create_contact(contact: ContactRequest, db: Session = Depends(get_db),
+             dependencies=[rate_limit("create_contact")], status_code=status.HTTP_201_CREATED)
+async def create_contact(contact: ContactRequest, db: AsyncSession = Depends(get_db),
                          current_user: User = Depends(auth_service.get_current_user)):
     """
         Create a new contact.
@@ -23,41 +53,218 @@ async def create_contact(contact: ContactRequest, db: Session = Depends(get_db),
         :param contact: The contact data to create.
         :type contact: ContactRequest
         :param db: The database session.
-        :type db: Session
+        :type db: AsyncSession
         :param current_user: The current user.
         :type current_user: User
         :return: The newly created contact.
         :rtype: ContactResponse
     """
     contact = await repository_contacts.create_contact(contact, db, current_user)
+    await birthday_digest.invalidate(current_user.id)
     return contact
 
 
+@router.post("/import", response_model=ContactImportResponse, description='No more than 2 request per minute',
+             dependencies=[rate_limit("import_contacts")])
+async def import_contacts(file: UploadFile = File(),
+                          fmt: str | None = Query(None, alias="format", description="csv or ndjson"),
+                          db: AsyncSession = Depends(get_db),
+                          current_user: User = Depends(auth_service.get_current_user)):
+    """
+        Bulk import contacts from an uploaded CSV or NDJSON file.
+
+        The file is parsed in a worker thread, ``contacts_import_chunk_size`` rows at a time.
+        Every chunk is validated with ContactRequest and inserted with one statement that skips
+        phone numbers already stored. Invalid rows and duplicates are skipped and
+        reported instead of failing the whole import. A file that turns out not to be UTF-8
+        after some chunks were imported is reported the same way, as an error at the row the
+        import stopped at; only a file rejected before anything was imported gets a 400.
+
+        :param file: The uploaded CSV (with header) or NDJSON file.
+        :type file: UploadFile
+        :param fmt: Explicit file format; guessed from the file name or content type if omitted.
+        :type fmt: str | None
+        :param db: The database session.
+        :type db: AsyncSession
+        :param current_user: The current user.
+        :type current_user: User
+        :return: Counts of imported, duplicate and invalid rows with the first row errors.
+        :rtype: ContactImportResponse
+    """
+    fmt = fmt or detect_format(file.filename, file.content_type)
+    if fmt not in IMPORT_FORMATS:
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                            detail="Unsupported import format, use csv or ndjson")
+
+    rows = parse_contacts(file.file, fmt)
+    imported, duplicates, invalid, errors = 0, 0, 0, []
+    last_row = 0
+    try:
+        while chunk := await run_in_threadpool(take, rows, settings.contacts_import_chunk_size):
+            valid = []
+            last_row = chunk[-1][0]
+            for row, contact, error in chunk:
+                if contact is not None:
+                    valid.append(contact)
+                    continue
+                invalid += 1
+                if len(errors) < MAX_IMPORT_ERRORS:
+                    errors.append({"row": row, "detail": error})
+            inserted, skipped = await repository_contacts.create_contacts_bulk(valid, db, current_user)
+            imported += inserted
+            duplicates += len(skipped)
+    except UnicodeDecodeError:
+        if not imported:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="File must be UTF-8 encoded")
+        errors.append({"row": last_row + 1,
+                       "detail": "File must be UTF-8 encoded; this and the following rows were not imported"})
+    finally:
+        if imported:
+            await birthday_digest.invalidate(current_user.id)
+
+    return {"imported": imported, "duplicates": duplicates, "invalid": invalid, "errors": errors}
+
+
 @router.get("/", response_model=List[ContactResponse], description='No more than 10 request per minute',
-            dependencies=[Depends(RateLimiter(times=10, seconds=60))])
-async def read_contacts(skip: int = 0, limit: int = 10, db: Session = Depends(get_db),
+            dependencies=[rate_limit("read_contacts")])
+async def read_contacts(response: Response, skip: int = 0, limit: int = 10, cursor: str | None = None,
+                        db: AsyncSession = Depends(get_db),
                         current_user: User = Depends(auth_service.get_current_user)):
     """
         Retrieve a list of contacts with specified pagination parameters.
 
+        Pass ``cursor=`` (empty) to page in ``(last_name, id)`` order; when a full keyset
+        page is returned, the cursor for the next page is sent in the ``X-Next-Cursor``
+        response header.
+
+        :param response: The outgoing response, used to set the next-page cursor header.
+        :type response: Response
         :param skip: The number of contacts to skip.
         :type skip: int
         :param limit: The maximum number of contacts to return.
         :type limit: int
+        :param cursor: Keyset cursor from a previous ``X-Next-Cursor`` header, or empty for the first keyset page.
+        :type cursor: str | None
         :param db: The database session.
-        :type db: Session
+        :type db: AsyncSession
         :param current_user: The current user.
         :type current_user: User
         :return: A list of contacts.
         :rtype: List[ContactResponse]
         """
-    contacts = await repository_contacts.get_contacts(skip, limit, db, current_user)
+    contacts = await repository_contacts.get_contacts(skip, limit, db, current_user, cursor)
+    set_next_cursor(response, contacts, limit, cursor)
+    return contacts
+
+
+@router.get("/search", response_model=List[ContactResponse], description='No more than 10 request per minute',
+            dependencies=[rate_limit("search_contacts")])
+async def search_contacts(
+        response: Response,
+        q: str = Query(..., description="Search query for name, last name, or email"),
+        skip: int = 0, limit: int = 10, cursor: str | None = None, db: AsyncSession = Depends(get_db),
+        current_user: User = Depends(auth_service.get_current_user)
+):
+    """
+        Search contacts by name, last name, or email with specified pagination parameters.
+
+        :param response: The outgoing response, used to set the next-page cursor header.
+        :type response: Response
+        :param q: The search query.
+        :type q: str
+        :param skip: The number of contacts to skip.
+        :type skip: int
+        :param limit: The maximum number of contacts to return.
+        :type limit: int
+        :param cursor: Keyset cursor from a previous ``X-Next-Cursor`` header, or empty for the first keyset page.
+        :type cursor: str | None
+        :param db: The database session.
+        :type db: AsyncSession
+        :param current_user: The current user.
+        :type current_user: User
+        :return: A list of contacts matching the search query.
+        :rtype: List[ContactResponse]
+    """
+    contacts = await repository_contacts.search_contacts(q, skip, limit, db, current_user, cursor)
+    set_next_cursor(response, contacts, limit, cursor)
+    return contacts
+
+
+@router.get("/export", description='No more than 2 request per minute',
+            dependencies=[rate_limit("export_contacts")], response_class=StreamingResponse)
+async def export_contacts(fmt: str = Query("csv", alias="format", pattern="^(csv|ndjson|vcard)$"),
+                          db: AsyncSession = Depends(get_db),
+                          current_user: User = Depends(auth_service.get_current_user)):
+    """
+        Export the whole address book of the current user as CSV, NDJSON or vCard.
+
+        Rows are read through a server-side cursor and written to the response as they
+        arrive, so memory use does not depend on the number of contacts.
+
+        :param fmt: The export format: csv, ndjson or vcard.
+        :type fmt: str
+        :param db: The database session.
+        :type db: AsyncSession
+        :param current_user: The current user.
+        :type current_user: User
+        :return: A streamed file attachment.
+        :rtype: StreamingResponse
+    """
+    async def content():
+        yield export_header(fmt)
+        async for rows in repository_contacts.stream_contacts(db, current_user):
+            yield export_rows(rows, fmt)
+
+    filename = f"contacts.{EXPORT_EXTENSIONS[fmt]}"
+    return StreamingResponse(content(), media_type=EXPORT_FORMATS[fmt],
+                             headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+
+@router.patch("/batch", response_model=List[ContactResponse], description='No more than 10 request per minute',
+              dependencies=[rate_limit("update_contacts_batch")])
+async def update_contacts_batch(body: ContactBatchUpdate, db: AsyncSession = Depends(get_db),
+                                current_user: User = Depends(auth_service.get_current_user)):
+    """
+        Partially update many contacts in one request and one transaction.
+
+        :param body: The partial updates, each with the ID of the contact to change.
+        :type body: ContactBatchUpdate
+        :param db: The database session.
+        :type db: AsyncSession
+        :param current_user: The current user.
+        :type current_user: User
+        :return: The updated contacts; unknown IDs are omitted.
+        :rtype: List[ContactResponse]
+    """
+    contacts = await repository_contacts.update_contacts_bulk(body.contacts, db, current_user)
+    await birthday_digest.invalidate(current_user.id)
+    return contacts
+
+
+@router.delete("/batch", response_model=List[ContactResponse], description='No more than 10 request per minute',
+               dependencies=[rate_limit("delete_contacts_batch")])
+async def delete_contacts_batch(body: ContactBatchDelete, db: AsyncSession = Depends(get_db),
+                                current_user: User = Depends(auth_service.get_current_user)):
+    """
+        Delete many contacts in one request and one transaction.
+
+        :param body: The IDs of the contacts to delete.
+        :type body: ContactBatchDelete
+        :param db: The database session.
+        :type db: AsyncSession
+        :param current_user: The current user.
+        :type current_user: User
+        :return: The deleted contacts; unknown IDs are omitted.
+        :rtype: List[ContactResponse]
+    """
+    contacts = await repository_contacts.delete_contacts_bulk(body.ids, db, current_user)
+    await birthday_digest.invalidate(current_user.id)
     return contacts
 
 
 @router.get("/{contact_id}", response_model=ContactResponse, description='No more than 10 request per minute',
-            dependencies=[Depends(RateLimiter(times=10, seconds=60))])
-async def read_contact(contact_id: int, db: Session = Depends(get_db),
+            dependencies=[rate_limit("read_contact")])
+async def read_contact(contact_id: int, db: AsyncSession = Depends(get_db),
                        current_user: User = Depends(auth_service.get_current_user)):
     """
         Retrieve a contact by its ID.
@@ -65,7 +272,7 @@ async def read_contact(contact_id: int, db: Session = Depends(get_db),
         :param contact_id: The ID of the contact to retrieve.
         :type contact_id: int
         :param db: The database session.
-        :type db: Session
+        :type db: AsyncSession
         :param current_user: The current user.
         :type current_user: User
         :return: The retrieved contact.
@@ -76,9 +283,9 @@ async def read_contact(contact_id: int, db: Session = Depends(get_db),
 
 
 @router.put("/{contact_id}", response_model=ContactResponse, description='No more than 10 request per minute',
-            dependencies=[Depends(RateLimiter(times=10, seconds=60))])
+            dependencies=[rate_limit("update_contact")])
 async def update_contact(contact_id: int, updated_contact: ContactRequest,
-                         db: Session = Depends(get_db), current_user: User = Depends(auth_service.get_current_user)):
+                         db: AsyncSession = Depends(get_db), current_user: User = Depends(auth_service.get_current_user)):
     """
         Update a contact by its ID.
 
@@ -87,19 +294,20 @@ async def update_contact(contact_id: int, updated_contact: ContactRequest,
         :param updated_contact: The updated contact data.
         :type updated_contact: ContactRequest
         :param db: The database session.
-        :type db: Session
+        :type db: AsyncSession
         :param current_user: The current user.
         :type current_user: User
         :return: The updated contact.
         :rtype: ContactResponse
     """
     contact = await repository_contacts.update_contact(contact_id, updated_contact, db, current_user)
+    await birthday_digest.invalidate(current_user.id)
     return contact
 
 
 @router.delete("/{contact_id}", response_model=ContactResponse, description='No more than 10 request per minute',
-               dependencies=[Depends(RateLimiter(times=10, seconds=60))])
-async def delete_contact(contact_id: int, db: Session = Depends(get_db),
+               dependencies=[rate_limit("delete_contact")])
+async def delete_contact(contact_id: int, db: AsyncSession = Depends(get_db),
                          current_user: User = Depends(auth_service.get_current_user)):
     """
         Delete a contact by its ID.
@@ -107,56 +315,35 @@ async def delete_contact(contact_id: int, db: Session = Depends(get_db),
         :param contact_id: The ID of the contact to delete.
         :type contact_id: int
         :param db: The database session.
-        :type db: Session
+        :type db: AsyncSession
         :param current_user: The current user.
         :type current_user: User
         :return: The deleted contact.
         :rtype: ContactResponse
     """
     contact = await repository_contacts.delete_contact(contact_id, db, current_user)
+    await birthday_digest.invalidate(current_user.id)
     return contact
 
 
-@router.get("/search", response_model=List[ContactResponse], description='No more than 10 request per minute',
-            dependencies=[Depends(RateLimiter(times=10, seconds=60))])
-async def search_contacts(
-        q: str = Query(..., description="Search query for name, last name, or email"),
-        skip: int = 0, limit: int = 10, db: Session = Depends(get_db),
-        current_user: User = Depends(auth_service.get_current_user)
-):
-    """
-        Search contacts by name, last name, or email with specified pagination parameters.
-
-        :param q: The search query.
-        :type q: str
-        :param skip: The number of contacts to skip.
-        :type skip: int
-        :param limit: The maximum number of contacts to return.
-        :type limit: int
-        :param db: The database session.
-        :type db: Session
-        :param current_user: The current user.
-        :type current_user: User
-        :return: A list of contacts matching the search query.
-        :rtype: List[ContactResponse]
-    """
-    contacts = await repository_contacts.search_contacts(q, skip, limit, db, current_user)
-    return contacts
-
-
 @router.get("/birthdays/", response_model=List[ContactResponse], description='No more than 10 request per minute',
-            dependencies=[Depends(RateLimiter(times=10, seconds=60))])
-async def upcoming_birthdays(db: Session = Depends(get_db),
+            dependencies=[rate_limit("upcoming_birthdays")])
+async def upcoming_birthdays(days: int = Query(7, ge=1, le=364, description="Look-ahead window in days"),
+                             db: AsyncSession = Depends(get_db),
                              current_user: User = Depends(auth_service.get_current_user)):
     """
         Retrieve a list of upcoming birthdays for the current user.
 
+        Served from the per-user daily digest in Redis; the database is queried only on a miss.
+
+        :param days: How many days after today to look ahead.
+        :type days: int
         :param db: The database session.
-        :type db: Session
+        :type db: AsyncSession
         :param current_user: The current user.
         :type current_user: User
         :return: A list of contacts with upcoming birthdays.
         :rtype: List[ContactResponse]
     """
-    upcoming_birthdays_this_year = await repository_contacts.upcoming_birthdays(db, current_user)
+    upcoming_birthdays_this_year = await birthday_digest.get(db, current_user, days)
     return upcoming_birthdays_this_year
@@ -0,0 +1,116 @@
+import hmac
+
+from fastapi import APIRouter, Depends, HTTPException, Security, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+
+from src.conf.config import settings
+from src.db.db_connect import engine
+from src.db.pool import pool_status
+from src.middlewares.ban_lists import ban_lists
+from src.schemas import BanListStatsResponse, EmailQueueStatsResponse, PasswordHasherStatusResponse, \
+    PoolStatusResponse, RateLimiterStatsResponse, TokenCacheStatsResponse, UserCacheStatsResponse
+from src.services.email import email_queue
+from src.services.hashing import password_hasher
+from src.services.rate_limit import rate_limiter
+from src.services.token_cache import verified_claims
+from src.services.user_cache import local_users
+
+security = HTTPBearer(auto_error=False)
+
+
+async def verify_metrics_token(credentials: HTTPAuthorizationCredentials | None = Security(security)):
+    """
+        Admit only scrapers presenting ``METRICS_TOKEN`` as a bearer token.
+
+        The metrics expose internal state of the worker, so they are disabled while no token is configured.
+
+        :param credentials: The bearer credentials of the request, if any.
+        :type credentials: HTTPAuthorizationCredentials | None
+        :raise HTTPException: 404 if no token is configured, 401 if the token is missing or wrong.
+    """
+    if not settings.metrics_token:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if credentials is None or not hmac.compare_digest(credentials.credentials.encode(),
+                                                      settings.metrics_token.encode()):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid metrics token",
+                            headers={"WWW-Authenticate": "Bearer"})
+
+
+router = APIRouter(prefix="/metrics", tags=["metrics"], dependencies=[Depends(verify_metrics_token)])
+
+
+@router.get("/db-pool", response_model=PoolStatusResponse, include_in_schema=False)
+async def db_pool_metrics():
+    """
+        Report the database connection pool occupancy and checkout wait statistics.
+
+        :return: Checked-out, idle and overflow connections and cumulative wait time.
+        :rtype: PoolStatusResponse
+    """
+    return pool_status(engine.pool)
+
+
+@router.get("/user-cache", response_model=UserCacheStatsResponse, include_in_schema=False)
+async def user_cache_metrics():
+    """
+        Report hit, miss, eviction and invalidation counters of this worker's local user cache.
+
+        :return: The local user cache counters.
+        :rtype: UserCacheStatsResponse
+    """
+    return local_users.stats()
+
+
+@router.get("/token-cache", response_model=TokenCacheStatsResponse, include_in_schema=False)
+async def token_cache_metrics():
+    """
+        Report hit, miss, eviction and revocation counters of this worker's verified token claims cache.
+
+        :return: The token claims cache counters.
+        :rtype: TokenCacheStatsResponse
+    """
+    return verified_claims.stats()
+
+
+@router.get("/password-hasher", response_model=PasswordHasherStatusResponse, include_in_schema=False)
+async def password_hasher_metrics():
+    """
+        Report queue depth, rejections and hash latency of this worker's password hashing pool.
+
+        :return: The password hashing pool counters.
+        :rtype: PasswordHasherStatusResponse
+    """
+    return password_hasher.stats()
+
+
+@router.get("/email-queue", response_model=EmailQueueStatsResponse, include_in_schema=False)
+async def email_queue_metrics():
+    """
+        Report queue length, deliveries, retries and dead letters of this worker's email queue.
+
+        :return: The email queue counters.
+        :rtype: EmailQueueStatsResponse
+    """
+    return email_queue.stats()
+
+
+@router.get("/ban-lists", response_model=BanListStatsResponse, include_in_schema=False)
+async def ban_lists_metrics():
+    """
+        Report the version and size of the ban lists this worker currently enforces.
+
+        :return: The ban list version, rule counts and reload counters.
+        :rtype: BanListStatsResponse
+    """
+    return ban_lists.stats()
+
+
+@router.get("/rate-limiter", response_model=RateLimiterStatsResponse, include_in_schema=False)
+async def rate_limiter_metrics():
+    """
+        Report bucket count, admitted and rejected requests and Redis settlements of this worker's rate limiter.
+
+        :return: The rate limiter counters.
+        :rtype: RateLimiterStatsResponse
+    """
+    return rate_limiter.stats()
@@ -1,13 +1,11 @@
 from fastapi import APIRouter, Depends, status, UploadFile, File
-from sqlalchemy.orm import Session
-import cloudinary
-import cloudinary.uploader
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.db.db_connect import get_db
 from src.db.models import User
 from src.repository import users as repository_users
 from src.services.auth import auth_service
-from src.conf.config import settings
+from src.services.avatars import avatars
 from src.schemas import UserDb
 
 router = APIRouter(prefix="/users", tags=["users"])
@@ -28,28 +26,24 @@ async def read_users_me(current_user: User = Depends(auth_service.get_current_us
 
 @router.patch('/avatar', response_model=UserDb)
 async def update_avatar_user(file: UploadFile = File(), current_user: User = Depends(auth_service.get_current_user),
-                             db: Session = Depends(get_db)):
+                             db: AsyncSession = Depends(get_db)):
     """
         Update the current user's avatar.
 
+        The image is stored under its content hash, so uploading the same image again is free.
+
         :param file: The uploaded image file.
         :type file: UploadFile
         :param current_user: The current user.
         :type current_user: User
         :param db: The database session.
-        :type db: Session
+        :type db: AsyncSession
         :return: The updated user profile.
         :rtype: UserDb
+        :raises HTTPException: 415 for non-image uploads, 413 for oversized ones.
     """
-    cloudinary.config(
-        cloud_name=settings.cloudinary_name,
-        api_key=settings.cloudinary_api_key,
-        api_secret=settings.cloudinary_api_secret,
-        secure=True
-    )
-
-    r = cloudinary.uploader.upload(file.file, public_id=f'NotesApp/{current_user.username}', overwrite=True)
-    src_url = cloudinary.CloudinaryImage(f'NotesApp/{current_user.username}')\
-                        .build_url(width=250, height=250, crop='fill', version=r.get('version'))
-    user = await repository_users.update_avatar(current_user.email, src_url, db)
+    url = await avatars.store(file)
+    if url == current_user.avatar:
+        return current_user
+    user = await repository_users.update_avatar(current_user.email, url, db)
     return user
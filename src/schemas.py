@@ -53,6 +53,35 @@ class ContactResponse(BaseModel):
     birthday: date
 
 
+class ContactPatch(BaseModel):
+    id: int
+    first_name: str | None = None
+    last_name: str | None = None
+    email: EmailStr | None = None
+    phone_number: str | None = None
+    birthday: date | None = None
+
+
+class ContactBatchUpdate(BaseModel):
+    contacts: list[ContactPatch] = Field(min_length=1, max_length=1000)
+
+
+class ContactBatchDelete(BaseModel):
+    ids: list[int] = Field(min_length=1, max_length=1000)
+
+
+class ContactImportError(BaseModel):
+    row: int
+    detail: str
+
+
+class ContactImportResponse(BaseModel):
+    imported: int
+    duplicates: int
+    invalid: int
+    errors: list[ContactImportError]
+
+
 # ------------------------------EMAIL SCHEMA------------------------------
 class RequestEmail(BaseModel):
     email: EmailStr
@@ -65,3 +94,78 @@ class UserResetPasswordRequest(BaseModel):
 class UserNewPassword(BaseModel):
     new_password: str
 
+
+# ------------------------------METRICS SCHEMA------------------------------
+class PoolStatusResponse(BaseModel):
+    size: int
+    checked_out: int
+    idle: int
+    overflow: int
+    checkouts: int
+    timeouts: int
+    wait_seconds_total: float
+    wait_seconds_max: float
+
+
+class UserCacheStatsResponse(BaseModel):
+    size: int
+    maxsize: int
+    hits: int
+    misses: int
+    evictions: int
+    invalidations: int
+
+
+class TokenCacheStatsResponse(BaseModel):
+    size: int
+    maxsize: int
+    hits: int
+    misses: int
+    evictions: int
+    revocations: int
+
+
+class PasswordHasherStatusResponse(BaseModel):
+    workers: int
+    queue_limit: int
+    in_flight: int
+    queue_depth: int
+    completed: int
+    rejected: int
+    queue_seconds_total: float
+    hash_seconds_total: float
+    hash_seconds_max: float
+
+
+class EmailQueueStatsResponse(BaseModel):
+    queued: int
+    dead_letters: int
+    enqueued: int
+    sent: int
+    retried: int
+    dead: int
+    batches: int
+    connects: int
+    send_seconds_total: float
+
+
+class BanListStatsResponse(BaseModel):
+    version: int | None
+    allow_rules: int
+    deny_rules: int
+    user_agent_patterns: int
+    user_agent_cache_hits: int
+    user_agent_cache_misses: int
+    reloads: int
+    failures: int
+
+
+class RateLimiterStatsResponse(BaseModel):
+    buckets: int
+    maxsize: int
+    pending: int
+    allowed: int
+    rejected: int
+    settles: int
+    settled_buckets: int
+    sync_failures: int
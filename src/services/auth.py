@@ -1,17 +1,22 @@
+import calendar
 from typing import Optional
-import pickle
+from uuid import uuid4
 
 import redis.asyncio as redis
-from jose import JWTError, jwt
+from jose import JWTError
 from fastapi import HTTPException, status, Depends
 from fastapi.security import OAuth2PasswordBearer
-from passlib.context import CryptContext
 from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.db.db_connect import get_db
 from src.repository import users as repository_users
 from src.conf.config import settings
+from src.services.hashing import password_context, password_hasher
+from src.services.keyring import keyring
+from src.services.refresh_tokens import RefreshTokenStore, refresh_tokens
+from src.services.token_cache import verified_claims
+from src.services.user_cache import CachedUser, local_users
 
 
 class Auth:
@@ -20,21 +25,23 @@ class Auth:
 
     Attributes:
         pwd_context (CryptContext): The password hashing context.
-        SECRET_KEY (str): The secret key used for token encryption.
-        ALGORITHM (str): The encryption algorithm used for token encoding.
+        keyring (Keyring): The keys used to sign and verify tokens.
         oauth2_scheme (OAuth2PasswordBearer): The OAuth2 password bearer scheme.
         r (redis.Redis): The Redis client for caching user data.
+        claims (ClaimsCache): The cache of verified access token claims.
+        refresh_tokens (RefreshTokenStore): The registry of refresh token families.
     """
 
-    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-    SECRET_KEY = settings.secret_key
-    ALGORITHM = settings.algorithm
+    pwd_context = password_context()
+    keyring = keyring
     oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
     r = redis.Redis(host=settings.redis_host, port=settings.redis_port, db=0)
+    claims = verified_claims
+    refresh_tokens = refresh_tokens
 
-    def verify_password(self, plain_password, hashed_password):
+    async def verify_password(self, plain_password, hashed_password):
         """
-        Verify a plaintext password against a hashed password
+        Verify a plaintext password against a hashed password on the password hashing pool
 
         Args:
             plain_password (str): The plaintext password.
@@ -42,20 +49,42 @@ class Auth:
 
         Returns:
             bool: True if the passwords match, False otherwise.
+
+        Raises:
+            HTTPException: 503 if the password hashing pool is saturated.
+        """
+        return await password_hasher.run(self.pwd_context.verify, plain_password, hashed_password)
+
+    async def verify_and_update_password(self, plain_password, hashed_password):
+        """
+        Verify a plaintext password and rehash it if the stored hash uses an outdated scheme or cost
+
+        Args:
+            plain_password (str): The plaintext password.
+            hashed_password (str): The hashed password
+
+        Returns:
+            tuple[bool, str | None]: Whether the passwords match, and the new hash to store or None.
+
+        Raises:
+            HTTPException: 503 if the password hashing pool is saturated.
         """
-        return self.pwd_context.verify(plain_password, hashed_password)
+        return await password_hasher.run(self.pwd_context.verify_and_update, plain_password, hashed_password)
 
-    def get_password_hash(self, password: str):
+    async def get_password_hash(self, password: str):
         """
-        Generate a password hash for a given plaintext password
+        Generate a password hash for a given plaintext password on the password hashing pool
 
         Args:
             password (str): The plaintext password
 
         Returns:
             str: The hashed password.
+
+        Raises:
+            HTTPException: 503 if the password hashing pool is saturated.
         """
-        return self.pwd_context.hash(password)
+        return await password_hasher.run(self.pwd_context.hash, password)
 
     async def create_access_token(self, data: dict, expires_delta: Optional[float] = None):
         """
@@ -74,12 +103,12 @@ class Auth:
         else:
             expire = datetime.utcnow() + timedelta(minutes=15)
         to_encode.update({"iat": datetime.utcnow(), "exp": expire, "scope": "access_token"})
-        encoded_access_token = jwt.encode(to_encode, self.SECRET_KEY, algorithm=self.ALGORITHM)
+        encoded_access_token = self.keyring.encode(to_encode)
         return encoded_access_token
 
     async def create_refresh_token(self, data: dict, expires_delta: Optional[float] = None):
         """
-        Create a refresh token
+        Create a refresh token that starts a new token family
 
         Args:
             data (dict): The data to include in the token payload.
@@ -88,16 +117,57 @@ class Auth:
         Returns:
             str: The encoded refresh token.
         """
+        to_encode = self.refresh_token_payload(data, uuid4().hex, expires_delta)
+        encoded_refresh_token = self.keyring.encode(to_encode)
+        await self.refresh_tokens.start(to_encode)
+        return encoded_refresh_token
+
+    def refresh_token_payload(self, data: dict, family: str, expires_delta: Optional[float] = None):
+        """
+        Build the claims of a refresh token belonging to a token family
+
+        Args:
+            data (dict): The data to include in the token payload.
+            family (str): The token family ID.
+            expires_delta (float, optional): The token expiration time in seconds
+
+        Returns:
+            dict: The claims, with ``exp`` in unix seconds so it can be reused as the Redis expiry.
+        """
         to_encode = data.copy()
         if expires_delta:
             expire = datetime.utcnow() + timedelta(seconds=expires_delta)
         else:
             expire = datetime.utcnow() + timedelta(days=7)
-        to_encode.update({"iat": datetime.utcnow(), "exp": expire, "scope": "refresh_token"})
-        encoded_refresh_token = jwt.encode(to_encode, self.SECRET_KEY, algorithm=self.ALGORITHM)
-        return encoded_refresh_token
+        to_encode.update({"iat": datetime.utcnow(), "exp": calendar.timegm(expire.utctimetuple()),
+                          "scope": "refresh_token", "jti": uuid4().hex, "fam": family})
+        return to_encode
 
-    async def decode_refresh_token(self, refresh_token: str):
+    async def rotate_refresh_token(self, refresh_token: str):
+        """
+        Exchange a refresh token for the next token of its family
+
+        Presenting a token that was already exchanged revokes the whole family, so a stolen
+        refresh token stops working for both the thief and the victim.
+
+        Args:
+            refresh_token (str): The refresh token to exchange
+
+        Returns:
+            tuple[str, str]: The email associated with the token and the new refresh token.
+
+        Raises:
+            HTTPException: If the token is invalid, expired, revoked or reused.
+        """
+        payload = await self.refresh_token_claims(refresh_token)
+        if "fam" not in payload or "jti" not in payload:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Invalid refresh token')
+        to_encode = self.refresh_token_payload({"sub": payload["sub"]}, payload["fam"])
+        if await self.refresh_tokens.rotate(payload, to_encode) != RefreshTokenStore.ROTATED:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Invalid refresh token')
+        return payload["sub"], self.keyring.encode(to_encode)
+
+    async def refresh_token_claims(self, refresh_token: str):
         """
         Decode and validate a refresh token
 
@@ -105,30 +175,45 @@ class Auth:
             refresh_token (str): The refresh token to decode
 
         Returns:
-            str: The email associated with the token
+            dict: The token claims
 
         Raises:
             HTTPException: If the token is invalid or has an invalid scope.
         """
         try:
-            payload = jwt.decode(refresh_token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
+            payload = self.keyring.decode(refresh_token)
             if payload['scope'] == 'refresh_token':
-                email = payload['sub']
-                return email
+                return payload
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Invalid scope for token')
         except JWTError:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Could not validate credentials')
 
-    async def get_current_user(self, token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    async def decode_refresh_token(self, refresh_token: str):
+        """
+        Decode and validate a refresh token
+
+        Args:
+            refresh_token (str): The refresh token to decode
+
+        Returns:
+            str: The email associated with the token
+
+        Raises:
+            HTTPException: If the token is invalid or has an invalid scope.
+        """
+        payload = await self.refresh_token_claims(refresh_token)
+        return payload['sub']
+
+    async def get_current_user(self, token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
         """
         Get the current user based on the access token
 
         Args:
             token (str): The access token to decode.
-            db (Session): The database session
+            db (AsyncSession): The database session
 
         Returns:
-            User: The current user
+            CachedUser: Read-only projection of the current user
 
         Raises:
             HTTPException: If the token is invalid or the user cannot be found.
@@ -139,25 +224,28 @@ class Auth:
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-        try:
-            payload = jwt.decode(token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
-            if payload['scope'] == 'access_token':
-                email = payload["sub"]
-                if email is None:
+        payload = self.claims.get(token)
+        if payload is None:
+            try:
+                payload = self.keyring.decode(token)
+                if payload['scope'] != 'access_token' or payload["sub"] is None:
                     raise credentials_exception
-            else:
+            except JWTError as e:
                 raise credentials_exception
-        except JWTError as e:
-            raise credentials_exception
-        user = await self.r.get(f"user:{email}")
+            self.claims.set(token, payload)
+        email = payload["sub"]
+        user = local_users.get(email)
+        if user is not None:
+            return user
+        payload = await self.r.get(f"user:{email}")
+        user = CachedUser.loads(payload) if payload is not None else None
         if user is None:
-            user = await repository_users.get_user_by_email(email, db)
-            if user is None:
+            db_user = await repository_users.get_user_by_email(email, db)
+            if db_user is None:
                 raise credentials_exception
-            await self.r.set(f"user:{email}", pickle.dumps(user))
-            await self.r.expire(f"user:{email}", 900)
-        else:
-            user = pickle.loads(user)
+            user = CachedUser.from_user(db_user)
+            await self.r.set(f"user:{email}", user.dumps(), ex=900)
+        local_users.set(email, user)
         return user
 
     def create_email_token(self, data: dict):
@@ -173,7 +261,7 @@ class Auth:
         to_encode = data.copy()
         expire = datetime.utcnow() + timedelta(days=2)
         to_encode.update({"iat": datetime.utcnow(), "exp": expire})
-        token = jwt.encode(to_encode, self.SECRET_KEY, algorithm=self.ALGORITHM)
+        token = self.keyring.encode(to_encode)
         return token
 
     async def get_email_from_token(self, token: str):
@@ -190,7 +278,7 @@ class Auth:
             HTTPException: If the token is invalid.
         """
         try:
-            payload = jwt.decode(token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
+            payload = self.keyring.decode(token)
             email = payload["sub"]
             return email
         except JWTError as e:
@@ -0,0 +1,132 @@
+import contextlib
+import os
+import shutil
+import tempfile
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import BinaryIO
+
+import cloudinary
+import cloudinary.uploader
+import redis.asyncio as redis
+from starlette.concurrency import run_in_threadpool
+
+from src.conf.config import settings
+
+
+class AvatarStorage(ABC):
+    """
+    Interface of an avatar storage backend.
+
+    Avatars are stored under content-addressed keys, so a key that already exists never has to be
+    uploaded again. Implementations must not block the event loop.
+    """
+
+    @abstractmethod
+    async def url(self, key: str) -> str | None:
+        """
+        Return the public URL of a stored avatar
+
+        Args:
+            key (str): The content-addressed key, e.g. ``<sha256>-250.png``.
+
+        Returns:
+            str | None: The URL, or None if nothing is stored under the key.
+        """
+
+    @abstractmethod
+    async def save(self, key: str, file: BinaryIO, content_type: str) -> str:
+        """
+        Store an avatar
+
+        Args:
+            key (str): The content-addressed key.
+            file (BinaryIO): The image data, positioned at the start.
+            content_type (str): The image MIME type.
+
+        Returns:
+            str: The public URL of the stored avatar.
+        """
+
+
+class LocalAvatarStorage(AvatarStorage):
+    """
+    Stores avatars as files in a local directory, served under ``base_url``.
+
+    Attributes:
+        root (Path): The directory holding the files.
+        base_url (str): The URL prefix the directory is served under.
+    """
+
+    def __init__(self, root: str, base_url: str):
+        self.root = Path(root)
+        self.base_url = base_url.rstrip("/") + "/"
+
+    async def url(self, key: str) -> str | None:
+        exists = await run_in_threadpool((self.root / key).exists)
+        return self.base_url + key if exists else None
+
+    async def save(self, key: str, file: BinaryIO, content_type: str) -> str:
+        await run_in_threadpool(self._write, key, file)
+        return self.base_url + key
+
+    def _write(self, key: str, file: BinaryIO) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        path = self.root / key
+        # Write to a unique temporary file first so a concurrent reader never sees a partial image
+        # and identical uploads saved at the same time do not write into the same file.
+        target = tempfile.NamedTemporaryFile(dir=self.root, prefix=f".{key}.", suffix=".partial", delete=False)
+        try:
+            with target:
+                shutil.copyfileobj(file, target)
+            # Temporary files are private; avatars are served, possibly by another process.
+            os.chmod(target.name, 0o644)
+            os.replace(target.name, path)
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(target.name)
+            raise
+
+
+class CloudinaryAvatarStorage(AvatarStorage):
+    """
+    Stores avatars in Cloudinary, with a Redis index of the keys already uploaded.
+
+    Attributes:
+        folder (str): The Cloudinary folder of the avatars.
+        transformation (dict): URL transformation applied when delivering the image.
+        r (redis.Redis): The Redis client holding the key → URL index.
+    """
+
+    def __init__(self, folder: str, transformation: dict, r: redis.Redis):
+        cloudinary.config(cloud_name=settings.cloudinary_name, api_key=settings.cloudinary_api_key,
+                          api_secret=settings.cloudinary_api_secret, secure=True)
+        self.folder = folder
+        self.transformation = transformation
+        self.r = r
+
+    async def url(self, key: str) -> str | None:
+        url = await self.r.get(f"avatar:{key}")
+        return url.decode() if url is not None else None
+
+    async def save(self, key: str, file: BinaryIO, content_type: str) -> str:
+        public_id = f"{self.folder}/{Path(key).stem}"
+        result = await run_in_threadpool(cloudinary.uploader.upload, file, public_id=public_id, overwrite=False)
+        url = cloudinary.CloudinaryImage(public_id).build_url(version=result.get("version"), **self.transformation)
+        await self.r.set(f"avatar:{key}", url)
+        return url
+
+
+def avatar_storage() -> AvatarStorage:
+    """
+    Build the storage backend selected by ``AVATAR_STORAGE``
+
+    Returns:
+        AvatarStorage: The configured backend.
+    """
+    if settings.avatar_storage == "local":
+        return LocalAvatarStorage(settings.avatar_local_dir, settings.avatar_base_url)
+    # Resized avatars are stored at their final size; otherwise Cloudinary crops on delivery.
+    transformation = {} if settings.avatar_resize else {"width": 250, "height": 250, "crop": "fill"}
+    return CloudinaryAvatarStorage("NotesApp/avatars", transformation,
+                                   redis.Redis(host=settings.redis_host, port=settings.redis_port, db=0))
@@ -0,0 +1,144 @@
+import hashlib
+import io
+from tempfile import SpooledTemporaryFile
+from typing import BinaryIO
+
+from fastapi import HTTPException, UploadFile, status
+from PIL import Image, ImageOps, UnidentifiedImageError
+from starlette.concurrency import run_in_threadpool
+
+from src.conf.config import settings
+from src.services.avatar_storage import AvatarStorage, avatar_storage
+
+AVATAR_SIZE = (250, 250)
+CHUNK_SIZE = 64 * 1024
+# Raster formats accepted as avatars, with the content type and extension they are stored under.
+# Anything else, SVG in particular, could carry script and is never served from our origin.
+AVATAR_FORMATS = {
+    "PNG": ("image/png", ".png"),
+    "JPEG": ("image/jpeg", ".jpg"),
+    "GIF": ("image/gif", ".gif"),
+    "WEBP": ("image/webp", ".webp"),
+}
+
+
+def identify_avatar(file: BinaryIO) -> str:
+    """
+        Decode an uploaded image far enough to tell its format. Blocking; run it off the event loop.
+
+        :param file: The uploaded image, rewound afterwards.
+        :type file: BinaryIO
+        :return: The Pillow format name, one of ``AVATAR_FORMATS``.
+        :rtype: str
+        :raises HTTPException: 415 if the data is not a readable image in an accepted format.
+    """
+    try:
+        with Image.open(file, formats=tuple(AVATAR_FORMATS)) as image:
+            image.verify()
+            image_format = image.format
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, SyntaxError):
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail="Unsupported image")
+    finally:
+        file.seek(0)
+    return image_format
+
+
+def resize_avatar(file: BinaryIO) -> io.BytesIO:
+    """
+        Crop and scale an image to a 250x250 PNG. Blocking; run it off the event loop.
+
+        :param file: The uploaded image.
+        :type file: BinaryIO
+        :return: The resized PNG image.
+        :rtype: io.BytesIO
+        :raises HTTPException: 415 if the data is not a readable image in an accepted format.
+    """
+    try:
+        with Image.open(file, formats=tuple(AVATAR_FORMATS)) as image:
+            image = ImageOps.exif_transpose(image)
+            fitted = ImageOps.fit(image.convert("RGBA"), AVATAR_SIZE, Image.Resampling.LANCZOS)
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError):
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail="Unsupported image")
+    output = io.BytesIO()
+    fitted.save(output, format="PNG", optimize=True)
+    output.seek(0)
+    return output
+
+
+class AvatarService:
+    """
+    Stores uploaded avatars under the SHA-256 of their content.
+
+    The upload is streamed in chunks into a spooled temporary file while it is hashed, so large
+    files never sit in memory whole; an image that was uploaded before is not resized or stored
+    again. Every upload is decoded with Pillow, and an original is stored with the content type
+    and extension of its decoded format, never the ones the client claimed. Decoding, resizing
+    and storage run off the event loop.
+
+    Attributes:
+        storage (AvatarStorage): The storage backend.
+        resize (bool): Whether to store a 250x250 PNG instead of the original image.
+        max_bytes (int): The largest accepted upload.
+    """
+
+    def __init__(self, storage: AvatarStorage, resize: bool, max_bytes: int):
+        self.storage = storage
+        self.resize = resize
+        self.max_bytes = max_bytes
+
+    async def store(self, file: UploadFile) -> str:
+        """
+        Store an uploaded avatar, reusing an identical earlier upload
+
+        Args:
+            file (UploadFile): The uploaded image.
+
+        Returns:
+            str: The public URL of the avatar.
+
+        Raises:
+            HTTPException: 415 for non-image uploads, 413 for uploads over ``max_bytes``.
+        """
+        content_type = file.content_type or ""
+        if not content_type.startswith("image/"):
+            raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail="Unsupported image")
+        with SpooledTemporaryFile(max_size=1024 * 1024) as buffer:
+            digest = await self.spool(file, buffer)
+            if self.resize:
+                key, content_type = f"{digest}-{AVATAR_SIZE[0]}.png", "image/png"
+            else:
+                content_type, extension = AVATAR_FORMATS[await run_in_threadpool(identify_avatar, buffer)]
+                key = digest + extension
+            url = await self.storage.url(key)
+            if url is not None:
+                return url
+            data = await run_in_threadpool(resize_avatar, buffer) if self.resize else buffer
+            return await self.storage.save(key, data, content_type)
+
+    async def spool(self, file: UploadFile, buffer: BinaryIO) -> str:
+        """
+        Copy an upload into ``buffer`` chunk by chunk, hashing it on the way
+
+        Args:
+            file (UploadFile): The uploaded file.
+            buffer (BinaryIO): The file to copy into, rewound afterwards.
+
+        Returns:
+            str: The hex SHA-256 of the content.
+
+        Raises:
+            HTTPException: 413 if the upload is larger than ``max_bytes``.
+        """
+        digest = hashlib.sha256()
+        size = 0
+        while chunk := await file.read(CHUNK_SIZE):
+            size += len(chunk)
+            if size > self.max_bytes:
+                raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Image is too large")
+            digest.update(chunk)
+            buffer.write(chunk)
+        buffer.seek(0)
+        return digest.hexdigest()
+
+
+avatars = AvatarService(avatar_storage(), settings.avatar_resize, settings.avatar_max_bytes)
@@ -0,0 +1,147 @@
+import asyncio
+from datetime import date, datetime, time, timedelta
+
+import redis.asyncio as redis
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.conf.config import settings
+from src.db.db_connect import AsyncSessionLocal
+from src.db.models import User
+from src.repository import contacts as repository_contacts
+from src.schemas import ContactResponse
+
+# Stores a digest only if the user's generation counter still holds the value read before the
+# digest was computed; ``invalidate`` bumps it, so a digest built from stale contacts is dropped.
+STORE_SCRIPT = """
+if (redis.call('GET', KEYS[1]) or '0') ~= ARGV[1] then
+    return 0
+end
+redis.call('HSET', KEYS[2], ARGV[2], ARGV[3])
+redis.call('EXPIREAT', KEYS[2], ARGV[4])
+return 1
+"""
+# A counter that expired reads as 0, which also fails the check of a build still in flight.
+GENERATION_TTL = timedelta(days=2)
+
+
+class BirthdayDigest:
+    """
+    Per-user daily cache of upcoming birthdays stored in Redis.
+
+    Each user has one Redis hash per day (``birthdays:<user_id>:<YYYY-MM-DD>``) whose fields are
+    look-ahead windows in days and whose values are the serialized contact lists. The hash
+    expires shortly after midnight, and is dropped whenever the user's contacts change. A change
+    also bumps the user's generation counter, so a digest computed before it is not written after
+    the drop.
+
+    Attributes:
+        r (redis.Redis): The Redis client holding the digests.
+        adapter (TypeAdapter): Serializer for lists of ContactResponse.
+    """
+
+    r = redis.Redis(host=settings.redis_host, port=settings.redis_port, db=0)
+    adapter = TypeAdapter(list[ContactResponse])
+
+    @staticmethod
+    def key(user_id: int, day: date) -> str:
+        """
+        Build the Redis key of a user's digest for a given day
+
+        Args:
+            user_id (int): The owner of the contacts.
+            day (date): The day the digest is valid for.
+
+        Returns:
+            str: The Redis key.
+        """
+        return f"birthdays:{user_id}:{day.isoformat()}"
+
+    @staticmethod
+    def generation_key(user_id: int) -> str:
+        return f"birthdays:{user_id}:generation"
+
+    async def get(self, db: AsyncSession, current_user: User, days: int = 7) -> list[ContactResponse]:
+        """
+        Return today's upcoming birthdays, computing and caching them on a miss
+
+        Args:
+            db (AsyncSession): The database session, used only on a cache miss.
+            current_user (User): The current user.
+            days (int): How many days after today to look ahead.
+
+        Returns:
+            list[ContactResponse]: Contacts with upcoming birthdays.
+        """
+        key = self.key(current_user.id, date.today())
+        cached = await self.r.hget(key, str(days))
+        if cached is not None:
+            return self.adapter.validate_json(cached)
+        return await self.build(db, current_user, days)
+
+    async def build(self, db: AsyncSession, current_user: User, days: int = 7) -> list[ContactResponse]:
+        """
+        Compute the digest from the database and store it until the end of the day
+
+        Args:
+            db (AsyncSession): The database session.
+            current_user (User): The current user.
+            days (int): How many days after today to look ahead.
+
+        Returns:
+            list[ContactResponse]: Contacts with upcoming birthdays.
+        """
+        today = date.today()
+        generation_key = self.generation_key(current_user.id)
+        generation = await self.r.get(generation_key) or b"0"
+        contacts = await repository_contacts.upcoming_birthdays(db, current_user, days)
+        digest = self.adapter.validate_python(contacts, from_attributes=True)
+        key = self.key(current_user.id, today)
+        expire_at = datetime.combine(today + timedelta(days=1), time()) + timedelta(minutes=5)
+        await self.r.eval(STORE_SCRIPT, 2, generation_key, key, generation, str(days), self.adapter.dump_json(digest),
+                          int(expire_at.timestamp()))
+        return digest
+
+    async def invalidate(self, user_id: int) -> None:
+        """
+        Drop today's digest of a user after one of their contacts changed
+
+        Args:
+            user_id (int): The owner of the changed contact.
+        """
+        generation_key = self.generation_key(user_id)
+        async with self.r.pipeline(transaction=True) as pipe:
+            pipe.incr(generation_key)
+            pipe.expire(generation_key, GENERATION_TTL)
+            pipe.delete(self.key(user_id, date.today()))
+            await pipe.execute()
+
+    async def warm_all(self, db: AsyncSession, days: int = 7) -> int:
+        """
+        Precompute today's digest for every user, meant to run from a nightly job
+
+        Args:
+            db (AsyncSession): The database session.
+            days (int): How many days after today to look ahead.
+
+        Returns:
+            int: Number of users warmed.
+        """
+        users = (await db.execute(select(User))).scalars().all()
+        for user in users:
+            await self.build(db, user, days)
+        return len(users)
+
+
+birthday_digest = BirthdayDigest()
+
+
+async def main():
+    async with AsyncSessionLocal() as db:
+        warmed = await birthday_digest.warm_all(db)
+    print(f"Warmed birthday digests for {warmed} users")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,11 +1,10 @@
-from pathlib import Path
-
-from fastapi_mail import FastMail, MessageSchema, ConnectionConfig, MessageType
-from fastapi_mail.errors import ConnectionErrors
+from fastapi_mail import ConnectionConfig
 from pydantic import EmailStr
 
 from src.conf.config import settings
 from src.services.auth import auth_service
+from src.services.email_queue import EmailJob, EmailQueue
+from src.services.email_templates import TEMPLATE_FOLDER
 
 conf = ConnectionConfig(
     MAIL_USERNAME=settings.mail_username,
@@ -18,13 +17,19 @@ conf = ConnectionConfig(
     MAIL_SSL_TLS=True,
     USE_CREDENTIALS=True,
     VALIDATE_CERTS=True,
-    TEMPLATE_FOLDER=Path(__file__).parent / 'templates',
+    TEMPLATE_FOLDER=TEMPLATE_FOLDER,
 )
 
+email_queue = EmailQueue(conf, maxsize=settings.email_queue_size, batch_size=settings.email_batch_size,
+                         max_attempts=settings.email_max_attempts, retry_backoff=settings.email_retry_backoff,
+                         idle_timeout=settings.email_idle_timeout, dead_letter_size=settings.email_dead_letter_size)
+
 
 async def send_confirm_email(email: EmailStr, username: str, host: str):
     """
-        Send a confirmation email for email verification.
+        Queue a confirmation email for email verification.
+
+        The message is delivered by the background email worker, so this returns immediately.
 
         :param email: The recipient's email address.
         :type email: EmailStr
@@ -33,24 +38,17 @@ async def send_confirm_email(email: EmailStr, username: str, host: str):
         :param host: The host URL for generating email confirmation links.
         :type host: str
     """
-    try:
-        token_verification = auth_service.create_email_token({"sub": email})
-        message = MessageSchema(
-            subject="Confirm your email ",
-            recipients=[email],
-            template_body={"host": host, "username": username, "token": token_verification},
-            subtype=MessageType.html
-        )
-
-        fm = FastMail(conf)
-        await fm.send_message(message, template_name="registration/confirm.html")
-    except ConnectionErrors as err:
-        print(err)
+    token_verification = auth_service.create_email_token({"sub": email})
+    email_queue.enqueue(EmailJob(recipient=email, subject="Confirm your email ",
+                                 template_name="registration/confirm.html",
+                                 template_body={"host": host, "username": username, "token": token_verification}))
 
 
 async def send_reset_email(email: EmailStr, username: str, host: str):
     """
-        Send a password reset email.
+        Queue a password reset email.
+
+        The message is delivered by the background email worker, so this returns immediately.
 
         :param email: The recipient's email address.
         :type email: EmailStr
@@ -59,16 +57,7 @@ async def send_reset_email(email: EmailStr, username: str, host: str):
         :param host: The host URL for generating password reset links.
         :type host: str
     """
-    try:
-        reset_token = auth_service.create_email_token({"sub": email})
-        message = MessageSchema(
-            subject="Password Reset",
-            recipients=[email],
-            template_body={"host": host, "username": username, "token": reset_token},
-            subtype=MessageType.html
-        )
-
-        fm = FastMail(conf)
-        await fm.send_message(message, template_name="reset_password/password_reset_email.html")
-    except ConnectionErrors as err:
-        print(err)
+    reset_token = auth_service.create_email_token({"sub": email})
+    email_queue.enqueue(EmailJob(recipient=email, subject="Password Reset",
+                                 template_name="reset_password/password_reset_email.html",
+                                 template_body={"host": host, "username": username, "token": reset_token}))
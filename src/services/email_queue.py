@@ -0,0 +1,244 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from email.message import Message
+from email.mime.text import MIMEText
+from email.utils import formataddr
+
+import aiosmtplib
+from fastapi_mail import ConnectionConfig
+
+from src.services.email_templates import render
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class EmailJob:
+    """
+    One templated message waiting for delivery.
+
+    Attributes:
+        recipient (str): The recipient's email address.
+        subject (str): The message subject.
+        template_name (str): The template path relative to the template folder.
+        template_body (dict): The template variables.
+        attempts (int): Failed delivery attempts so far.
+        last_error (str | None): The error of the last failed attempt.
+    """
+
+    recipient: str
+    subject: str
+    template_name: str
+    template_body: dict = field(default_factory=dict)
+    attempts: int = 0
+    last_error: str | None = None
+
+
+@dataclass
+class EmailQueueMetrics:
+    """
+    Cumulative counters of the email queue.
+
+    Attributes:
+        enqueued (int): Messages accepted into the queue.
+        sent (int): Messages delivered to the SMTP server.
+        retried (int): Failed attempts scheduled for another try.
+        dead (int): Messages moved to the dead-letter list.
+        batches (int): Batches taken off the queue.
+        connects (int): SMTP connections opened.
+        send_seconds_total (float): Total time spent in SMTP transactions.
+    """
+    enqueued: int = 0
+    sent: int = 0
+    retried: int = 0
+    dead: int = 0
+    batches: int = 0
+    connects: int = 0
+    send_seconds_total: float = 0.0
+
+
+class EmailQueue:
+    """
+    In-process email queue drained by a background worker over one persistent SMTP connection.
+
+    Request handlers only enqueue a job; the worker takes up to ``batch_size`` jobs at a time and
+    sends them over a connection that is opened on demand and closed after ``idle_timeout``
+    seconds without mail. A failed message is retried with exponential backoff and, after
+    ``max_attempts``, moved to a bounded dead-letter list.
+
+    Attributes:
+        conf (ConnectionConfig): The SMTP server settings.
+        batch_size (int): Maximum number of messages sent per batch.
+        max_attempts (int): Delivery attempts before a message is dead-lettered.
+        retry_backoff (float): Delay before the first retry in seconds, doubled on every attempt.
+        idle_timeout (float): Seconds without mail after which the SMTP connection is closed.
+        dead_letters (deque[EmailJob]): The most recent undeliverable messages.
+        metrics (EmailQueueMetrics): Cumulative counters.
+    """
+
+    def __init__(self, conf: ConnectionConfig, maxsize: int, batch_size: int, max_attempts: int,
+                 retry_backoff: float, idle_timeout: float, dead_letter_size: int):
+        self.conf = conf
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.idle_timeout = idle_timeout
+        self.dead_letters: deque[EmailJob] = deque(maxlen=dead_letter_size)
+        self.metrics = EmailQueueMetrics()
+        self._maxsize = maxsize
+        self._queue: asyncio.Queue[EmailJob] | None = None
+        self._smtp: aiosmtplib.SMTP | None = None
+        self._worker: asyncio.Task | None = None
+
+    @property
+    def queue(self) -> asyncio.Queue:
+        # Created lazily so the queue binds to the running event loop, not the one at import time.
+        if self._queue is None:
+            self._queue = asyncio.Queue(self._maxsize)
+        return self._queue
+
+    def enqueue(self, job: EmailJob) -> None:
+        """
+        Accept a message for delivery without waiting for the SMTP server
+
+        Args:
+            job (EmailJob): The message to send.
+        """
+        if self._put(job):
+            self.metrics.enqueued += 1
+
+    def _put(self, job: EmailJob) -> bool:
+        try:
+            self.queue.put_nowait(job)
+            return True
+        except asyncio.QueueFull:
+            job.last_error = "queue full"
+            self._dead_letter(job)
+            return False
+
+    async def start(self) -> None:
+        self._worker = asyncio.create_task(self.run())
+
+    async def stop(self, timeout: float = 10) -> None:
+        """
+        Give queued messages up to ``timeout`` seconds to go out, then stop the worker
+
+        Args:
+            timeout (float): Seconds to wait for the queue to drain.
+        """
+        if self._worker is None:
+            return
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Email queue stopped with %d undelivered messages", self.queue.qsize())
+        self._worker.cancel()
+        self._worker = None
+        await self._disconnect()
+
+    async def run(self) -> None:
+        """
+        Worker loop: take a batch off the queue and send it, closing the connection when idle
+        """
+        while True:
+            try:
+                job = await asyncio.wait_for(self.queue.get(), self.idle_timeout)
+            except asyncio.TimeoutError:
+                await self._disconnect()
+                job = await self.queue.get()
+            batch = [job]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+            await self.send_batch(batch)
+
+    async def send_batch(self, batch: list[EmailJob]) -> None:
+        self.metrics.batches += 1
+        for job in batch:
+            try:
+                try:
+                    message = self.render(job)
+                except Exception as e:
+                    # A broken template does not fix itself, so it is not retried.
+                    job.last_error = repr(e)
+                    self._dead_letter(job)
+                    continue
+                try:
+                    await self._send(message)
+                    self.metrics.sent += 1
+                except (aiosmtplib.SMTPException, OSError) as e:
+                    await self._disconnect()
+                    self._retry(job, e)
+            finally:
+                self.queue.task_done()
+
+    def render(self, job: EmailJob) -> Message:
+        # base64 (as fastapi-mail does) rather than EmailMessage's pure-Python quoted-printable,
+        # which costs more than rendering the template itself.
+        message = MIMEText(render(job.template_name, **job.template_body), "html", "utf-8")
+        message["From"] = formataddr((self.conf.MAIL_FROM_NAME, self.conf.MAIL_FROM))
+        message["To"] = job.recipient
+        message["Subject"] = job.subject
+        return message
+
+    async def _send(self, message: Message) -> None:
+        started = time.perf_counter()
+        try:
+            smtp = await self._connect()
+            try:
+                await smtp.send_message(message)
+            except aiosmtplib.SMTPServerDisconnected:
+                # The server dropped the idle connection; reconnect once before counting a failure.
+                await self._disconnect()
+                smtp = await self._connect()
+                await smtp.send_message(message)
+        finally:
+            self.metrics.send_seconds_total += time.perf_counter() - started
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        if self._smtp is not None and self._smtp.is_connected:
+            return self._smtp
+        smtp = aiosmtplib.SMTP(hostname=self.conf.MAIL_SERVER, port=self.conf.MAIL_PORT,
+                               use_tls=self.conf.MAIL_SSL_TLS, start_tls=self.conf.MAIL_STARTTLS,
+                               validate_certs=self.conf.VALIDATE_CERTS, timeout=self.conf.TIMEOUT)
+        await smtp.connect()
+        if self.conf.USE_CREDENTIALS:
+            await smtp.login(self.conf.MAIL_USERNAME, self.conf.MAIL_PASSWORD.get_secret_value())
+        self.metrics.connects += 1
+        self._smtp = smtp
+        return smtp
+
+    async def _disconnect(self) -> None:
+        smtp, self._smtp = self._smtp, None
+        if smtp is None or not smtp.is_connected:
+            return
+        try:
+            await smtp.quit()
+        except (aiosmtplib.SMTPException, OSError):
+            smtp.close()
+
+    def _retry(self, job: EmailJob, error: Exception) -> None:
+        job.attempts += 1
+        job.last_error = str(error)
+        if job.attempts >= self.max_attempts:
+            self._dead_letter(job)
+            return
+        self.metrics.retried += 1
+        delay = self.retry_backoff * 2 ** (job.attempts - 1)
+        asyncio.get_running_loop().call_later(delay, self._put, job)
+
+    def _dead_letter(self, job: EmailJob) -> None:
+        self.metrics.dead += 1
+        self.dead_letters.append(job)
+        logger.error("Email to %s dead-lettered after %d attempts: %s", job.recipient, job.attempts, job.last_error)
+
+    def stats(self) -> dict:
+        return {"queued": self.queue.qsize(), "dead_letters": len(self.dead_letters), "enqueued": self.metrics.enqueued,
+                "sent": self.metrics.sent, "retried": self.metrics.retried, "dead": self.metrics.dead,
+                "batches": self.metrics.batches, "connects": self.metrics.connects,
+                "send_seconds_total": self.metrics.send_seconds_total}
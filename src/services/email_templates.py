@@ -0,0 +1,47 @@
+from pathlib import Path
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, select_autoescape
+
+from src.conf.config import settings
+
+TEMPLATE_FOLDER = Path(__file__).parent / 'templates'
+
+templates = Environment(
+    loader=FileSystemLoader(TEMPLATE_FOLDER),
+    autoescape=select_autoescape(["html"]),
+    bytecode_cache=FileSystemBytecodeCache(settings.email_template_cache_dir),
+    # Templates ship with the code, so there is no need to stat the files on every render.
+    auto_reload=False,
+    cache_size=-1,
+)
+
+
+def compile_templates() -> int:
+    """
+        Compile every email template into the shared environment, meant to run once at startup.
+
+        Compiled templates stay in memory for the life of the process; the bytecode cache lets the
+        next process skip parsing as well.
+
+        :return: The number of compiled templates.
+        :rtype: int
+    """
+    names = templates.list_templates(extensions=["html"])
+    for name in names:
+        templates.get_template(name)
+    return len(names)
+
+
+def render(template_name: str, **context) -> str:
+    """
+        Render an email template from the shared environment.
+
+        Variables are HTML-escaped, so user-supplied values such as the username are safe to embed.
+
+        :param template_name: The template path relative to the template folder.
+        :type template_name: str
+        :param context: The template variables.
+        :return: The rendered HTML.
+        :rtype: str
+    """
+    return templates.get_template(template_name).render(context)
@@ -0,0 +1,78 @@
+import asyncio
+import logging
+from functools import lru_cache
+
+from libgravatar import Gravatar
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.db.db_connect import AsyncSessionLocal
+from src.repository import users as repository_users
+from src.services.user_cache import invalidate_users
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=10000)
+def gravatar_image(email: str) -> str:
+    """
+    Build the Gravatar image URL of an email address, memoized per address
+
+    Args:
+        email (str): The email address.
+
+    Returns:
+        str: The image URL.
+    """
+    return Gravatar(email).get_image()
+
+
+def avatar_url(email: str) -> str | None:
+    """
+    Resolve the Gravatar URL of an email address without blocking
+
+    The URL is derived from the MD5 of the address locally; Gravatar itself is never contacted,
+    so this is safe to call inline during signup. Failures are logged and leave the avatar
+    empty for :func:`backfill_avatars` to fill in later.
+
+    Args:
+        email (str): The email address.
+
+    Returns:
+        str | None: The image URL, or None if it could not be built.
+    """
+    try:
+        return gravatar_image(email)
+    except (ValueError, TypeError, AttributeError) as e:
+        logger.warning("Gravatar URL for %s could not be built: %s", email, e)
+        return None
+
+
+async def backfill_avatars(db: AsyncSession, batch_size: int = 1000) -> int:
+    """
+    Fill the avatar of every user that has none, one batch at a time
+
+    Args:
+        db (AsyncSession): The database session.
+        batch_size (int): Number of users updated per statement.
+
+    Returns:
+        int: Number of users updated.
+    """
+    updated, after_id = 0, 0
+    while users := await repository_users.get_users_without_avatar(db, after_id, batch_size):
+        after_id = users[-1].id
+        avatars = {user.id: url for user in users if (url := avatar_url(user.email)) is not None}
+        await repository_users.update_avatars_bulk(avatars, db)
+        await invalidate_users([user.email for user in users if user.id in avatars])
+        updated += len(avatars)
+    return updated
+
+
+async def main():
+    async with AsyncSessionLocal() as db:
+        updated = await backfill_avatars(db)
+    print(f"Filled Gravatar avatars for {updated} users")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,148 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, TypeVar
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+from src.conf.config import settings
+
+T = TypeVar("T")
+
+PASSWORD_SCHEMES = ("bcrypt", "argon2")
+
+
+def password_context(scheme: str = settings.password_scheme, bcrypt_rounds: int = settings.password_bcrypt_rounds,
+                     argon2_time_cost: int = settings.password_argon2_time_cost,
+                     argon2_memory_cost: int = settings.password_argon2_memory_cost,
+                     argon2_parallelism: int = settings.password_argon2_parallelism) -> CryptContext:
+    """
+    Build the password hashing context for the configured scheme and cost
+
+    Every supported scheme stays verifiable, but only ``scheme`` with exactly the given cost is
+    current: hashes made with another scheme or cost report ``needs_update`` and are rehashed on
+    the next successful login, in either direction of a cost change.
+
+    Args:
+        scheme (str): The scheme new hashes are made with, ``bcrypt`` or ``argon2``.
+        bcrypt_rounds (int): The bcrypt work factor (log2 of the iteration count).
+        argon2_time_cost (int): The argon2 number of passes.
+        argon2_memory_cost (int): The argon2 memory in KiB.
+        argon2_parallelism (int): The argon2 number of lanes.
+
+    Returns:
+        CryptContext: The password hashing context.
+    """
+    return CryptContext(schemes=[scheme, *(s for s in PASSWORD_SCHEMES if s != scheme)], default=scheme,
+                        deprecated="auto",
+                        bcrypt__rounds=bcrypt_rounds, bcrypt__min_rounds=bcrypt_rounds,
+                        bcrypt__max_rounds=bcrypt_rounds,
+                        argon2__rounds=argon2_time_cost, argon2__memory_cost=argon2_memory_cost,
+                        argon2__parallelism=argon2_parallelism)
+
+
+@dataclass
+class HasherMetrics:
+    """
+    Cumulative counters of the password hashing pool.
+
+    Attributes:
+        completed (int): Number of hash or verify calls that finished.
+        rejected (int): Number of calls refused because the queue was full.
+        queue_seconds_total (float): Total time calls waited for a free worker.
+        hash_seconds_total (float): Total time spent hashing.
+        hash_seconds_max (float): Longest single hash or verify call.
+    """
+    completed: int = 0
+    rejected: int = 0
+    queue_seconds_total: float = 0.0
+    hash_seconds_total: float = 0.0
+    hash_seconds_max: float = 0.0
+
+    def observe(self, queued: float, elapsed: float):
+        self.completed += 1
+        self.queue_seconds_total += queued
+        self.hash_seconds_total += elapsed
+        if elapsed > self.hash_seconds_max:
+            self.hash_seconds_max = elapsed
+
+
+class PasswordHasher:
+    """
+    Runs CPU-bound password hashing on a dedicated, bounded thread pool.
+
+    bcrypt releases the GIL while hashing, so threads keep the event loop free without the
+    pickling cost of a process pool. At most ``workers + queue_limit`` calls are admitted at a
+    time; anything beyond that is rejected immediately with 503 instead of piling up latency.
+
+    Attributes:
+        workers (int): Number of hashing threads.
+        queue_limit (int): Maximum number of calls waiting for a free thread.
+        in_flight (int): Calls currently running or queued.
+        metrics (HasherMetrics): Cumulative counters.
+    """
+
+    def __init__(self, workers: int, queue_limit: int):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.in_flight = 0
+        self.metrics = HasherMetrics()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hasher")
+
+    async def run(self, func: Callable[..., T], *args) -> T:
+        """
+        Run a hashing function on the pool
+
+        Args:
+            func (Callable): The blocking function, e.g. ``CryptContext.verify``.
+            *args: Positional arguments of the function.
+
+        Returns:
+            The result of the function.
+
+        Raises:
+            HTTPException: 503 if the queue is full.
+        """
+        if self.in_flight >= self.workers + self.queue_limit:
+            self.metrics.rejected += 1
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                detail="Server is busy, try again later", headers={"Retry-After": "1"})
+        self.in_flight += 1
+        submitted = time.perf_counter()
+        try:
+            result, started, finished = await asyncio.get_running_loop().run_in_executor(
+                self._executor, self._timed, func, args)
+        finally:
+            self.in_flight -= 1
+        self.metrics.observe(started - submitted, finished - started)
+        return result
+
+    @staticmethod
+    def _timed(func: Callable[..., T], args: tuple) -> tuple[T, float, float]:
+        started = time.perf_counter()
+        result = func(*args)
+        return result, started, time.perf_counter()
+
+    def queue_depth(self) -> int:
+        return max(self.in_flight - self.workers, 0)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "queue_limit": self.queue_limit,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth(),
+            "completed": self.metrics.completed,
+            "rejected": self.metrics.rejected,
+            "queue_seconds_total": self.metrics.queue_seconds_total,
+            "hash_seconds_total": self.metrics.hash_seconds_total,
+            "hash_seconds_max": self.metrics.hash_seconds_max,
+        }
+
+    async def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_hasher = PasswordHasher(settings.password_hash_workers, settings.password_hash_queue_limit)
@@ -0,0 +1,160 @@
+from dataclasses import dataclass
+from pathlib import Path
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+from jose import JWTError, jwk, jwt
+from jose.backends.base import Key
+
+from src.conf.config import settings
+
+EC_ALGORITHMS = {"secp256r1": "ES256", "secp384r1": "ES384", "secp521r1": "ES512"}
+
+
+@dataclass(slots=True, frozen=True)
+class JWTKey:
+    """
+    One entry of the :class:`Keyring`, with its jose key objects built once.
+
+    Attributes:
+        kid (str | None): The key ID put into the ``kid`` header; None for the legacy HMAC secret.
+        algorithm (str): The JWS algorithm, e.g. ``RS256`` or ``ES256``.
+        signing_key (Key | None): The private key, or None for a verification-only key.
+        verification_key (Key): The public key (the secret itself for HMAC).
+        public_jwk (dict | None): The public key as a JWK, or None for HMAC secrets.
+    """
+
+    kid: str | None
+    algorithm: str
+    signing_key: Key | None
+    verification_key: Key
+    public_jwk: dict | None
+
+    @classmethod
+    def from_pem(cls, kid: str, pem: bytes) -> "JWTKey":
+        """
+        Build a key from a PEM file holding either a private or a public RSA or EC key
+
+        Args:
+            kid (str): The key ID.
+            pem (bytes): The PEM data.
+
+        Returns:
+            JWTKey: The key; verification-only if the PEM holds a public key.
+
+        Raises:
+            ValueError: If the PEM holds an unsupported key type.
+        """
+        if b"PRIVATE KEY" in pem:
+            private = serialization.load_pem_private_key(pem, password=None)
+            public = private.public_key()
+        else:
+            private, public = None, serialization.load_pem_public_key(pem)
+        if isinstance(public, rsa.RSAPublicKey):
+            algorithm = "RS256"
+        elif isinstance(public, ec.EllipticCurvePublicKey) and public.curve.name in EC_ALGORITHMS:
+            algorithm = EC_ALGORITHMS[public.curve.name]
+        else:
+            raise ValueError(f"Unsupported JWT key type for kid {kid!r}")
+        public_pem = public.public_bytes(serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo)
+        verification_key = jwk.construct(public_pem, algorithm)
+        signing_key = jwk.construct(pem, algorithm) if private is not None else None
+        public_jwk = {**verification_key.to_dict(), "kid": kid, "use": "sig", "alg": algorithm}
+        return cls(kid, algorithm, signing_key, verification_key, public_jwk)
+
+    @classmethod
+    def from_secret(cls, secret: str, algorithm: str) -> "JWTKey":
+        key = jwk.construct(secret, algorithm)
+        return cls(None, algorithm, key, key, None)
+
+
+class Keyring:
+    """
+    The signing key and every accepted verification key, loaded once per process.
+
+    Tokens are signed with the active key and carry its ``kid`` header; verification picks the
+    key by ``kid``, so old keys can stay in the ring until the tokens they signed have expired.
+    Tokens without a ``kid`` are checked against the legacy HMAC secret, if one is configured,
+    which lets a deployment move from ``SECRET_KEY`` to asymmetric keys without logging anyone out.
+
+    Attributes:
+        active (JWTKey): The key new tokens are signed with.
+        keys (dict[str | None, JWTKey]): Verification keys by ``kid``.
+    """
+
+    def __init__(self, active: JWTKey, keys: list[JWTKey]):
+        if active.signing_key is None:
+            raise ValueError(f"Active JWT key {active.kid!r} has no private key")
+        self.active = active
+        self.keys = {key.kid: key for key in keys}
+        self.keys.setdefault(active.kid, active)
+        self._jwks = {"keys": [key.public_jwk for key in self.keys.values() if key.public_jwk is not None]}
+
+    @classmethod
+    def load(cls, keys_dir: str | None = settings.jwt_keys_dir, active_kid: str | None = settings.jwt_active_kid,
+             secret: str | None = settings.secret_key, algorithm: str = settings.algorithm) -> "Keyring":
+        """
+        Load the keyring from ``<kid>.pem`` files, falling back to the HMAC secret alone
+
+        Args:
+            keys_dir (str | None): Directory of PEM files, one key per file, named after the key ID.
+            active_kid (str | None): The key ID to sign with; required when ``keys_dir`` is set.
+            secret (str | None): The legacy HMAC secret, still accepted for tokens without ``kid``.
+            algorithm (str): The legacy HMAC algorithm.
+
+        Returns:
+            Keyring: The loaded keyring.
+        """
+        legacy = [JWTKey.from_secret(secret, algorithm)] if secret else []
+        if not keys_dir:
+            if not legacy:
+                raise ValueError("Either JWT_KEYS_DIR or SECRET_KEY must be configured")
+            return cls(legacy[0], legacy)
+        keys = [JWTKey.from_pem(path.stem, path.read_bytes()) for path in sorted(Path(keys_dir).glob("*.pem"))]
+        active = next((key for key in keys if key.kid == active_kid), None)
+        if active is None:
+            raise ValueError(f"Active JWT key {active_kid!r} not found in {keys_dir}")
+        return cls(active, keys + legacy)
+
+    def encode(self, claims: dict) -> str:
+        """
+        Sign claims with the active key
+
+        Args:
+            claims (dict): The token claims.
+
+        Returns:
+            str: The encoded token.
+        """
+        headers = {"kid": self.active.kid} if self.active.kid is not None else None
+        return jwt.encode(claims, self.active.signing_key, algorithm=self.active.algorithm, headers=headers)
+
+    def decode(self, token: str) -> dict:
+        """
+        Verify a token with the key named by its ``kid`` header
+
+        Args:
+            token (str): The encoded token.
+
+        Returns:
+            dict: The verified claims.
+
+        Raises:
+            JWTError: If the token is malformed, expired, signed by an unknown key or the signature is invalid.
+        """
+        key = self.keys.get(jwt.get_unverified_header(token).get("kid"))
+        if key is None:
+            raise JWTError("Unknown signing key")
+        return jwt.decode(token, key.verification_key, algorithms=[key.algorithm])
+
+    def jwks(self) -> dict:
+        """
+        The public verification keys as a JWK Set
+
+        Returns:
+            dict: ``{"keys": [...]}``, without HMAC secrets.
+        """
+        return self._jwks
+
+
+keyring = Keyring.load()
@@ -0,0 +1,282 @@
+import asyncio
+import logging
+import math
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import redis.asyncio as redis
+from fastapi import Depends, HTTPException, status
+
+from src.conf.config import settings
+from src.db.models import User
+from src.services.auth import auth_service
+
+logger = logging.getLogger(__name__)
+
+# Folds the requests a worker admitted since its last settlement into the shared bucket and
+# returns the tokens left. Redis' clock is used so that workers with skewed clocks agree.
+SETTLE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local consumed = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.max(-capacity, math.min(capacity, tokens + math.max(0, now - ts) * rate) - consumed)
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(2 * capacity / rate))
+return tostring(tokens)
+"""
+
+
+@dataclass(slots=True)
+class TokenBucket:
+    """
+    One worker's view of the token bucket of a user on a route.
+
+    Attributes:
+        capacity (int): Requests allowed per window, also the burst size.
+        rate (float): Tokens added per second.
+        tokens (float): Tokens left, as of ``updated``.
+        updated (float): ``time.monotonic()`` of the last refill.
+        pending (int): Requests admitted since the last settlement with Redis.
+    """
+
+    capacity: int
+    rate: float
+    tokens: float
+    updated: float
+    pending: int = 0
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+
+@dataclass
+class RateLimiterMetrics:
+    """
+    Cumulative counters of the rate limiter.
+
+    Attributes:
+        allowed (int): Requests admitted.
+        rejected (int): Requests answered with 429.
+        settles (int): Batches settled with Redis.
+        settled_buckets (int): Buckets settled, over all batches.
+        sync_failures (int): Settlements that failed and were retried later.
+    """
+    allowed: int = 0
+    rejected: int = 0
+    settles: int = 0
+    settled_buckets: int = 0
+    sync_failures: int = 0
+
+
+class RateLimitEngine:
+    """
+    Per-user, per-route token-bucket rate limiter that decides locally and settles with Redis in batches.
+
+    Every worker keeps a bounded LRU of token buckets and admits or rejects requests without a
+    network hop. Only the first request of a user on a route, in this worker, waits for Redis, to
+    load the shared bucket. Admitted requests are counted as pending and folded into the shared
+    bucket by a background task every ``sync_interval`` seconds, or as soon as a bucket has
+    ``sync_batch`` pending requests; the local bucket is then reset to the cluster-wide balance.
+    Between settlements a worker can admit at most ``sync_batch`` requests the others have not
+    seen, so across ``n`` workers a user gets at most about ``(n - 1) * sync_batch`` requests over
+    the limit. ``sync_batch=1`` trades the local decision back for an exact cluster-wide limit.
+    If Redis is unavailable the limits are still enforced per worker.
+
+    Limits are requests per ``window`` seconds, looked up by user tier and route name in
+    ``limits``; the ``*`` route is the tier's default and users without a tier use ``default``.
+
+    Attributes:
+        r (redis.Redis): The Redis client holding the shared buckets.
+        limits (dict[str, dict[str, int]]): Tier → route → requests per window.
+        tiers (dict[str, str]): User email → tier.
+        window (float): The window of the limits in seconds.
+        sync_interval (float): Seconds between settlements.
+        sync_batch (int): Pending requests of one bucket that trigger an early settlement.
+        maxsize (int): Maximum number of buckets kept per worker.
+        metrics (RateLimiterMetrics): Cumulative counters.
+    """
+
+    def __init__(self, r: redis.Redis, limits: dict[str, dict[str, int]], tiers: dict[str, str], window: float,
+                 sync_interval: float, sync_batch: int, maxsize: int):
+        self.r = r
+        self.limits = limits
+        self.tiers = tiers
+        self.window = window
+        self.sync_interval = sync_interval
+        self.sync_batch = sync_batch
+        self.maxsize = maxsize
+        self.metrics = RateLimiterMetrics()
+        self._script = r.register_script(SETTLE_SCRIPT)
+        self._buckets: OrderedDict[str, TokenBucket] = OrderedDict()
+        # Evicted buckets whose pending requests have not reached Redis yet.
+        self._evicted: dict[str, TokenBucket] = {}
+        self._wake: asyncio.Event | None = None
+        self._syncer: asyncio.Task | None = None
+
+    def limit(self, route: str, tier: str) -> int | None:
+        """
+        Look up the limit of a route for a user tier
+
+        Args:
+            route (str): The route name.
+            tier (str): The user tier.
+
+        Returns:
+            int | None: Requests allowed per window, or None if the route is not limited.
+        """
+        limits = self.limits.get(tier) or self.limits.get("default", {})
+        return limits.get(route, limits.get("*"))
+
+    async def hit(self, route: str, user: User) -> None:
+        """
+        Count a request of a user on a route
+
+        Args:
+            route (str): The route name.
+            user (User): The authenticated user.
+
+        Raises:
+            HTTPException: 429 with ``Retry-After`` if the user is over the limit.
+        """
+        capacity = self.limit(route, self.tiers.get(user.email, "default"))
+        if capacity is None:
+            return
+        key = f"rate-limit:{route}:{user.id}"
+        bucket = self._buckets.get(key)
+        if bucket is None or bucket.capacity != capacity:
+            bucket = TokenBucket(capacity, capacity / self.window, capacity, time.monotonic())
+            self._add(key, bucket)
+            # Start from the cluster-wide balance rather than a full bucket.
+            await self.settle([(key, bucket)])
+        else:
+            self._buckets.move_to_end(key)
+        bucket.refill(time.monotonic())
+        if bucket.tokens < 1:
+            self.metrics.rejected += 1
+            retry_after = math.ceil((1 - bucket.tokens) / bucket.rate)
+            raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Too Many Requests",
+                                headers={"Retry-After": str(retry_after)})
+        bucket.tokens -= 1
+        bucket.pending += 1
+        self.metrics.allowed += 1
+        if bucket.pending >= self.sync_batch and self._wake is not None:
+            self._wake.set()
+
+    def _add(self, key: str, bucket: TokenBucket) -> None:
+        previous = self._buckets.pop(key, None)
+        if previous is not None and previous.pending:
+            self._evicted[key] = previous
+        self._buckets[key] = bucket
+        while len(self._buckets) > self.maxsize:
+            evicted_key, evicted = self._buckets.popitem(last=False)
+            if evicted.pending:
+                self._evicted[evicted_key] = evicted
+
+    async def settle(self, buckets: list[tuple[str, TokenBucket]]) -> None:
+        """
+        Fold the pending requests of ``buckets`` into Redis and adopt the cluster-wide balance
+
+        On a Redis error the pending requests are kept for the next attempt.
+
+        Args:
+            buckets (list[tuple[str, TokenBucket]]): The Redis keys and local buckets to settle.
+        """
+        consumed = []
+        for _, bucket in buckets:
+            consumed.append(bucket.pending)
+            bucket.pending = 0
+        try:
+            balances = await self._settle_remote(
+                [(key, bucket.capacity, bucket.rate, count) for (key, bucket), count in zip(buckets, consumed)])
+        except redis.RedisError as e:
+            for (_, bucket), count in zip(buckets, consumed):
+                bucket.pending += count
+            self.metrics.sync_failures += 1
+            logger.warning("Rate limit settlement of %d buckets failed: %s", len(buckets), e)
+            return
+        now = time.monotonic()
+        for (_, bucket), balance in zip(buckets, balances):
+            # Requests admitted during the round trip are not part of the balance yet.
+            bucket.tokens = min(bucket.capacity, balance) - bucket.pending
+            bucket.updated = now
+        self.metrics.settles += 1
+        self.metrics.settled_buckets += len(buckets)
+
+    async def _settle_remote(self, entries: list[tuple[str, int, float, int]]) -> list[float]:
+        async with self.r.pipeline(transaction=False) as pipe:
+            for key, capacity, rate, consumed in entries:
+                await self._script(keys=[key], args=[capacity, rate, consumed], client=pipe)
+            return [float(balance) for balance in await pipe.execute()]
+
+    async def flush(self) -> None:
+        """
+        Settle every bucket with pending requests in one pipeline
+        """
+        evicted, self._evicted = self._evicted, {}
+        buckets = list(evicted.items()) + [(key, bucket) for key, bucket in self._buckets.items() if bucket.pending]
+        if buckets:
+            await self.settle(buckets)
+        for key, bucket in evicted.items():
+            if bucket.pending:
+                self._evicted.setdefault(key, bucket)
+
+    async def run(self) -> None:
+        """
+        Worker loop: settle every ``sync_interval`` seconds, or early when a bucket reaches ``sync_batch``
+        """
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.sync_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    async def start(self) -> None:
+        self._wake = asyncio.Event()
+        self._syncer = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._syncer is None:
+            return
+        self._syncer.cancel()
+        self._syncer = None
+        await self.flush()
+
+    def stats(self) -> dict:
+        return {"buckets": len(self._buckets), "maxsize": self.maxsize,
+                "pending": sum(bucket.pending for bucket in self._buckets.values()),
+                "allowed": self.metrics.allowed, "rejected": self.metrics.rejected, "settles": self.metrics.settles,
+                "settled_buckets": self.metrics.settled_buckets, "sync_failures": self.metrics.sync_failures}
+
+
+rate_limiter = RateLimitEngine(redis.Redis(host=settings.redis_host, port=settings.redis_port, db=0),
+                               settings.rate_limits, settings.rate_limit_user_tiers, settings.rate_limit_window,
+                               settings.rate_limit_sync_interval, settings.rate_limit_sync_batch,
+                               settings.rate_limit_local_size)
+
+
+def rate_limit(route: str):
+    """
+    Build the dependency limiting a route per authenticated user
+
+    The user is resolved through ``auth_service.get_current_user``, which FastAPI evaluates only
+    once per request, so the limit adds no authentication work.
+
+    Args:
+        route (str): The route name the limits are configured under.
+
+    Returns:
+        The dependency, for a path operation's ``dependencies`` list.
+    """
+    async def check(current_user: User = Depends(auth_service.get_current_user)):
+        await rate_limiter.hit(route, current_user)
+
+    return Depends(check)
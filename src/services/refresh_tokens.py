@@ -0,0 +1,145 @@
+import redis.asyncio as redis
+
+from src.conf.config import settings
+
+# KEYS[1] family hash; ARGV: presented jti, next jti, next expiry (unix seconds).
+# Returns 1 when rotated, 0 when the family is unknown, -1 when a stale token was replayed.
+ROTATE_SCRIPT = """
+local current = redis.call('HGET', KEYS[1], 'jti')
+if not current then
+    return 0
+end
+if current ~= ARGV[1] then
+    return -1
+end
+redis.call('HSET', KEYS[1], 'jti', ARGV[2])
+redis.call('EXPIREAT', KEYS[1], ARGV[3])
+return 1
+"""
+
+# KEYS[1] user index; ARGV: expiry (unix seconds). Pushes the expiry of the index out but never in,
+# like EXPIREAT ... GT, which needs Redis 7.
+EXTEND_SCRIPT = """
+local ttl = redis.call('TTL', KEYS[1])
+if ttl < 0 or tonumber(redis.call('TIME')[1]) + ttl < tonumber(ARGV[1]) then
+    redis.call('EXPIREAT', KEYS[1], ARGV[1])
+end
+"""
+
+
+class RefreshTokenStore:
+    """
+    Redis-backed registry of refresh token families.
+
+    Every login starts a family (``refresh:family:<fam>``) that remembers the ``jti`` of the one
+    refresh token currently allowed to be exchanged. Refreshing rotates it to a new ``jti``; presenting
+    any older token of the family means it was stolen or replayed, so the whole family is revoked.
+    A family expires together with its latest token. The families of a user are indexed in
+    ``refresh:user:<email>`` so a password change can revoke them all; ids of families that
+    expired are pruned from the index whenever the user logs in.
+
+    Attributes:
+        r (redis.Redis): The Redis client holding the families.
+    """
+
+    ROTATED, UNKNOWN, REUSED = 1, 0, -1
+
+    def __init__(self, r: redis.Redis):
+        self.r = r
+        self._rotate = r.register_script(ROTATE_SCRIPT)
+        self._extend = r.register_script(EXTEND_SCRIPT)
+
+    @staticmethod
+    def family_key(family: str) -> str:
+        return f"refresh:family:{family}"
+
+    @staticmethod
+    def user_key(email: str) -> str:
+        return f"refresh:user:{email}"
+
+    async def start(self, claims: dict) -> None:
+        """
+        Register a new family for a freshly issued refresh token
+
+        Args:
+            claims (dict): The token claims, with ``sub``, ``jti``, ``fam`` and ``exp`` as unix seconds.
+        """
+        family_key, user_key = self.family_key(claims["fam"]), self.user_key(claims["sub"])
+        async with self.r.pipeline(transaction=True) as pipe:
+            pipe.hset(family_key, mapping={"sub": claims["sub"], "jti": claims["jti"]})
+            pipe.expireat(family_key, claims["exp"])
+            pipe.sadd(user_key, claims["fam"])
+            await self._extend(keys=[user_key], args=[claims["exp"]], client=pipe)
+            await pipe.execute()
+        await self.prune(claims["sub"])
+
+    async def prune(self, email: str) -> int:
+        """
+        Drop the ids of expired or revoked families from a user's index
+
+        Args:
+            email (str): The user's email address.
+
+        Returns:
+            int: The number of ids dropped.
+        """
+        user_key = self.user_key(email)
+        families = list(await self.r.smembers(user_key))
+        if not families:
+            return 0
+        async with self.r.pipeline(transaction=False) as pipe:
+            for family in families:
+                pipe.exists(self.family_key(family.decode()))
+            alive = await pipe.execute()
+        stale = [family for family, exists in zip(families, alive) if not exists]
+        if stale:
+            await self.r.srem(user_key, *stale)
+        return len(stale)
+
+    async def rotate(self, claims: dict, next_claims: dict) -> int:
+        """
+        Replace the current token of a family if the presented token is that current token
+
+        Args:
+            claims (dict): The claims of the presented refresh token.
+            next_claims (dict): The claims of the replacement token of the same family.
+
+        Returns:
+            int: :attr:`ROTATED`, :attr:`UNKNOWN` for an expired or revoked family, or :attr:`REUSED`
+            if the presented token was already rotated, in which case the family is revoked.
+        """
+        expire_at = next_claims["exp"]
+        outcome = await self._rotate(keys=[self.family_key(claims["fam"])],
+                                     args=[claims["jti"], next_claims["jti"], expire_at])
+        if outcome == self.REUSED:
+            await self.revoke_family(claims["fam"], claims["sub"])
+        elif outcome == self.ROTATED:
+            await self._extend(keys=[self.user_key(claims["sub"])], args=[expire_at])
+        return outcome
+
+    async def revoke_family(self, family: str, email: str) -> None:
+        """
+        Revoke one refresh token family, e.g. after one of its tokens was replayed
+
+        Args:
+            family (str): The family id, the ``fam`` claim.
+            email (str): The owner of the family.
+        """
+        async with self.r.pipeline(transaction=True) as pipe:
+            pipe.delete(self.family_key(family))
+            pipe.srem(self.user_key(email), family)
+            await pipe.execute()
+
+    async def revoke_user(self, email: str) -> None:
+        """
+        Revoke every refresh token family of a user, e.g. after a password reset
+
+        Args:
+            email (str): The user's email address.
+        """
+        user_key = self.user_key(email)
+        families = await self.r.smembers(user_key)
+        await self.r.delete(user_key, *(self.family_key(family.decode()) for family in families))
+
+
+refresh_tokens = RefreshTokenStore(redis.Redis(host=settings.redis_host, port=settings.redis_port, db=0))
@@ -0,0 +1,90 @@
+import hashlib
+import time
+from collections import OrderedDict
+
+from src.conf.config import settings
+
+
+class ClaimsCache:
+    """
+    Bounded per-worker LRU cache of verified access token claims.
+
+    Entries are keyed by the SHA-256 digest of the raw token, so tokens themselves are never kept
+    in memory, and live until the token's own ``exp``. A hit skips signature verification entirely;
+    an expired entry is dropped and the token goes through a full ``jwt.decode`` again, which then
+    rejects it. A cache with ``maxsize=0`` is disabled.
+
+    Attributes:
+        maxsize (int): Maximum number of cached tokens.
+        hits (int): Lookups answered from the cache.
+        misses (int): Lookups that required signature verification.
+        evictions (int): Entries dropped because the cache was full.
+        revocations (int): Entries dropped through :meth:`revoke_subject`.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries: OrderedDict[bytes, tuple[float, dict]] = OrderedDict()
+        self._subjects: dict[str, set[bytes]] = {}
+        self.hits = self.misses = self.evictions = self.revocations = 0
+
+    @staticmethod
+    def digest(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> dict | None:
+        key = self.digest(token)
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.time():
+            if entry is not None:
+                self._drop(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, token: str, claims: dict) -> None:
+        if self.maxsize <= 0:
+            return
+        key = self.digest(token)
+        self._entries[key] = (float(claims["exp"]), claims)
+        self._entries.move_to_end(key)
+        self._subjects.setdefault(claims["sub"], set()).add(key)
+        while len(self._entries) > self.maxsize:
+            self._drop(next(iter(self._entries)))
+            self.evictions += 1
+
+    def revoke_subject(self, sub: str) -> None:
+        """
+        Forget the claims of every cached token issued to a subject, e.g. after a password change
+
+        Args:
+            sub (str): The ``sub`` claim (the user's email address).
+        """
+        for key in tuple(self._subjects.get(sub, ())):
+            if self._drop(key):
+                self.revocations += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._subjects.clear()
+
+    def stats(self) -> dict:
+        return {"size": len(self._entries), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions, "revocations": self.revocations}
+
+    def _drop(self, key: bytes) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        sub = entry[1]["sub"]
+        keys = self._subjects.get(sub)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._subjects[sub]
+        return True
+
+
+verified_claims = ClaimsCache(settings.token_cache_size)
@@ -0,0 +1,225 @@
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import ClassVar
+
+import redis.asyncio as redis
+
+from src.conf.config import settings
+from src.db.models import User
+from src.services.token_cache import verified_claims
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "user-cache:invalidate"
+
+
+@dataclass(slots=True, frozen=True)
+class CachedUser:
+    """
+    Slim, read-only projection of a :class:`User` kept in the auth cache.
+
+    Only the fields needed by request handlers are stored; the password hash and refresh
+    token never leave the database. The payload carries a schema version so that entries
+    written by an older release are treated as a cache miss instead of being misread.
+
+    Attributes:
+        id (int): The user ID.
+        username (str | None): The user name.
+        email (str): The email address.
+        avatar (str | None): The avatar URL.
+        confirmed (bool): Whether the email address is confirmed.
+        created_at (datetime | None): The registration time.
+    """
+
+    VERSION: ClassVar[int] = 1
+
+    id: int
+    username: str | None
+    email: str
+    avatar: str | None
+    confirmed: bool
+    created_at: datetime | None
+
+    @classmethod
+    def from_user(cls, user: User) -> "CachedUser":
+        """
+        Build the projection from an ORM user
+
+        Args:
+            user (User): The user loaded from the database.
+
+        Returns:
+            CachedUser: The cached projection.
+        """
+        return cls(id=user.id, username=user.username, email=user.email, avatar=user.avatar,
+                   confirmed=bool(user.confirmed), created_at=user.created_at)
+
+    def dumps(self) -> bytes:
+        """
+        Serialize the projection into a compact versioned JSON payload
+
+        Returns:
+            bytes: The payload stored in Redis.
+        """
+        created_at = self.created_at.isoformat() if self.created_at else None
+        return json.dumps([self.VERSION, self.id, self.username, self.email, self.avatar, self.confirmed, created_at],
+                          separators=(",", ":")).encode()
+
+    @classmethod
+    def loads(cls, payload: bytes) -> "CachedUser | None":
+        """
+        Deserialize a payload written by :meth:`dumps`
+
+        Args:
+            payload (bytes): The payload read from Redis.
+
+        Returns:
+            CachedUser | None: The projection, or None if the payload is unreadable or from another schema version.
+        """
+        try:
+            version, *fields = json.loads(payload)
+            if version != cls.VERSION:
+                return None
+            user_id, username, email, avatar, confirmed, created_at = fields
+            return cls(id=user_id, username=username, email=email, avatar=avatar, confirmed=confirmed,
+                       created_at=datetime.fromisoformat(created_at) if created_at else None)
+        except (ValueError, TypeError):
+            return None
+
+
+class LocalUserCache:
+    """
+    Bounded per-worker LRU cache of :class:`CachedUser` with a time-to-live.
+
+    It sits in front of the Redis user cache so hot users are resolved without a network hop.
+    Entries are evicted through Redis pub/sub when a user changes; the TTL only bounds
+    staleness if an invalidation message is missed.
+
+    Attributes:
+        maxsize (int): Maximum number of cached users.
+        ttl (float): Lifetime of an entry in seconds.
+        hits (int): Lookups answered from the cache.
+        misses (int): Lookups that fell through to Redis.
+        evictions (int): Entries dropped because the cache was full.
+        invalidations (int): Entries dropped because the user changed.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, CachedUser]] = OrderedDict()
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def get(self, email: str) -> CachedUser | None:
+        entry = self._entries.get(email)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[email]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(email)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, email: str, user: CachedUser) -> None:
+        self._entries[email] = (time.monotonic() + self.ttl, user)
+        self._entries.move_to_end(email)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, email: str) -> None:
+        if self._entries.pop(email, None) is not None:
+            self.invalidations += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {"size": len(self._entries), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions, "invalidations": self.invalidations}
+
+
+local_users = LocalUserCache(settings.user_cache_local_size, settings.user_cache_local_ttl)
+r = redis.Redis(host=settings.redis_host, port=settings.redis_port, db=0)
+
+
+async def invalidate_user(email: str) -> None:
+    """
+    Drop a changed user from the Redis cache and from the local caches of every worker
+
+    Cached token claims of the user are dropped too, so their tokens are verified again.
+
+    Args:
+        email (str): The email address of the changed user.
+    """
+    local_users.invalidate(email)
+    verified_claims.revoke_subject(email)
+    try:
+        async with r.pipeline(transaction=False) as pipe:
+            pipe.delete(f"user:{email}")
+            pipe.publish(INVALIDATION_CHANNEL, email)
+            await pipe.execute()
+    except redis.RedisError as e:
+        logger.warning("User cache invalidation for %s failed: %s", email, e)
+
+
+async def invalidate_users(emails: list[str]) -> None:
+    """
+    Drop many changed users from the Redis cache and every worker's local caches in one round trip
+
+    Args:
+        emails (list[str]): The email addresses of the changed users.
+    """
+    if not emails:
+        return
+    for email in emails:
+        local_users.invalidate(email)
+        verified_claims.revoke_subject(email)
+    try:
+        async with r.pipeline(transaction=False) as pipe:
+            pipe.delete(*(f"user:{email}" for email in emails))
+            for email in emails:
+                pipe.publish(INVALIDATION_CHANNEL, email)
+            await pipe.execute()
+    except redis.RedisError as e:
+        logger.warning("User cache invalidation for %d users failed: %s", len(emails), e)
+
+
+async def listen_for_invalidations() -> None:
+    """
+    Evict users from the local cache as invalidation messages arrive, reconnecting on errors
+    """
+    while True:
+        pubsub = r.pubsub(ignore_subscribe_messages=True)
+        try:
+            await pubsub.subscribe(INVALIDATION_CHANNEL)
+            # Messages published while disconnected are lost, so start from a clean slate.
+            local_users.clear()
+            async for message in pubsub.listen():
+                email = message["data"].decode()
+                local_users.invalidate(email)
+                verified_claims.revoke_subject(email)
+        except redis.RedisError as e:
+            logger.warning("User cache invalidation listener disconnected: %s", e)
+            await asyncio.sleep(1)
+        finally:
+            await pubsub.close()
+
+
+_listener: asyncio.Task | None = None
+
+
+async def start_invalidation_listener() -> None:
+    global _listener
+    _listener = asyncio.create_task(listen_for_invalidations())
+
+
+async def stop_invalidation_listener() -> None:
+    if _listener is not None:
+        _listener.cancel()
@@ -0,0 +1,145 @@
+import csv
+import io
+import json
+from itertools import islice
+from typing import BinaryIO, Iterator, Sequence
+
+from pydantic import ValidationError
+
+from src.schemas import ContactRequest
+
+IMPORT_FORMATS = ("csv", "ndjson")
+EXPORT_FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson", "vcard": "text/vcard"}
+EXPORT_EXTENSIONS = {"csv": "csv", "ndjson": "ndjson", "vcard": "vcf"}
+EXPORT_COLUMNS = ("id", "first_name", "last_name", "email", "phone_number", "birthday")
+
+
+def detect_format(filename: str | None, content_type: str | None) -> str | None:
+    """
+        Guess the import format of an uploaded file from its name or content type.
+
+        :param filename: The uploaded file name.
+        :type filename: str | None
+        :param content_type: The uploaded file content type.
+        :type content_type: str | None
+        :return: ``"csv"``, ``"ndjson"`` or None when the format is unknown.
+        :rtype: str | None
+    """
+    name = (filename or "").lower()
+    if name.endswith(".csv") or content_type == "text/csv":
+        return "csv"
+    if name.endswith((".ndjson", ".jsonl")) or content_type in ("application/x-ndjson", "application/jsonl"):
+        return "ndjson"
+    return None
+
+
+def parse_contacts(file: BinaryIO, fmt: str) -> Iterator[tuple[int, ContactRequest | None, str | None]]:
+    """
+        Lazily parse and validate contacts from a CSV (with header) or NDJSON file.
+
+        Rows are read one at a time, so memory stays flat regardless of the file size.
+
+        :param file: The binary file object to read.
+        :type file: BinaryIO
+        :param fmt: ``"csv"`` or ``"ndjson"``.
+        :type fmt: str
+        :return: ``(row number, contact, None)`` for valid rows, ``(row number, None, error)`` otherwise.
+        :rtype: Iterator[tuple[int, ContactRequest | None, str | None]]
+    """
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        for row, record in enumerate(csv.DictReader(text), start=2):
+            try:
+                yield row, ContactRequest.model_validate(record), None
+            except ValidationError as e:
+                yield row, None, validation_message(e)
+    else:
+        for row, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield row, ContactRequest.model_validate_json(line), None
+            except ValidationError as e:
+                yield row, None, validation_message(e)
+    text.detach()
+
+
+def take(rows: Iterator, size: int) -> list:
+    """
+        Pull the next ``size`` items from an iterator.
+
+        :param rows: The iterator to consume.
+        :type rows: Iterator
+        :param size: Maximum number of items to take.
+        :type size: int
+        :return: Up to ``size`` items; empty once the iterator is exhausted.
+        :rtype: list
+    """
+    return list(islice(rows, size))
+
+
+def validation_message(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(map(str, e['loc'])) or 'row'}: {e['msg']}" for e in error.errors())
+
+
+def export_header(fmt: str) -> str:
+    """
+        Text emitted once before the first exported row.
+
+        :param fmt: ``"csv"``, ``"ndjson"`` or ``"vcard"``.
+        :type fmt: str
+        :return: The CSV header line, or an empty string for the other formats.
+        :rtype: str
+    """
+    return ",".join(EXPORT_COLUMNS) + "\r\n" if fmt == "csv" else ""
+
+
+def export_rows(rows: Sequence, fmt: str) -> str:
+    """
+        Serialize a batch of plain contact rows (not ORM objects) into one output chunk.
+
+        :param rows: Rows exposing the :data:`EXPORT_COLUMNS` attributes.
+        :type rows: Sequence
+        :param fmt: ``"csv"``, ``"ndjson"`` or ``"vcard"``.
+        :type fmt: str
+        :return: The serialized chunk.
+        :rtype: str
+    """
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerows((row.id, row.first_name, row.last_name, row.email, row.phone_number,
+                          iso_date(row.birthday)) for row in rows)
+        return buffer.getvalue()
+    if fmt == "ndjson":
+        return "".join(json.dumps({"id": row.id, "first_name": row.first_name, "last_name": row.last_name,
+                                   "email": row.email, "phone_number": row.phone_number,
+                                   "birthday": iso_date(row.birthday)}, ensure_ascii=False) + "\n"
+                       for row in rows)
+    return "".join(vcard(row) for row in rows)
+
+
+def vcard(row) -> str:
+    first_name, last_name = vcard_escape(row.first_name), vcard_escape(row.last_name)
+    lines = ["BEGIN:VCARD", "VERSION:3.0", f"N:{last_name};{first_name};;;",
+             f"FN:{' '.join(filter(None, (first_name, last_name)))}"]
+    if row.email:
+        lines.append(f"EMAIL;TYPE=INTERNET:{vcard_escape(row.email)}")
+    if row.phone_number:
+        lines.append(f"TEL;TYPE=CELL:{vcard_escape(row.phone_number)}")
+    if row.birthday:
+        lines.append(f"BDAY:{iso_date(row.birthday)}")
+    lines.append("END:VCARD")
+    return "\r\n".join(lines) + "\r\n"
+
+
+def vcard_escape(value: str | None) -> str:
+    if not value:
+        return ""
+    value = value.replace("\\", "\\\\").replace(",", "\\,").replace(";", "\\;")
+    # A bare CR would end the content line just like CRLF does.
+    return value.replace("\r\n", "\\n").replace("\r", "\\n").replace("\n", "\\n")
+
+
+def iso_date(value) -> str | None:
+    return value.strftime("%Y-%m-%d") if value is not None else None
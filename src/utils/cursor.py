@@ -0,0 +1,41 @@
+import base64
+import json
+
+from fastapi import HTTPException, status
+
+
+def encode_cursor(last_name: str | None, contact_id: int) -> str:
+    """
+        Build an opaque pagination cursor pointing just after the given contact.
+
+        A missing last name is encoded as ``""``, matching the ``coalesce`` in the keyset query.
+
+        :param last_name: The last name of the last contact on the page.
+        :type last_name: str | None
+        :param contact_id: The ID of the last contact on the page.
+        :type contact_id: int
+        :return: URL-safe cursor string.
+        :rtype: str
+    """
+    raw = json.dumps([last_name or "", contact_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[str, int]:
+    """
+        Decode a cursor produced by :func:`encode_cursor`.
+
+        :param cursor: The opaque cursor string.
+        :type cursor: str
+        :return: The ``(last_name, id)`` keyset position.
+        :rtype: tuple[str, int]
+        :raises HTTPException 400: If the cursor is malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        last_name, contact_id = json.loads(raw)
+        if not isinstance(last_name, str) or not isinstance(contact_id, int):
+            raise ValueError(cursor)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    return last_name, contact_id
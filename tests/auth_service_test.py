@@ -0,0 +1,227 @@
+from datetime import datetime
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.db.models import User
+from src.services.auth import Auth
+from src.services.refresh_tokens import RefreshTokenStore
+from src.services.token_cache import ClaimsCache
+from src.services.user_cache import CachedUser, local_users
+
+
+class TestGetCurrentUser(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        local_users.clear()
+        self.auth = Auth()
+        self.auth.claims = ClaimsCache(100)
+        self.auth.r = MagicMock()
+        self.auth.r.get = AsyncMock(return_value=None)
+        self.auth.r.set = AsyncMock()
+        self.session = MagicMock(spec=AsyncSession)
+        self.user = User(id=1, username="deadpool", email="deadpool@example.com", password="hash",
+                         avatar="img.com", confirmed=True, created_at=datetime(2023, 9, 1, 12, 0))
+        self.token = await self.auth.create_access_token(data={"sub": self.user.email})
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    async def test_cache_miss_stores_projection(self):
+        with patch("src.repository.users.get_user_by_email", AsyncMock(return_value=self.user)):
+            result = await self.auth.get_current_user(self.token, self.session)
+        self.assertEqual(result, CachedUser.from_user(self.user))
+        key, payload = self.auth.r.set.await_args.args
+        self.assertEqual(key, f"user:{self.user.email}")
+        self.assertEqual(self.auth.r.set.await_args.kwargs, {"ex": 900})
+        self.assertNotIn(b"hash", payload)
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    async def test_cache_hit_skips_database(self):
+        self.auth.r.get.return_value = CachedUser.from_user(self.user).dumps()
+        with patch("src.repository.users.get_user_by_email", AsyncMock()) as get_user:
+            result = await self.auth.get_current_user(self.token, self.session)
+        get_user.assert_not_awaited()
+        self.assertEqual(result.id, self.user.id)
+        self.assertEqual(result.created_at, self.user.created_at)
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    async def test_local_cache_skips_redis(self):
+        with patch("src.repository.users.get_user_by_email", AsyncMock(return_value=self.user)):
+            first = await self.auth.get_current_user(self.token, self.session)
+            second = await self.auth.get_current_user(self.token, self.session)
+        self.assertIs(first, second)
+        self.auth.r.get.assert_awaited_once()
+
+        local_users.invalidate(self.user.email)
+        self.auth.r.get.return_value = first.dumps()
+        await self.auth.get_current_user(self.token, self.session)
+        self.assertEqual(self.auth.r.get.await_count, 2)
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    async def test_stale_payload_is_a_miss(self):
+        self.auth.r.get.return_value = b"\x80\x04legacy-pickle"
+        with patch("src.repository.users.get_user_by_email", AsyncMock(return_value=self.user)) as get_user:
+            result = await self.auth.get_current_user(self.token, self.session)
+        get_user.assert_awaited_once()
+        self.assertEqual(result.email, self.user.email)
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    async def test_invalid_token(self):
+        with self.assertRaises(HTTPException) as context:
+            await self.auth.get_current_user("not-a-token", self.session)
+        self.assertEqual(context.exception.status_code, 401)
+
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    async def test_claims_cache_skips_verification(self):
+        self.auth.r.get.return_value = CachedUser.from_user(self.user).dumps()
+        await self.auth.get_current_user(self.token, self.session)
+        with patch.object(self.auth.keyring, "decode") as decode:
+            await self.auth.get_current_user(self.token, self.session)
+        decode.assert_not_called()
+        self.assertEqual(self.auth.claims.stats()["hits"], 1)
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    async def test_expired_claims_are_verified_again(self):
+        token = await self.auth.create_access_token(data={"sub": self.user.email}, expires_delta=-1)
+        self.auth.claims.set(token, {"sub": self.user.email, "scope": "access_token", "exp": 0})
+        with self.assertRaises(HTTPException) as context:
+            await self.auth.get_current_user(token, self.session)
+        self.assertEqual(context.exception.status_code, 401)
+        self.assertEqual(self.auth.claims.stats()["size"], 0)
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    async def test_refresh_token_is_not_cached(self):
+        self.auth.refresh_tokens = AsyncMock()
+        token = await self.auth.create_refresh_token(data={"sub": self.user.email})
+        with self.assertRaises(HTTPException):
+            await self.auth.get_current_user(token, self.session)
+        self.assertIsNone(self.auth.claims.get(token))
+
+
+class TestRefreshTokens(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.auth = Auth()
+        self.auth.refresh_tokens = MagicMock()
+        self.auth.refresh_tokens.start = AsyncMock()
+        self.auth.refresh_tokens.rotate = AsyncMock(return_value=RefreshTokenStore.ROTATED)
+        self.token = await self.auth.create_refresh_token(data={"sub": "deadpool@example.com"})
+        self.family = self.auth.refresh_tokens.start.await_args.args[0]
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    async def test_login_starts_family(self):
+        claims = await self.auth.refresh_token_claims(self.token)
+        self.assertEqual(claims["fam"], self.family["fam"])
+        self.assertEqual(claims["jti"], self.family["jti"])
+        self.assertEqual(claims["exp"], self.family["exp"])
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    async def test_rotation_keeps_family(self):
+        email, token = await self.auth.rotate_refresh_token(self.token)
+        self.assertEqual(email, "deadpool@example.com")
+        claims = await self.auth.refresh_token_claims(token)
+        self.assertEqual(claims["fam"], self.family["fam"])
+        self.assertNotEqual(claims["jti"], self.family["jti"])
+        presented, rotated = self.auth.refresh_tokens.rotate.await_args.args
+        self.assertEqual(presented["jti"], self.family["jti"])
+        self.assertEqual(rotated["jti"], claims["jti"])
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    async def test_reused_or_revoked_token_is_rejected(self):
+        for outcome in (RefreshTokenStore.REUSED, RefreshTokenStore.UNKNOWN):
+            self.auth.refresh_tokens.rotate.return_value = outcome
+            with self.assertRaises(HTTPException) as context:
+                await self.auth.rotate_refresh_token(self.token)
+            self.assertEqual(context.exception.status_code, 401)
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    async def test_token_without_family_is_rejected(self):
+        legacy_claims = {"sub": "deadpool@example.com", "scope": "refresh_token", "exp": 2 ** 31}
+        with patch.object(self.auth.keyring, "decode", return_value=legacy_claims):
+            with self.assertRaises(HTTPException):
+                await self.auth.rotate_refresh_token("legacy-token")
+        self.auth.refresh_tokens.rotate.assert_not_awaited()
+
+
+class TestRefreshTokenStore(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.r = MagicMock()
+        self.pipe = MagicMock()
+        self.pipe.execute = AsyncMock()
+        self.r.pipeline.return_value.__aenter__ = AsyncMock(return_value=self.pipe)
+        self.r.pipeline.return_value.__aexit__ = AsyncMock(return_value=False)
+        self.r.register_script.side_effect = lambda script: AsyncMock()
+        self.store = RefreshTokenStore(self.r)
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    async def test_reuse_revokes_family(self):
+        self.store._rotate.return_value = RefreshTokenStore.REUSED
+        claims = {"sub": "deadpool@example.com", "fam": "f1", "jti": "old"}
+        outcome = await self.store.rotate(claims, {**claims, "jti": "new", "exp": 2 ** 31})
+        self.assertEqual(outcome, RefreshTokenStore.REUSED)
+        self.pipe.delete.assert_called_once_with("refresh:family:f1")
+        self.pipe.srem.assert_called_once_with("refresh:user:deadpool@example.com", "f1")
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    async def test_rotation_extends_user_index(self):
+        self.store._rotate.return_value = RefreshTokenStore.ROTATED
+        claims = {"sub": "deadpool@example.com", "fam": "f1", "jti": "old"}
+        await self.store.rotate(claims, {**claims, "jti": "new", "exp": 2 ** 31})
+        self.store._extend.assert_awaited_once_with(keys=["refresh:user:deadpool@example.com"], args=[2 ** 31])
+        self.pipe.delete.assert_not_called()
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    async def test_prune_drops_expired_families(self):
+        self.r.smembers = AsyncMock(return_value={b"alive"})
+        self.pipe.execute.return_value = [1]
+        self.r.srem = AsyncMock()
+        self.assertEqual(await self.store.prune("deadpool@example.com"), 0)
+        self.r.srem.assert_not_awaited()
+
+        self.r.smembers.return_value = [b"alive", b"expired", b"revoked"]
+        self.pipe.execute.return_value = [1, 0, 0]
+        self.assertEqual(await self.store.prune("deadpool@example.com"), 2)
+        self.r.srem.assert_awaited_once_with("refresh:user:deadpool@example.com", b"expired", b"revoked")
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    async def test_login_prunes_index(self):
+        self.r.smembers = AsyncMock(return_value=set())
+        await self.store.start({"sub": "deadpool@example.com", "fam": "f2", "jti": "j", "exp": 2 ** 31})
+        self.pipe.sadd.assert_called_once_with("refresh:user:deadpool@example.com", "f2")
+        self.store._extend.assert_awaited_once_with(keys=["refresh:user:deadpool@example.com"], args=[2 ** 31],
+                                                    client=self.pipe)
+        self.r.smembers.assert_awaited_once_with("refresh:user:deadpool@example.com")
+
+
+class TestClaimsCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = ClaimsCache(2)
+        self.exp = 2 ** 40
+
+    def test_lru_eviction(self):
+        for token in ("a", "b", "c"):
+            self.cache.set(token, {"sub": token, "exp": self.exp})
+        self.assertIsNone(self.cache.get("a"))
+        self.assertEqual(self.cache.get("c")["sub"], "c")
+        self.assertEqual(self.cache.stats()["evictions"], 1)
+
+    def test_revoke_subject(self):
+        self.cache.set("a", {"sub": "deadpool@example.com", "exp": self.exp})
+        self.cache.set("b", {"sub": "ajax@example.com", "exp": self.exp})
+        self.cache.revoke_subject("deadpool@example.com")
+        self.assertIsNone(self.cache.get("a"))
+        self.assertIsNotNone(self.cache.get("b"))
+        self.assertEqual(self.cache.stats()["revocations"], 1)
+
+    def test_disabled(self):
+        cache = ClaimsCache(0)
+        cache.set("a", {"sub": "a", "exp": self.exp})
+        self.assertIsNone(cache.get("a"))
+
+
+if __name__ == '__main__':
+    unittest.main()
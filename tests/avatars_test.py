@@ -0,0 +1,116 @@
+import asyncio
+import io
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+from fastapi import HTTPException, UploadFile
+from PIL import Image
+from starlette.datastructures import Headers
+
+from src.services.avatar_storage import LocalAvatarStorage
+from src.services.avatars import AvatarService
+
+
+def upload(data: bytes, content_type: str = "image/png") -> UploadFile:
+    return UploadFile(io.BytesIO(data), filename="avatar.png", headers=Headers({"content-type": content_type}))
+
+
+def png(width: int, height: int, color: str = "red") -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), color).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class TestAvatarService(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.storage = LocalAvatarStorage(self.tmp.name, "/media/avatars")
+        self.avatars = AvatarService(self.storage, resize=True, max_bytes=1024 * 1024)
+
+    async def asyncTearDown(self):
+        self.tmp.cleanup()
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    async def test_store_resizes_to_square(self):
+        url = await self.avatars.store(upload(png(800, 600)))
+        self.assertTrue(url.startswith("/media/avatars/"))
+        self.assertTrue(url.endswith("-250.png"))
+        with Image.open(self.storage.root / url.rsplit("/", 1)[1]) as image:
+            self.assertEqual(image.size, (250, 250))
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    async def test_identical_upload_is_deduplicated(self):
+        data = png(300, 300)
+        first = await self.avatars.store(upload(data))
+        with patch.object(self.storage, "save") as save:
+            second = await self.avatars.store(upload(data))
+        save.assert_not_called()
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, await self.avatars.store(upload(png(300, 300, "blue"))))
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    async def test_store_original_without_resize(self):
+        self.avatars.resize = False
+        data = png(300, 200)
+        url = await self.avatars.store(upload(data))
+        self.assertTrue(url.endswith(".png"))
+        self.assertEqual((self.storage.root / url.rsplit("/", 1)[1]).read_bytes(), data)
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    async def test_original_takes_format_from_content(self):
+        self.avatars.resize = False
+        buffer = io.BytesIO()
+        Image.new("RGB", (40, 40), "green").save(buffer, format="JPEG")
+        with patch.object(self.storage, "save", wraps=self.storage.save) as save:
+            url = await self.avatars.store(upload(buffer.getvalue(), "image/svg+xml"))
+        self.assertTrue(url.endswith(".jpg"))
+        self.assertEqual(save.call_args.args[2], "image/jpeg")
+        svg = b'<svg xmlns="http://www.w3.org/2000/svg"><script>alert(1)</script></svg>'
+        with self.assertRaises(HTTPException) as context:
+            await self.avatars.store(upload(svg, "image/svg+xml"))
+        self.assertEqual(context.exception.status_code, 415)
+        self.assertEqual(list(self.storage.root.iterdir()), [self.storage.root / url.rsplit("/", 1)[1]])
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    async def test_rejects_large_and_non_image_uploads(self):
+        self.avatars.max_bytes = 100
+        with self.assertRaises(HTTPException) as context:
+            await self.avatars.store(upload(png(300, 300)))
+        self.assertEqual(context.exception.status_code, 413)
+        with self.assertRaises(HTTPException) as context:
+            await self.avatars.store(upload(b"hello", "text/plain"))
+        self.assertEqual(context.exception.status_code, 415)
+        self.avatars.max_bytes = 1024
+        with self.assertRaises(HTTPException) as context:
+            await self.avatars.store(upload(b"not really a png"))
+        self.assertEqual(context.exception.status_code, 415)
+
+
+class SlowReader(io.BytesIO):
+    """Hands out small chunks with a pause, so concurrent writers overlap."""
+
+    def read(self, size=-1):
+        time.sleep(0.001)
+        return super().read(256)
+
+
+class TestLocalAvatarStorage(unittest.IsolatedAsyncioTestCase):
+
+    async def test_identical_concurrent_saves(self):
+        with tempfile.TemporaryDirectory() as root:
+            storage = LocalAvatarStorage(root, "/media/avatars")
+            data = png(100, 100, "purple") * 8
+            urls = await asyncio.gather(*(storage.save("same-250.png", SlowReader(data), "image/png") for _ in range(4)))
+            self.assertEqual(set(urls), {"/media/avatars/same-250.png"})
+            path = storage.root / "same-250.png"
+            self.assertEqual(path.read_bytes(), data)
+            self.assertEqual(path.stat().st_mode & 0o777, 0o644)
+            self.assertEqual(os.listdir(root), ["same-250.png"])
+
+
+if __name__ == '__main__':
+    unittest.main()
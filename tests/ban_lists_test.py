@@ -0,0 +1,81 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+
+from src.middlewares.ban_lists import VERSION_KEY, BanLists
+
+
+def redis_with_pipeline(results: list) -> MagicMock:
+    r = MagicMock()
+    pipe = MagicMock()
+    pipe.execute = AsyncMock(return_value=results)
+    r.pipeline.return_value.__aenter__ = AsyncMock(return_value=pipe)
+    r.pipeline.return_value.__aexit__ = AsyncMock(return_value=False)
+    return r
+
+
+class TestBanLists(unittest.IsolatedAsyncioTestCase):
+
+    async def test_refresh_swaps_in_compiled_snapshot(self):
+        r = redis_with_pipeline(["3", {"203.0.113.0/24"}, {"198.51.100.7"}, {"Python-urllib"}])
+        r.get = AsyncMock(return_value="3")
+        ban_lists = BanLists(r, poll_interval=1)
+        before = ban_lists.current
+        self.assertFalse(before.ip_filter.is_banned("198.51.100.7"))
+
+        self.assertTrue(await ban_lists.refresh())
+        snapshot = ban_lists.current
+        self.assertIsNot(snapshot, before)
+        self.assertEqual(snapshot.version, 3)
+        self.assertTrue(snapshot.ip_filter.is_banned("198.51.100.7"))
+        self.assertTrue(snapshot.ip_filter.is_allowed("203.0.113.9"))
+        self.assertTrue(snapshot.ip_filter.is_allowed("127.0.0.1"))
+        self.assertTrue(snapshot.user_agents.is_banned("Python-urllib/3.11"))
+        self.assertEqual(ban_lists.stats()["reloads"], 1)
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    async def test_refresh_skips_unchanged_version(self):
+        r = redis_with_pipeline(["3", set(), set(), set()])
+        r.get = AsyncMock(return_value="3")
+        ban_lists = BanLists(r, poll_interval=1)
+        await ban_lists.refresh()
+        snapshot = ban_lists.current
+
+        self.assertFalse(await ban_lists.refresh())
+        self.assertIs(ban_lists.current, snapshot)
+        r.get.assert_awaited_with(VERSION_KEY)
+        self.assertEqual(r.pipeline.call_count, 1)
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    async def test_add_bumps_version(self):
+        r = redis_with_pipeline([1, 7])
+        ban_lists = BanLists(r, poll_interval=1)
+        self.assertEqual(await ban_lists.add("deny", "198.51.100.0/24"), 7)
+        pipe = await r.pipeline.return_value.__aenter__()
+        pipe.sadd.assert_called_once_with("ban-lists:deny", "198.51.100.0/24")
+        pipe.incr.assert_called_once_with(VERSION_KEY)
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    async def test_add_rejects_invalid_entries(self):
+        ban_lists = BanLists(MagicMock(), poll_interval=1)
+        with self.assertRaises(ValueError):
+            await ban_lists.add("deny", "not-an-ip")
+        with self.assertRaises(ValueError):
+            await ban_lists.add("user-agent", "(unclosed")
+        with self.assertRaises(ValueError):
+            await ban_lists.add("everyone", "10.0.0.1")
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    async def test_watch_survives_unreadable_feed_file(self):
+        ban_lists = BanLists(MagicMock(), poll_interval=0)
+        ban_lists.refresh = AsyncMock(side_effect=[FileNotFoundError("deny.txt"), RuntimeError("boom"), True,
+                                                   asyncio.CancelledError()])
+        with self.assertLogs("src.middlewares.ban_lists", level="WARNING"):
+            with self.assertRaises(asyncio.CancelledError):
+                await ban_lists.watch()
+        self.assertEqual(ban_lists.refresh.await_count, 4)
+        self.assertEqual(ban_lists.stats()["failures"], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from src.db.models import User
+from src.services.birthdays import STORE_SCRIPT, BirthdayDigest
+
+
+class FakeRedis:
+    """In-process stand-in for the Redis commands of the digest, with the store script in Python."""
+
+    def __init__(self):
+        self.values = {}
+        self.hashes = {}
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def hget(self, key, field):
+        return self.hashes.get(key, {}).get(field)
+
+    async def eval(self, script, numkeys, generation_key, key, generation, field, value, expire_at):
+        assert script == STORE_SCRIPT and numkeys == 2
+        if self.values.get(generation_key, b"0") != generation:
+            return 0
+        self.hashes.setdefault(key, {})[field] = value
+        return 1
+
+    def pipeline(self, transaction=True):
+        pipe = MagicMock()
+        pipe.incr.side_effect = lambda key: self.values.__setitem__(key, b"%d" % (int(self.values.get(key, 0)) + 1))
+        pipe.delete.side_effect = lambda key: self.hashes.pop(key, None)
+        pipe.execute = AsyncMock()
+        context = MagicMock()
+        context.__aenter__ = AsyncMock(return_value=pipe)
+        context.__aexit__ = AsyncMock(return_value=False)
+        return context
+
+
+class TestBirthdayDigest(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.digest = BirthdayDigest()
+        self.digest.r = FakeRedis()
+        self.user = User(id=1, username="deadpool", email="deadpool@example.com")
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    async def test_get_caches_digest(self):
+        with patch("src.repository.contacts.upcoming_birthdays", AsyncMock(return_value=[])) as query:
+            self.assertEqual(await self.digest.get(MagicMock(), self.user), [])
+            self.assertEqual(await self.digest.get(MagicMock(), self.user), [])
+        query.assert_awaited_once()
+
+        await self.digest.invalidate(self.user.id)
+        with patch("src.repository.contacts.upcoming_birthdays", AsyncMock(return_value=[])) as query:
+            await self.digest.get(MagicMock(), self.user)
+        query.assert_awaited_once()
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    async def test_build_racing_invalidate_is_not_stored(self):
+        async def contacts_changed_meanwhile(db, user, days):
+            await self.digest.invalidate(user.id)
+            return []
+
+        with patch("src.repository.contacts.upcoming_birthdays", contacts_changed_meanwhile):
+            await self.digest.build(MagicMock(), self.user)
+        with patch("src.repository.contacts.upcoming_birthdays", AsyncMock(return_value=[])) as query:
+            await self.digest.get(MagicMock(), self.user)
+        query.assert_awaited_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
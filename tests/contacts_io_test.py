@@ -0,0 +1,110 @@
+import io
+import unittest
+from datetime import date, datetime
+from types import SimpleNamespace
+
+from src.utils.contacts_io import detect_format, export_header, export_rows, parse_contacts, take
+
+CSV_HEADER = "first_name,last_name,email,phone_number,birthday\r\n"
+
+
+class TestParseContacts(unittest.TestCase):
+
+    def test_detect_format(self):
+        self.assertEqual(detect_format("contacts.CSV", None), "csv")
+        self.assertEqual(detect_format("upload", "text/csv"), "csv")
+        self.assertEqual(detect_format("contacts.jsonl", None), "ndjson")
+        self.assertEqual(detect_format(None, "application/x-ndjson"), "ndjson")
+        self.assertIsNone(detect_format("contacts.xlsx", "application/octet-stream"))
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    def test_csv_rows_are_validated_one_by_one(self):
+        data = ("\ufeff" + CSV_HEADER
+                + "Pavlo,Pupkin,pavlo@example.com,+380661111111,1990-01-05\r\n"
+                + "Ivan,Bad,not-an-email,+380662222222,1990-13-01\r\n"
+                + '"Smith, Jr.",O\'Neil,smith@example.com,+380663333333,1985-12-31\r\n').encode()
+        rows = list(parse_contacts(io.BytesIO(data), "csv"))
+        self.assertEqual([row for row, _, _ in rows], [2, 3, 4])
+        _, first, error = rows[0]
+        self.assertIsNone(error)
+        self.assertEqual((first.first_name, first.birthday), ("Pavlo", date(1990, 1, 5)))
+        _, contact, error = rows[1]
+        self.assertIsNone(contact)
+        self.assertIn("email:", error)
+        self.assertIn("birthday:", error)
+        self.assertEqual(rows[2][1].first_name, "Smith, Jr.")
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    def test_ndjson_skips_blank_lines_and_reports_malformed_ones(self):
+        data = (b'{"first_name": "Pavlo", "last_name": "Pupkin", "email": "pavlo@example.com", '
+                b'"phone_number": "+380661111111", "birthday": "1990-01-05"}\n'
+                b'\n'
+                b'{"first_name": "Ivan", "last_name": \n'
+                b'{"first_name": "Petro"}\n')
+        rows = list(parse_contacts(io.BytesIO(data), "ndjson"))
+        self.assertEqual([row for row, _, _ in rows], [1, 3, 4])
+        self.assertEqual(rows[0][1].phone_number, "+380661111111")
+        self.assertIsNone(rows[1][1])
+        self.assertIn("Invalid JSON", rows[1][2])
+        self.assertIn("last_name: Field required", rows[2][2])
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    def test_bad_encoding_surfaces_while_reading(self):
+        rows = parse_contacts(io.BytesIO(CSV_HEADER.encode() + b"P\xe4vlo,Pupkin,p@example.com,1,1990-01-05\r\n"), "csv")
+        with self.assertRaises(UnicodeDecodeError):
+            list(rows)
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    def test_take_chunks_an_iterator(self):
+        rows = iter(range(5))
+        self.assertEqual([take(rows, 2), take(rows, 2), take(rows, 2), take(rows, 2)], [[0, 1], [2, 3], [4], []])
+
+
+
+EXPORT_ROWS = [
+    SimpleNamespace(id=1, first_name="Pavlo", last_name="Pupkin", email="pavlo@example.com",
+                    phone_number="+380661111111", birthday=datetime(1990, 1, 5)),
+    SimpleNamespace(id=2, first_name='Smith, "Jr."', last_name="O'Neil;\r\nSr\\", email=None,
+                    phone_number="+380662222222", birthday=None),
+    SimpleNamespace(id=3, first_name="Олена", last_name=None, email="olena@example.com", phone_number=None,
+                    birthday=date(2001, 12, 31)),
+]
+
+
+class TestExportContacts(unittest.TestCase):
+
+    def export(self, fmt: str) -> str:
+        return export_header(fmt) + export_rows(EXPORT_ROWS[:1], fmt) + export_rows(EXPORT_ROWS[1:], fmt)
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    def test_csv_quotes_and_crlf(self):
+        self.assertEqual(self.export("csv"),
+                         'id,first_name,last_name,email,phone_number,birthday\r\n'
+                         '1,Pavlo,Pupkin,pavlo@example.com,+380661111111,1990-01-05\r\n'
+                         '2,"Smith, ""Jr.""","O\'Neil;\r\nSr\\",,+380662222222,\r\n'
+                         '3,Олена,,olena@example.com,,2001-12-31\r\n')
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    def test_ndjson_dates_and_nulls(self):
+        self.assertEqual(self.export("ndjson"),
+                         '{"id": 1, "first_name": "Pavlo", "last_name": "Pupkin", "email": "pavlo@example.com", '
+                         '"phone_number": "+380661111111", "birthday": "1990-01-05"}\n'
+                         '{"id": 2, "first_name": "Smith, \\"Jr.\\"", "last_name": "O\'Neil;\\r\\nSr\\\\", '
+                         '"email": null, "phone_number": "+380662222222", "birthday": null}\n'
+                         '{"id": 3, "first_name": "Олена", "last_name": null, "email": "olena@example.com", '
+                         '"phone_number": null, "birthday": "2001-12-31"}\n')
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    def test_vcard_escapes_values_and_ends_lines_with_crlf(self):
+        self.assertEqual(self.export("vcard"),
+                         'BEGIN:VCARD\r\nVERSION:3.0\r\nN:Pupkin;Pavlo;;;\r\nFN:Pavlo Pupkin\r\n'
+                         'EMAIL;TYPE=INTERNET:pavlo@example.com\r\nTEL;TYPE=CELL:+380661111111\r\n'
+                         'BDAY:1990-01-05\r\nEND:VCARD\r\n'
+                         'BEGIN:VCARD\r\nVERSION:3.0\r\nN:O\'Neil\\;\\nSr\\\\;Smith\\, "Jr.";;;\r\n'
+                         'FN:Smith\\, "Jr." O\'Neil\\;\\nSr\\\\\r\nTEL;TYPE=CELL:+380662222222\r\nEND:VCARD\r\n'
+                         'BEGIN:VCARD\r\nVERSION:3.0\r\nN:;Олена;;;\r\nFN:Олена\r\n'
+                         'EMAIL;TYPE=INTERNET:olena@example.com\r\nBDAY:2001-12-31\r\nEND:VCARD\r\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,17 +1,23 @@
 from datetime import date
 import unittest
-from unittest.mock import MagicMock
-from sqlalchemy.orm import Session
+from unittest.mock import MagicMock, patch
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from fastapi import HTTPException
 
-from src.db.models import Contact, User
-from src.schemas import ContactRequest
+from src.db.models import Base, Contact, User
+from src.schemas import ContactRequest, ContactPatch
+from src.utils.cursor import encode_cursor
 from src.repository.contacts import (
     create_contact,
+    create_contacts_bulk,
     get_contact,
     get_contacts,
     update_contact,
     delete_contact,
+    update_contacts_bulk,
+    delete_contacts_bulk,
     search_contacts,
     upcoming_birthdays
 )
@@ -20,7 +26,8 @@ from src.repository.contacts import (
 class TestContacts(unittest.IsolatedAsyncioTestCase):
 
     def setUp(self):
-        self.session = MagicMock(spec=Session)
+        self.session = MagicMock(spec=AsyncSession)
+        self.session.execute.return_value = MagicMock()
         self.current_user = User(id=1)
 
     def tearDown(self):
@@ -30,7 +37,7 @@ class TestContacts(unittest.IsolatedAsyncioTestCase):
     async def test_create_contact(self):
         body = ContactRequest(first_name='Pavlo', last_name='Pupkin', email='example@gmail.com',
                               phone_number='+380662222222', birthday=date(2023, 9, 4))
-        self.session.query.return_value.filter.return_value.first.return_value = None
+        self.session.execute.return_value.scalars.return_value.first.return_value = None
         result = await create_contact(contact=body, db=self.session, current_user=self.current_user)
         self.assertEqual(result.first_name, body.first_name)
         self.assertEqual(result.last_name, body.last_name)
@@ -39,7 +46,7 @@ class TestContacts(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(result.birthday, body.birthday)
         self.assertTrue(hasattr(result, "id"))
 
-        self.session.query.return_value.filter.return_value.first.return_value = Contact(phone_number=body.phone_number)
+        self.session.execute.return_value.scalars.return_value.first.return_value = Contact(phone_number=body.phone_number)
         with self.assertRaises(HTTPException) as context:
             await create_contact(contact=body, db=self.session, current_user=self.current_user)
         self.assertEqual(context.exception.status_code, 400)
@@ -49,11 +56,11 @@ class TestContacts(unittest.IsolatedAsyncioTestCase):
     async def test_get_contact(self):
         contact_id = 1
         contact = Contact(id=contact_id, user_id=self.current_user.id)
-        self.session.query.return_value.filter.return_value.first.return_value = contact
+        self.session.execute.return_value.scalars.return_value.first.return_value = contact
         result = await get_contact(contact_id=contact_id, db=self.session, current_user=self.current_user)
         self.assertEqual(result, contact)
 
-        self.session.query.return_value.filter.return_value.first.return_value = None
+        self.session.execute.return_value.scalars.return_value.first.return_value = None
         with self.assertRaises(HTTPException) as context:
             await get_contact(contact_id=contact_id, db=self.session, current_user=self.current_user)
         self.assertEqual(context.exception.status_code, 404)
@@ -65,19 +72,35 @@ class TestContacts(unittest.IsolatedAsyncioTestCase):
                                            phone_number='2', birthday=date(2001, 9, 12))
         body_2 = ContactRequest(first_name='John', last_name='White', email='examfdfple@gmail.com',
                                            phone_number='1', birthday=date(1970, 1, 5))
+        self.session.execute.return_value.scalars.return_value.first.return_value = None
         await create_contact(contact=body_1, db=self.session, current_user=self.current_user)
         await create_contact(contact=body_2, db=self.session, current_user=self.current_user)
 
+        self.session.execute.return_value.scalars.return_value.all.return_value = [
+            Contact(**body_1.model_dump(), user_id=self.current_user.id)]
         result = await get_contacts(0, 2, db=self.session, current_user=self.current_user)
         self.assertEqual(len(result), 1)
 
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    async def test_get_contacts_cursor(self):
+        contacts = [Contact(id=i, user_id=self.current_user.id, last_name="Black") for i in range(3, 5)]
+        self.session.execute.return_value.scalars.return_value.all.return_value = contacts
+        result = await get_contacts(0, 2, db=self.session, current_user=self.current_user,
+                                    cursor=encode_cursor("Black", 2))
+        self.assertEqual(result, contacts)
+
+        with self.assertRaises(HTTPException) as context:
+            await get_contacts(0, 2, db=self.session, current_user=self.current_user, cursor="not-a-cursor")
+        self.assertEqual(context.exception.status_code, 400)
+        self.assertEqual(context.exception.detail, "Invalid cursor")
+
     # -----------------------------------------------------------------------------------------------------------------------------------
     async def test_update_contact(self):
         contact_id = 1
         contact = Contact(id=contact_id, user_id=self.current_user.id)
         updated_contact_data = ContactRequest(first_name='Updated', last_name='Contact', email='updated@example.com',
                                               phone_number='+380222222222', birthday=date(2023, 9, 4))
-        self.session.query.return_value.filter.return_value.first.return_value = contact
+        self.session.execute.return_value.scalars.return_value.first.return_value = contact
         result = await update_contact(contact_id=contact_id, updated_contact=updated_contact_data, db=self.session,
                                       current_user=self.current_user)
         self.assertEqual(result.first_name, updated_contact_data.first_name)
@@ -86,7 +109,7 @@ class TestContacts(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(result.phone_number, updated_contact_data.phone_number)
         self.assertEqual(result.birthday, updated_contact_data.birthday)
 
-        self.session.query.return_value.filter.return_value.first.return_value = None
+        self.session.execute.return_value.scalars.return_value.first.return_value = None
         with self.assertRaises(HTTPException) as context:
             await update_contact(contact_id=contact_id, updated_contact=updated_contact_data, db=self.session,
                                  current_user=self.current_user)
@@ -97,31 +120,182 @@ class TestContacts(unittest.IsolatedAsyncioTestCase):
     async def test_delete_contact(self):
         contact_id = 1
         contact = Contact(id=contact_id, user_id=self.current_user.id)
-        self.session.query.return_value.filter.return_value.first.return_value = contact
+        self.session.execute.return_value.scalars.return_value.first.return_value = contact
         result = await delete_contact(contact_id=contact_id, db=self.session, current_user=self.current_user)
         self.assertEqual(result, contact)
 
-        self.session.query.return_value.filter.return_value.first.return_value = None
+        self.session.execute.return_value.scalars.return_value.first.return_value = None
         with self.assertRaises(HTTPException) as context:
             await delete_contact(contact_id=contact_id, db=self.session, current_user=self.current_user)
         self.assertEqual(context.exception.status_code, 404)
         self.assertEqual(context.exception.detail, "Contact not found")
 
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    async def test_update_contacts_bulk(self):
+        contacts = [Contact(id=1, user_id=self.current_user.id, first_name='Updated')]
+        self.session.execute.return_value.scalars.return_value.all.return_value = contacts
+        patches = [ContactPatch(id=1, first_name='Updated', birthday=date(1990, 3, 1)), ContactPatch(id=2)]
+        result = await update_contacts_bulk(patches, db=self.session, current_user=self.current_user)
+        self.assertEqual(result, contacts)
+        update_rows = self.session.execute.await_args_list[0].args[1]
+        self.assertEqual(update_rows, [{'id': 1, 'first_name': 'Updated', 'birthday': date(1990, 3, 1),
+                                        'birthday_doy': 61}])
+        self.session.commit.assert_awaited_once()
+
+        self.session.execute.side_effect = IntegrityError("UPDATE", {}, Exception())
+        with self.assertRaises(HTTPException) as context:
+            await update_contacts_bulk(patches, db=self.session, current_user=self.current_user)
+        self.assertEqual(context.exception.status_code, 409)
+        self.session.rollback.assert_awaited_once()
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    async def test_delete_contacts_bulk(self):
+        contacts = [Contact(id=i, user_id=self.current_user.id) for i in (1, 3)]
+        self.session.execute.return_value.scalars.return_value.all.return_value = contacts
+        result = await delete_contacts_bulk([1, 3, 99], db=self.session, current_user=self.current_user)
+        self.assertEqual(result, contacts)
+        self.session.execute.assert_awaited_once()
+        self.session.commit.assert_awaited_once()
+
     # -----------------------------------------------------------------------------------------------------------------------------------
     async def test_search_contacts(self):
         query = "John"
         contacts = [Contact(id=i, user_id=self.current_user.id, first_name=f"John {i}") for i in range(1, 6)]
-        self.session.query.return_value.filter.return_value.offset.return_value.limit.return_value.all.return_value = contacts
+        self.session.execute.return_value.scalars.return_value.all.return_value = contacts
         result = await search_contacts(q=query, skip=0, limit=5, db=self.session, current_user=self.current_user)
         self.assertEqual(result, contacts)
 
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    async def test_search_contacts_ranked_on_postgres(self):
+        self.session.get_bind.return_value.dialect.name = "postgresql"
+        self.session.execute.return_value.scalars.return_value.all.return_value = []
+        await search_contacts(q="John", skip=0, limit=5, db=self.session, current_user=self.current_user)
+        stmt = self.session.execute.call_args.args[0]
+        self.assertIn("similarity", str(stmt))
+
     # -----------------------------------------------------------------------------------------------------------------------------------
     async def test_upcoming_birthdays(self):
         upcoming_birthdays_contacts = [Contact(id=i, user_id=self.current_user.id) for i in range(1, 6)]
-        self.session.query.return_value.filter.return_value.params.return_value.all.return_value = upcoming_birthdays_contacts
+        self.session.execute.return_value.scalars.return_value.all.return_value = upcoming_birthdays_contacts
         result = await upcoming_birthdays(db=self.session, current_user=self.current_user)
         self.assertEqual(result, upcoming_birthdays_contacts)
 
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    async def test_upcoming_birthdays_year_wrap(self):
+        self.session.execute.return_value.scalars.return_value.all.return_value = []
+        with patch("src.repository.contacts.date", wraps=date) as mock_date:
+            mock_date.today.return_value = date(2023, 12, 29)
+            await upcoming_birthdays(db=self.session, current_user=self.current_user, days=7)
+        stmt = self.session.execute.call_args.args[0]
+        params = stmt.compile().params
+        self.assertIn(" OR ", str(stmt))
+        self.assertIn(364, params.values())
+        self.assertIn(5, params.values())
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    def test_birthday_doy_synced(self):
+        contact = Contact(birthday=date(1990, 3, 1))
+        self.assertEqual(contact.birthday_doy, 61)
+        contact.birthday = date(1985, 2, 28)
+        self.assertEqual(contact.birthday_doy, 59)
+
+
+
+class SQLiteTestCase(unittest.IsolatedAsyncioTestCase):
+    """Runs against an in-memory SQLite database holding one user, for statements a mock cannot check."""
+
+    async def asyncSetUp(self):
+        self.engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        self.session = async_sessionmaker(self.engine, expire_on_commit=False)()
+        self.current_user = User(id=1, email="deadpool@example.com", password="hash")
+        self.session.add(self.current_user)
+        await self.session.commit()
+
+    async def asyncTearDown(self):
+        await self.session.close()
+        await self.engine.dispose()
+
+
+class TestContactsKeyset(SQLiteTestCase):
+
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        for contact_id, last_name in enumerate(["D", "C", None, "B", "A"], 1):
+            self.session.add(Contact(id=contact_id, last_name=last_name, phone_number=str(contact_id), user_id=1))
+        await self.session.commit()
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    async def test_cursor_pages_cover_every_contact(self):
+        seen, cursor = [], ""
+        while True:
+            page = await get_contacts(0, 2, db=self.session, current_user=self.current_user, cursor=cursor)
+            seen += [contact.id for contact in page]
+            if len(page) < 2:
+                break
+            cursor = encode_cursor(page[-1].last_name, page[-1].id)
+        self.assertEqual(seen, [3, 5, 4, 2, 1])
+
+
+class TestContactsBulk(SQLiteTestCase):
+
+    async def seed_owned_and_foreign(self):
+        self.session.add_all([
+            Contact(id=1, first_name='Mine', last_name='One', phone_number='+380661111111', user_id=1),
+            Contact(id=2, first_name='Mine', last_name='Two', phone_number='+380662222222', user_id=1),
+            Contact(id=3, first_name='Theirs', last_name='Three', phone_number='+380663333333', user_id=2),
+        ])
+        await self.session.commit()
+
+    async def stored(self) -> list[tuple]:
+        result = await self.session.execute(select(Contact.id, Contact.first_name, Contact.phone_number,
+                                                   Contact.birthday_doy, Contact.user_id).order_by(Contact.id))
+        return [tuple(row) for row in result.all()]
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    async def test_update_contacts_bulk_leaves_foreign_rows_alone(self):
+        await self.seed_owned_and_foreign()
+        patches = [ContactPatch(id=1, first_name='Updated', birthday=date(1990, 3, 1)),
+                   ContactPatch(id=3, first_name='Hijacked', phone_number='+380660000000'),
+                   ContactPatch(id=99, first_name='Ghost'), ContactPatch(id=2)]
+        result = await update_contacts_bulk(patches, db=self.session, current_user=self.current_user)
+        self.assertEqual([(contact.id, contact.first_name) for contact in result], [(1, 'Updated'), (2, 'Mine')])
+        self.assertEqual(await self.stored(), [(1, 'Updated', '+380661111111', 61, 1),
+                                               (2, 'Mine', '+380662222222', None, 1),
+                                               (3, 'Theirs', '+380663333333', None, 2)])
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    async def test_update_contacts_bulk_conflict_rolls_back(self):
+        await self.seed_owned_and_foreign()
+        before = await self.stored()
+        patches = [ContactPatch(id=1, first_name='Updated'), ContactPatch(id=2, phone_number='+380663333333')]
+        with self.assertRaises(HTTPException) as context:
+            await update_contacts_bulk(patches, db=self.session, current_user=self.current_user)
+        self.assertEqual(context.exception.status_code, 409)
+        self.assertEqual(await self.stored(), before)
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    async def test_delete_contacts_bulk_returns_only_owned_ids(self):
+        await self.seed_owned_and_foreign()
+        result = await delete_contacts_bulk([1, 3, 99, 1], db=self.session, current_user=self.current_user)
+        self.assertEqual([contact.id for contact in result], [1])
+        self.assertEqual([row[0] for row in await self.stored()], [2, 3])
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    async def test_create_contacts_bulk(self):
+        self.session.add(Contact(first_name='Stored', phone_number='+380663333333', user_id=2))
+        await self.session.commit()
+        bodies = [ContactRequest(first_name=f'Name{i}', last_name='Bulk', email=f'bulk{i}@gmail.com',
+                                 phone_number=phone, birthday=date(1990, 1, 1 + i))
+                  for i, phone in enumerate(['+380661111111', '+380662222222', '+380661111111', '+380663333333'])]
+        inserted, duplicates = await create_contacts_bulk(bodies, db=self.session, current_user=self.current_user)
+        self.assertEqual(inserted, 2)
+        self.assertEqual([d.phone_number for d in duplicates], ['+380661111111', '+380663333333'])
+        result = await self.session.execute(select(Contact.phone_number, Contact.birthday_doy)
+                                            .where(Contact.user_id == 1).order_by(Contact.phone_number))
+        self.assertEqual(result.all(), [('+380661111111', 1), ('+380662222222', 2)])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,66 @@
+import asyncio
+import email
+import unittest
+
+from fake_smtp import FakeSMTPServer, confirm_job, smtp_config
+from src.services.email_queue import EmailJob, EmailQueue
+
+
+class TestEmailQueue(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.server = FakeSMTPServer()
+        await self.server.start()
+        self.queue = EmailQueue(smtp_config(self.server.port), maxsize=100, batch_size=10, max_attempts=2,
+                                retry_backoff=0.01, idle_timeout=30, dead_letter_size=10)
+        await self.queue.start()
+
+    async def asyncTearDown(self):
+        await self.queue.stop(timeout=1)
+        await self.server.stop()
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    async def test_batch_reuses_one_connection(self):
+        for i in range(25):
+            self.queue.enqueue(confirm_job(f"user{i}@example.com"))
+        await asyncio.wait_for(self.queue.queue.join(), 5)
+        self.assertEqual(len(self.server.messages), 25)
+        self.assertEqual(self.server.connections, 1)
+        self.assertEqual(self.queue.metrics.batches, 3)
+        self.assertIn(b"deadpool", email.message_from_bytes(self.server.messages[0]).get_payload(decode=True))
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    async def test_temporary_failure_is_retried(self):
+        self.server.fail_next = 1
+        self.queue.enqueue(confirm_job("deadpool@example.com"))
+        for _ in range(100):
+            if self.server.messages:
+                break
+            await asyncio.sleep(0.01)
+        self.assertEqual(len(self.server.messages), 1)
+        self.assertEqual(self.queue.metrics.retried, 1)
+        self.assertEqual(self.server.connections, 2)
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    async def test_dead_letter_after_max_attempts(self):
+        self.server.fail_next = 2
+        self.queue.enqueue(confirm_job("deadpool@example.com"))
+        for _ in range(100):
+            if self.queue.dead_letters:
+                break
+            await asyncio.sleep(0.01)
+        job = self.queue.dead_letters[0]
+        self.assertEqual(job.attempts, 2)
+        self.assertIn("451", job.last_error)
+        self.assertEqual(self.server.messages, [])
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    async def test_missing_template_is_dead_lettered(self):
+        self.queue.enqueue(EmailJob(recipient="deadpool@example.com", subject="?", template_name="missing.html"))
+        await asyncio.wait_for(self.queue.queue.join(), 5)
+        self.assertEqual(self.queue.metrics.dead, 1)
+        self.assertEqual(self.queue.dead_letters[0].attempts, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
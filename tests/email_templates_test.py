@@ -0,0 +1,24 @@
+import unittest
+
+from src.services.email_templates import compile_templates, render
+
+
+class TestEmailTemplates(unittest.TestCase):
+
+    def test_compile_templates(self):
+        self.assertEqual(compile_templates(), 2)
+
+    def test_render(self):
+        html = render("reset_password/password_reset_email.html", host="http://localhost/", username="deadpool",
+                      token="abc")
+        self.assertIn("Hi, deadpool,", html)
+        self.assertIn('href="http://localhost/api/auth/reset-password/abc"', html)
+
+    def test_render_escapes_user_input(self):
+        html = render("registration/confirm.html", host="http://localhost/", username="<script>", token="abc")
+        self.assertIn("&lt;script&gt;", html)
+        self.assertNotIn("<script>", html)
+
+
+if __name__ == '__main__':
+    unittest.main()
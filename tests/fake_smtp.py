@@ -0,0 +1,74 @@
+import asyncio
+
+from fastapi_mail import ConnectionConfig
+
+from src.services.email_queue import EmailJob
+
+
+class FakeSMTPServer:
+    """
+    Minimal in-process SMTP server that accepts every message, for tests and benchmarks.
+
+    Attributes:
+        messages (list[bytes]): The DATA payloads received so far.
+        connections (int): Number of client connections accepted.
+        fail_next (int): Number of upcoming transactions to reject with a temporary 451 error.
+    """
+
+    def __init__(self):
+        self.messages: list[bytes] = []
+        self.connections = 0
+        self.fail_next = 0
+        self.server: asyncio.base_events.Server | None = None
+
+    @property
+    def port(self) -> int:
+        return self.server.sockets[0].getsockname()[1]
+
+    async def start(self) -> None:
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+
+    async def stop(self) -> None:
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        writer.write(b"220 fake ESMTP\r\n")
+        try:
+            while line := await reader.readline():
+                command = line[:4].upper()
+                if command == b"EHLO":
+                    writer.write(b"250-fake\r\n250 8BITMIME\r\n")
+                elif command == b"DATA":
+                    writer.write(b"354 go ahead\r\n")
+                    await writer.drain()
+                    data = bytearray()
+                    while (chunk := await reader.readline()) != b".\r\n":
+                        data += chunk
+                    if self.fail_next:
+                        self.fail_next -= 1
+                        writer.write(b"451 try again later\r\n")
+                    else:
+                        self.messages.append(bytes(data))
+                        writer.write(b"250 queued\r\n")
+                elif command == b"QUIT":
+                    writer.write(b"221 bye\r\n")
+                    await writer.drain()
+                    break
+                else:
+                    writer.write(b"250 ok\r\n")
+                await writer.drain()
+        finally:
+            writer.close()
+
+
+def smtp_config(port: int) -> ConnectionConfig:
+    return ConnectionConfig(MAIL_USERNAME="", MAIL_PASSWORD="", MAIL_FROM="noreply@example.com", MAIL_PORT=port,
+                            MAIL_SERVER="127.0.0.1", MAIL_STARTTLS=False, MAIL_SSL_TLS=False, USE_CREDENTIALS=False,
+                            VALIDATE_CERTS=False)
+
+
+def confirm_job(recipient: str) -> EmailJob:
+    return EmailJob(recipient=recipient, subject="Confirm your email ", template_name="registration/confirm.html",
+                    template_body={"host": "http://localhost/", "username": "deadpool", "token": "token"})
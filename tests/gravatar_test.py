@@ -0,0 +1,35 @@
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.db.models import User
+from src.services.gravatar import avatar_url, backfill_avatars
+
+
+class TestGravatar(unittest.IsolatedAsyncioTestCase):
+
+    def test_avatar_url_is_memoized(self):
+        first = avatar_url(" Deadpool@Example.com")
+        self.assertEqual(first, "https://www.gravatar.com/avatar/79497276207495cf61382900b08055c9")
+        with patch("src.services.gravatar.Gravatar") as gravatar:
+            self.assertEqual(avatar_url(" Deadpool@Example.com"), first)
+        gravatar.assert_not_called()
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    async def test_backfill_avatars(self):
+        session = MagicMock(spec=AsyncSession)
+        batches = [[User(id=1, email="a@example.com"), User(id=2, email="b@example.com")],
+                   [User(id=3, email="c@example.com")], []]
+        with patch("src.repository.users.get_users_without_avatar", AsyncMock(side_effect=batches)) as get_users, \
+                patch("src.repository.users.update_avatars_bulk", AsyncMock()) as update_bulk, \
+                patch("src.services.gravatar.invalidate_users", AsyncMock()) as invalidate:
+            updated = await backfill_avatars(session, batch_size=2)
+        self.assertEqual(updated, 3)
+        self.assertEqual([call.args[1] for call in get_users.await_args_list], [0, 2, 3])
+        self.assertEqual(set(update_bulk.await_args_list[0].args[0]), {1, 2})
+        invalidate.assert_any_await(["c@example.com"])
+
+
+if __name__ == '__main__':
+    unittest.main()
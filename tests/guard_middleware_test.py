@@ -0,0 +1,84 @@
+import json
+import unittest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+from src.middlewares.ban_lists import BanSnapshot
+from src.middlewares.ip_ranges import IPFilter, IPRangeSet
+from src.middlewares.middlewares import GuardMiddleware
+from src.middlewares.user_agents import UserAgentMatcher
+
+
+def http_scope(path: str = "/api/contacts", host: str | None = "10.0.0.1", user_agent: bytes | None = b"Mozilla/5.0"):
+    headers = [(b"host", b"testserver")]
+    if user_agent is not None:
+        headers.append((b"user-agent", user_agent))
+    return {"type": "http", "method": "GET", "path": path, "headers": headers,
+            "client": (host, 51000) if host else None}
+
+
+class TestGuardMiddleware(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        snapshot = BanSnapshot(1, IPFilter(IPRangeSet(["10.0.0.0/8"]), IPRangeSet(["10.6.6.0/24"])),
+                               UserAgentMatcher([r"Python-urllib"], cache_size=100))
+        self.app = AsyncMock()
+        self.guard = GuardMiddleware(self.app, paths={"/docs": [], "/api/metrics": ["deny_ip"]},
+                                     lists=SimpleNamespace(current=snapshot))
+
+    async def call(self, scope) -> list[dict]:
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        await self.guard(scope, AsyncMock(), send)
+        return sent
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    async def test_allowed_request_reaches_app(self):
+        scope = http_scope()
+        self.assertEqual(await self.call(scope), [])
+        self.app.assert_awaited_once()
+        self.assertIs(self.app.await_args.args[0], scope)
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    async def test_rejections(self):
+        cases = [(http_scope(host="10.6.6.6"), "You are banned"),
+                 (http_scope(host="8.8.8.8"), "Not allowed IP address"),
+                 (http_scope(host=None), "Not allowed IP address"),
+                 (http_scope(user_agent=b"Python-urllib/3.11"), "You are banned")]
+        for scope, detail in cases:
+            with self.subTest(detail=detail, client=scope["client"]):
+                start, body = await self.call(scope)
+                self.assertEqual(start["status"], 403)
+                self.assertEqual(json.loads(body["body"]), {"detail": detail})
+        self.app.assert_not_awaited()
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    async def test_missing_user_agent_passes(self):
+        self.assertEqual(await self.call(http_scope(user_agent=None)), [])
+        self.app.assert_awaited_once()
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    async def test_checks_per_path(self):
+        self.assertEqual(self.guard.checks("/api/metrics/db-pool"), frozenset({"deny_ip"}))
+        self.assertEqual(self.guard.checks("/docs"), frozenset())
+        self.assertEqual(await self.call(http_scope("/docs", host="8.8.8.8")), [])
+        self.assertEqual(await self.call(http_scope("/api/metrics/db-pool", host="8.8.8.8")), [])
+        start, _ = await self.call(http_scope("/api/metrics/db-pool", host="10.6.6.6"))
+        self.assertEqual(start["status"], 403)
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    async def test_rejected_websocket_is_closed(self):
+        scope = dict(http_scope(host="8.8.8.8"), type="websocket")
+        self.assertEqual(await self.call(scope), [{"type": "websocket.close", "code": 1008}])
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    def test_unknown_check(self):
+        with self.assertRaises(ValueError):
+            GuardMiddleware(self.app, paths={"/": ["rate_limit"]})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import asyncio
+import threading
+import unittest
+
+from fastapi import HTTPException
+
+from src.services.hashing import PasswordHasher, password_context
+
+
+class TestPasswordHasher(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.hasher = PasswordHasher(workers=1, queue_limit=1)
+        self.release = threading.Event()
+
+    async def asyncTearDown(self):
+        self.release.set()
+        await self.hasher.shutdown()
+
+    def blocking(self, value):
+        self.release.wait(5)
+        return value
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    async def test_run_records_latency(self):
+        result = await self.hasher.run(str.upper, "secret")
+        self.assertEqual(result, "SECRET")
+        stats = self.hasher.stats()
+        self.assertEqual(stats["completed"], 1)
+        self.assertEqual(stats["in_flight"], 0)
+        self.assertGreaterEqual(stats["hash_seconds_max"], 0)
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    async def test_overflow_is_rejected(self):
+        running = asyncio.ensure_future(self.hasher.run(self.blocking, 1))
+        queued = asyncio.ensure_future(self.hasher.run(self.blocking, 2))
+        await asyncio.sleep(0)
+        self.assertEqual(self.hasher.queue_depth(), 1)
+
+        with self.assertRaises(HTTPException) as context:
+            await self.hasher.run(self.blocking, 3)
+        self.assertEqual(context.exception.status_code, 503)
+        self.assertEqual(self.hasher.stats()["rejected"], 1)
+
+        self.release.set()
+        self.assertEqual(await asyncio.gather(running, queued), [1, 2])
+        self.assertEqual(self.hasher.stats()["completed"], 2)
+
+
+class TestPasswordContext(unittest.TestCase):
+
+    def test_cost_change_needs_update(self):
+        old = password_context(bcrypt_rounds=4).hash("secret")
+        context = password_context(bcrypt_rounds=5)
+        verified, new_hash = context.verify_and_update("secret", old)
+        self.assertTrue(verified)
+        self.assertTrue(new_hash.startswith("$2b$05$"))
+        self.assertEqual(context.verify_and_update("secret", new_hash), (True, None))
+
+    def test_wrong_password_is_not_rehashed(self):
+        old = password_context(bcrypt_rounds=4).hash("secret")
+        self.assertEqual(password_context(bcrypt_rounds=5).verify_and_update("wrong", old), (False, None))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import os
+import tempfile
+import unittest
+
+from src.middlewares.ip_ranges import IPFilter, IPRangeSet, parse_host
+
+
+class TestIPRangeSet(unittest.TestCase):
+
+    def test_parse_host(self):
+        self.assertEqual(parse_host("10.0.0.1"), (4, 0x0A000001))
+        self.assertEqual(parse_host("::ffff:10.0.0.1"), (4, 0x0A000001))
+        self.assertEqual(parse_host("fe80::1%eth0"), (6, 0xFE80 << 112 | 1))
+        self.assertIsNone(parse_host("testclient"))
+        self.assertIsNone(parse_host(None))
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    def test_contains_cidr_blocks(self):
+        ranges = IPRangeSet(["10.0.0.0/8", "192.168.1.7", "2001:db8::/32"])
+        self.assertIn("10.255.255.255", ranges)
+        self.assertIn("192.168.1.7", ranges)
+        self.assertIn("2001:db8::1", ranges)
+        self.assertNotIn("11.0.0.0", ranges)
+        self.assertNotIn("192.168.1.8", ranges)
+        self.assertNotIn("2001:db9::1", ranges)
+        self.assertNotIn("testclient", ranges)
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    def test_overlapping_and_adjacent_ranges_are_merged(self):
+        ranges = IPRangeSet(["10.0.0.0/24", "10.0.1.0/24", "10.0.0.128/25", "10.0.3.0/24"])
+        self.assertEqual(ranges.rules, 4)
+        self.assertEqual(len(ranges), 2)
+        self.assertIn("10.0.1.255", ranges)
+        self.assertNotIn("10.0.2.0", ranges)
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    def test_from_file(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as feed:
+            feed.write("# spam sources\n203.0.113.0/24\n\n198.51.100.9  # one host\n")
+        self.addCleanup(os.unlink, feed.name)
+        ranges = IPRangeSet.from_file(feed.name, ["127.0.0.1"])
+        self.assertEqual(ranges.rules, 3)
+        self.assertIn("203.0.113.200", ranges)
+        self.assertIn("198.51.100.9", ranges)
+        self.assertIn("127.0.0.1", ranges)
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    def test_from_file_reports_invalid_line(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as feed:
+            feed.write("203.0.113.0/24\nnot-an-ip\n")
+        self.addCleanup(os.unlink, feed.name)
+        with self.assertRaisesRegex(ValueError, r":2: "):
+            IPRangeSet.from_file(feed.name)
+
+
+class TestIPFilter(unittest.TestCase):
+
+    def test_allow_and_deny(self):
+        ip_filter = IPFilter.load(allow=["10.0.0.0/8"], deny=["10.6.6.0/24"], allow_file=None, deny_file=None)
+        self.assertTrue(ip_filter.is_allowed("10.1.2.3"))
+        self.assertFalse(ip_filter.is_allowed("8.8.8.8"))
+        self.assertTrue(ip_filter.is_banned("10.6.6.6"))
+        self.assertFalse(ip_filter.is_banned("10.1.2.3"))
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    def test_empty_allow_list_admits_everyone(self):
+        ip_filter = IPFilter.load(allow=[], deny=[], allow_file=None, deny_file=None)
+        self.assertTrue(ip_filter.is_allowed("8.8.8.8"))
+        self.assertTrue(ip_filter.is_allowed("testclient"))
+        self.assertFalse(ip_filter.is_banned("8.8.8.8"))
+
+
+if __name__ == '__main__':
+    unittest.main()
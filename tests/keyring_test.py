@@ -0,0 +1,71 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+from jose import JWTError, jwt
+
+from src.services.keyring import Keyring
+
+
+def write_private_key(directory: Path, kid: str, key) -> None:
+    pem = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                            serialization.NoEncryption())
+    (directory / f"{kid}.pem").write_bytes(pem)
+
+
+class TestKeyring(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.keys_dir = Path(cls.tmp.name)
+        write_private_key(cls.keys_dir, "2023-09", rsa.generate_private_key(public_exponent=65537, key_size=2048))
+        write_private_key(cls.keys_dir, "2023-10", ec.generate_private_key(ec.SECP256R1()))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def setUp(self):
+        self.claims = {"sub": "deadpool@example.com", "scope": "access_token"}
+
+    def test_sign_with_kid(self):
+        keyring = Keyring.load(str(self.keys_dir), "2023-09", secret=None)
+        token = keyring.encode(self.claims)
+        self.assertEqual(jwt.get_unverified_header(token), {"alg": "RS256", "typ": "JWT", "kid": "2023-09"})
+        self.assertEqual(keyring.decode(token), self.claims)
+
+    def test_rotation_keeps_old_tokens_valid(self):
+        old_token = Keyring.load(str(self.keys_dir), "2023-09", secret=None).encode(self.claims)
+        keyring = Keyring.load(str(self.keys_dir), "2023-10", secret=None)
+        self.assertEqual(jwt.get_unverified_header(keyring.encode(self.claims))["alg"], "ES256")
+        self.assertEqual(keyring.decode(old_token), self.claims)
+
+    def test_legacy_hmac_tokens(self):
+        legacy = Keyring.load(None, None, secret="secret", algorithm="HS256")
+        token = legacy.encode(self.claims)
+        self.assertNotIn("kid", jwt.get_unverified_header(token))
+        self.assertEqual(Keyring.load(str(self.keys_dir), "2023-10", secret="secret").decode(token), self.claims)
+        with self.assertRaises(JWTError):
+            Keyring.load(str(self.keys_dir), "2023-10", secret=None).decode(token)
+
+    def test_unknown_kid_is_rejected(self):
+        token = jwt.encode(self.claims, "secret", algorithm="HS256", headers={"kid": "2023-09"})
+        with self.assertRaises(JWTError):
+            Keyring.load(str(self.keys_dir), "2023-09", secret=None).decode(token)
+
+    def test_jwks_publishes_public_keys_only(self):
+        jwks = Keyring.load(str(self.keys_dir), "2023-10", secret="secret").jwks()
+        self.assertEqual({key["kid"] for key in jwks["keys"]}, {"2023-09", "2023-10"})
+        for key in jwks["keys"]:
+            self.assertNotIn("d", key)
+
+    def test_missing_active_key(self):
+        with self.assertRaises(ValueError):
+            Keyring.load(str(self.keys_dir), "2024-01", secret=None)
+
+
+if __name__ == '__main__':
+    unittest.main()
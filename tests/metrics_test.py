@@ -0,0 +1,41 @@
+import unittest
+from unittest.mock import patch
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.conf.config import settings
+from src.routes import metrics
+
+
+class TestMetricsAuth(unittest.TestCase):
+
+    def setUp(self):
+        app = FastAPI()
+        app.include_router(metrics.router, prefix="/api")
+        self.client = TestClient(app)
+
+    def test_disabled_without_token(self):
+        with patch.object(settings, "metrics_token", None):
+            response = self.client.get("/api/metrics/ban-lists", headers={"Authorization": "Bearer anything"})
+        self.assertEqual(response.status_code, 404)
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    def test_rejects_missing_or_wrong_token(self):
+        with patch.object(settings, "metrics_token", "s3cret"):
+            missing = self.client.get("/api/metrics/ban-lists")
+            wrong = self.client.get("/api/metrics/ban-lists", headers={"Authorization": "Bearer guess"})
+        self.assertEqual(missing.status_code, 401)
+        self.assertEqual(wrong.status_code, 401)
+        self.assertEqual(wrong.headers["WWW-Authenticate"], "Bearer")
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    def test_admits_configured_token(self):
+        with patch.object(settings, "metrics_token", "s3cret"):
+            response = self.client.get("/api/metrics/ban-lists", headers={"Authorization": "Bearer s3cret"})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("version", response.json())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import redis.asyncio as redis
+from fastapi import HTTPException
+
+from src.services.rate_limit import RateLimitEngine
+from src.services.user_cache import CachedUser
+
+
+class SharedBuckets:
+    """In-process stand-in for the Redis side of the settle script, without refill."""
+
+    def __init__(self):
+        self.tokens = {}
+        self.calls = 0
+
+    async def settle(self, entries):
+        self.calls += 1
+        balances = []
+        for key, capacity, _, consumed in entries:
+            self.tokens[key] = max(-capacity, self.tokens.get(key, capacity) - consumed)
+            balances.append(self.tokens[key])
+        return balances
+
+
+def engine(shared: SharedBuckets, sync_batch: int = 5, maxsize: int = 100) -> RateLimitEngine:
+    limiter = RateLimitEngine(MagicMock(), limits={"default": {"create_contact": 5, "*": 10}, "pro": {"*": 100}},
+                              tiers={"pro@example.com": "pro"}, window=60, sync_interval=1, sync_batch=sync_batch,
+                              maxsize=maxsize)
+    limiter._settle_remote = shared.settle
+    return limiter
+
+
+class TestRateLimitEngine(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.user = CachedUser(id=1, username="deadpool", email="deadpool@example.com", avatar=None, confirmed=True,
+                               created_at=None)
+        # Freeze refill so the tests only see the requests they make.
+        clock = patch("src.services.rate_limit.time.monotonic", return_value=1000.0)
+        clock.start()
+        self.addCleanup(clock.stop)
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    def test_limits_by_tier_and_route(self):
+        limiter = engine(SharedBuckets())
+        self.assertEqual(limiter.limit("create_contact", "default"), 5)
+        self.assertEqual(limiter.limit("read_contacts", "default"), 10)
+        self.assertEqual(limiter.limit("create_contact", "pro"), 100)
+        self.assertEqual(limiter.limit("create_contact", "unknown"), 5)
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    async def test_rejects_over_limit_locally(self):
+        shared = SharedBuckets()
+        limiter = engine(shared)
+        for _ in range(5):
+            await limiter.hit("create_contact", self.user)
+        with self.assertRaises(HTTPException) as error:
+            await limiter.hit("create_contact", self.user)
+        self.assertEqual(error.exception.status_code, 429)
+        self.assertEqual(error.exception.headers, {"Retry-After": "12"})
+        self.assertEqual(shared.calls, 1)
+        self.assertEqual(limiter.stats()["pending"], 5)
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    async def test_workers_share_the_limit_after_settling(self):
+        shared = SharedBuckets()
+        first, second = engine(shared), engine(shared)
+        for _ in range(3):
+            await first.hit("create_contact", self.user)
+        await first.flush()
+        await second.hit("create_contact", self.user)
+        await second.hit("create_contact", self.user)
+        with self.assertRaises(HTTPException):
+            await second.hit("create_contact", self.user)
+        await second.flush()
+        self.assertEqual(shared.tokens["rate-limit:create_contact:1"], 0)
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    async def test_batch_wakes_settlement(self):
+        limiter = engine(SharedBuckets(), sync_batch=2)
+        limiter._wake = MagicMock()
+        await limiter.hit("read_contacts", self.user)
+        limiter._wake.set.assert_not_called()
+        await limiter.hit("read_contacts", self.user)
+        limiter._wake.set.assert_called_once()
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    async def test_redis_failure_keeps_pending_requests(self):
+        shared = SharedBuckets()
+        limiter = engine(shared)
+        await limiter.hit("read_contacts", self.user)
+        limiter._settle_remote = AsyncMock(side_effect=redis.ConnectionError("down"))
+        await limiter.hit("read_contacts", self.user)
+        await limiter.flush()
+        self.assertEqual(limiter.stats()["pending"], 2)
+        self.assertEqual(limiter.metrics.sync_failures, 1)
+        limiter._settle_remote = shared.settle
+        await limiter.flush()
+        self.assertEqual(limiter.stats()["pending"], 0)
+        self.assertEqual(shared.tokens["rate-limit:read_contacts:1"], 8)
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    async def test_evicted_buckets_are_still_settled(self):
+        shared = SharedBuckets()
+        limiter = engine(shared, maxsize=1)
+        await limiter.hit("read_contacts", self.user)
+        await limiter.hit("search_contacts", self.user)
+        self.assertEqual(limiter.stats()["buckets"], 1)
+        await limiter.flush()
+        self.assertEqual(shared.tokens["rate-limit:read_contacts:1"], 9)
+        self.assertEqual(shared.tokens["rate-limit:search_contacts:1"], 9)
+
+
+if __name__ == '__main__':
+    unittest.main()
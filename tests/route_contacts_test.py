@@ -0,0 +1,183 @@
+import unittest
+from datetime import datetime
+from unittest.mock import AsyncMock, patch
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from src.conf.config import settings
+from src.db.db_connect import get_db
+from src.db.models import Base, Contact, User
+from src.repository import contacts as repository_contacts
+from src.routes import contacts
+from src.services.auth import auth_service
+from src.services.birthdays import birthday_digest
+from src.services.rate_limit import rate_limiter
+
+CSV_HEADER = b"first_name,last_name,email,phone_number,birthday\r\n"
+
+
+def csv_row(i: int) -> bytes:
+    return f"Name{i},Import,import{i}@example.com,+38066{i:07d},1990-01-{1 + i % 28:02d}\r\n".encode()
+
+
+class ContactsRouteTestCase(unittest.IsolatedAsyncioTestCase):
+    """Calls the contacts routes over ASGI against an in-memory SQLite database, without Redis."""
+
+    async def asyncSetUp(self):
+        self.engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        self.session = async_sessionmaker(self.engine, expire_on_commit=False)()
+        self.current_user = User(id=1, email="deadpool@example.com", password="hash")
+        self.session.add(self.current_user)
+        await self.session.commit()
+
+        app = FastAPI()
+        app.include_router(contacts.router, prefix="/api")
+        app.dependency_overrides[get_db] = lambda: self.session
+        app.dependency_overrides[auth_service.get_current_user] = lambda: self.current_user
+        for target, name in ((rate_limiter, "hit"), (birthday_digest, "invalidate")):
+            patcher = patch.object(target, name, AsyncMock())
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.client = httpx.AsyncClient(app=app, base_url="http://test")
+
+    async def asyncTearDown(self):
+        await self.client.aclose()
+        await self.session.close()
+        await self.engine.dispose()
+
+    async def stored_phones(self) -> list[str]:
+        result = await self.session.execute(select(Contact.phone_number).where(Contact.user_id == 1).order_by(Contact.id))
+        return list(result.scalars().all())
+
+
+class TestImportContacts(ContactsRouteTestCase):
+
+    async def upload(self, data: bytes, filename: str = "contacts.csv") -> httpx.Response:
+        return await self.client.post("/api/contacts/import", files={"file": (filename, data)})
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    async def test_import_reports_invalid_and_duplicate_rows(self):
+        data = (CSV_HEADER + csv_row(1) + b"Bad,Row,not-an-email,+380669999999,1990-01-01\r\n" + csv_row(2)
+                + csv_row(1) + b"Short,Row\r\n")
+        response = await self.upload(data)
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual((body["imported"], body["duplicates"], body["invalid"]), (2, 1, 2))
+        self.assertEqual([error["row"] for error in body["errors"]], [3, 6])
+        self.assertIn("email", body["errors"][0]["detail"])
+        self.assertEqual(await self.stored_phones(), ["+380660000001", "+380660000002"])
+        birthday_digest.invalidate.assert_awaited_once_with(1)
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    async def test_import_ndjson_in_chunks(self):
+        data = b"".join(b'{"first_name": "Name%d", "last_name": "Import", "email": "n%d@example.com", '
+                        b'"phone_number": "+3806600%d", "birthday": "1990-01-01"}\n' % (i, i, i) for i in range(5))
+        with patch.object(settings, "contacts_import_chunk_size", 2), \
+                patch.object(repository_contacts, "create_contacts_bulk",
+                             wraps=repository_contacts.create_contacts_bulk) as bulk:
+            response = await self.upload(data, "contacts.ndjson")
+        self.assertEqual(response.json(), {"imported": 5, "duplicates": 0, "invalid": 0, "errors": []})
+        self.assertEqual([len(call.args[0]) for call in bulk.await_args_list], [2, 2, 1])
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    async def test_bad_encoding_before_anything_is_imported(self):
+        response = await self.upload(CSV_HEADER + b"P\xe4vlo,Pupkin,p@example.com,+380661111111,1990-01-05\r\n")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(await self.stored_phones(), [])
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    async def test_bad_encoding_after_committed_chunks(self):
+        # Larger than the decoder's read-ahead, so the first chunks are stored before the bad bytes are read.
+        rows = 300
+        data = CSV_HEADER + b"".join(csv_row(i) for i in range(rows)) + b"\xff\xfe,broken\r\n" * 10
+        with patch.object(settings, "contacts_import_chunk_size", 50):
+            response = await self.upload(data)
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        imported = body["imported"]
+        self.assertTrue(0 < imported < rows)
+        self.assertEqual(imported % 50, 0)
+        self.assertEqual(len(await self.stored_phones()), imported)
+        self.assertEqual(body["errors"], [{"row": imported + 2, "detail": "File must be UTF-8 encoded; this and the "
+                                                                          "following rows were not imported"}])
+        birthday_digest.invalidate.assert_awaited_once_with(1)
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    async def test_unknown_format(self):
+        response = await self.upload(b"<xml/>", "contacts.xml")
+        self.assertEqual(response.status_code, 415)
+
+
+class TestExportContacts(ContactsRouteTestCase):
+
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        self.session.add_all([
+            Contact(id=1, first_name="Pavlo", last_name="Pupkin", email="pavlo@example.com",
+                    phone_number="+380661111111", birthday=datetime(1990, 1, 5), user_id=1),
+            Contact(id=2, first_name="Someone", last_name="Else", email="else@example.com",
+                    phone_number="+380669999999", birthday=datetime(1980, 6, 1), user_id=2),
+            Contact(id=3, first_name="Smith, Jr.", last_name="Олена", email="olena@example.com",
+                    phone_number="+380663333333", birthday=None, user_id=1),
+            Contact(id=4, first_name="Ivan", last_name="Last", email="ivan@example.com",
+                    phone_number="+380664444444", birthday=datetime(2001, 12, 31), user_id=1),
+        ])
+        await self.session.commit()
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    async def test_stream_contacts_in_batches(self):
+        batches = [[row.id for row in rows]
+                   async for rows in repository_contacts.stream_contacts(self.session, self.current_user, batch_size=2)]
+        self.assertEqual(batches, [[1, 3], [4]])
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    async def test_export_csv(self):
+        response = await self.client.get("/api/contacts/export", params={"format": "csv"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["content-type"], "text/csv; charset=utf-8")
+        self.assertEqual(response.headers["content-disposition"], 'attachment; filename="contacts.csv"')
+        self.assertEqual(response.content,
+                         'id,first_name,last_name,email,phone_number,birthday\r\n'
+                         '1,Pavlo,Pupkin,pavlo@example.com,+380661111111,1990-01-05\r\n'
+                         '3,"Smith, Jr.",Олена,olena@example.com,+380663333333,\r\n'
+                         '4,Ivan,Last,ivan@example.com,+380664444444,2001-12-31\r\n'.encode())
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    async def test_export_ndjson(self):
+        response = await self.client.get("/api/contacts/export", params={"format": "ndjson"})
+        self.assertEqual(response.headers["content-disposition"], 'attachment; filename="contacts.ndjson"')
+        self.assertEqual(response.content,
+                         '{"id": 1, "first_name": "Pavlo", "last_name": "Pupkin", "email": "pavlo@example.com", '
+                         '"phone_number": "+380661111111", "birthday": "1990-01-05"}\n'
+                         '{"id": 3, "first_name": "Smith, Jr.", "last_name": "Олена", "email": "olena@example.com", '
+                         '"phone_number": "+380663333333", "birthday": null}\n'
+                         '{"id": 4, "first_name": "Ivan", "last_name": "Last", "email": "ivan@example.com", '
+                         '"phone_number": "+380664444444", "birthday": "2001-12-31"}\n'.encode())
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    async def test_export_vcard(self):
+        response = await self.client.get("/api/contacts/export", params={"format": "vcard"})
+        self.assertEqual(response.headers["content-disposition"], 'attachment; filename="contacts.vcf"')
+        self.assertEqual(response.content,
+                         'BEGIN:VCARD\r\nVERSION:3.0\r\nN:Pupkin;Pavlo;;;\r\nFN:Pavlo Pupkin\r\n'
+                         'EMAIL;TYPE=INTERNET:pavlo@example.com\r\nTEL;TYPE=CELL:+380661111111\r\n'
+                         'BDAY:1990-01-05\r\nEND:VCARD\r\n'
+                         'BEGIN:VCARD\r\nVERSION:3.0\r\nN:Олена;Smith\\, Jr.;;;\r\nFN:Smith\\, Jr. Олена\r\n'
+                         'EMAIL;TYPE=INTERNET:olena@example.com\r\nTEL;TYPE=CELL:+380663333333\r\nEND:VCARD\r\n'
+                         'BEGIN:VCARD\r\nVERSION:3.0\r\nN:Last;Ivan;;;\r\nFN:Ivan Last\r\n'
+                         'EMAIL;TYPE=INTERNET:ivan@example.com\r\nTEL;TYPE=CELL:+380664444444\r\n'
+                         'BDAY:2001-12-31\r\nEND:VCARD\r\n'.encode())
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    async def test_export_rejects_unknown_format(self):
+        response = await self.client.get("/api/contacts/export", params={"format": "xlsx"})
+        self.assertEqual(response.status_code, 422)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+
+from src.middlewares.user_agents import NUMBERED_REFERENCE, UserAgentMatcher, scoped
+
+
+class TestUserAgentMatcher(unittest.TestCase):
+
+    def test_scoped_keeps_leading_flags(self):
+        self.assertEqual(scoped("curl"), "(?:curl)")
+        self.assertEqual(scoped("(?i)python-urllib"), "(?i:python-urllib)")
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    def test_matches_any_pattern(self):
+        matcher = UserAgentMatcher([r"Gecko", r"(?i)python-urllib", r"^curl/\d"], cache_size=100)
+        self.assertTrue(matcher.is_banned("Mozilla/5.0 (X11; Linux x86_64) Gecko/20100101 Firefox/118.0"))
+        self.assertTrue(matcher.is_banned("Python-urllib/3.11"))
+        self.assertTrue(matcher.is_banned("curl/8.4.0"))
+        self.assertFalse(matcher.is_banned("libcurl/8.4.0"))
+        self.assertFalse(matcher.is_banned("gecko"))
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    def test_missing_header(self):
+        self.assertFalse(UserAgentMatcher([r"Gecko"], cache_size=100).is_banned(None))
+        self.assertTrue(UserAgentMatcher([r"^$"], cache_size=100).is_banned(None))
+        self.assertFalse(UserAgentMatcher([], cache_size=100).is_banned(None))
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    def test_verdicts_are_memoized(self):
+        matcher = UserAgentMatcher([r"Gecko"], cache_size=1)
+        matcher.is_banned("Gecko/1")
+        matcher.is_banned("Gecko/1")
+        matcher.is_banned("x" * 1000)
+        stats = matcher.stats()
+        self.assertEqual((stats["cache_hits"], stats["cache_misses"], stats["cache_size"]), (1, 1, 1))
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    def test_patterns_that_cannot_be_combined(self):
+        matcher = UserAgentMatcher([r"(?P<bot>Googlebot)", r"(?P<bot>Bingbot)"], cache_size=100)
+        self.assertTrue(matcher.is_banned("Mozilla/5.0 (compatible; Bingbot/2.0)"))
+        self.assertFalse(matcher.is_banned("Mozilla/5.0"))
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    def test_backreferences_keep_their_groups(self):
+        self.assertTrue(NUMBERED_REFERENCE.search(r"(a)\1"))
+        self.assertTrue(NUMBERED_REFERENCE.search(r"(<)?bot(?(1)>)"))
+        self.assertFalse(NUMBERED_REFERENCE.search(r"C:\\1"))
+        matcher = UserAgentMatcher([r"(x)y", r"(\w+)/\1"], cache_size=100)
+        self.assertTrue(matcher.is_banned("bot/bot"))
+        self.assertFalse(matcher.is_banned("bot/x"))
+        self.assertTrue(matcher.is_banned("xy"))
+
+
+if __name__ == '__main__':
+    unittest.main()
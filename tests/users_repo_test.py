@@ -1,13 +1,14 @@
 import unittest
-from unittest.mock import MagicMock
-from sqlalchemy.orm import Session
+from unittest.mock import MagicMock, AsyncMock, patch
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.db.models import User
 from src.repository.users import (
     get_user_by_email,
     create_user,
     update_token,
-    confirmed_email, set_new_password, update_avatar
+    confirmed_email, set_new_password, update_avatar,
+    get_users_without_avatar, update_avatars_bulk
 )
 from src.schemas import UserModel
 
@@ -15,13 +16,20 @@ from src.schemas import UserModel
 class TestUsers(unittest.IsolatedAsyncioTestCase):
 
     def setUp(self):
-        self.session = MagicMock(spec=Session)
+        self.session = MagicMock(spec=AsyncSession)
+        self.session.execute.return_value = MagicMock()
+        patcher = patch("src.repository.users.invalidate_user", AsyncMock())
+        self.invalidate_user = patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = patch("src.repository.users.refresh_tokens.revoke_user", AsyncMock())
+        self.revoke_user = patcher.start()
+        self.addCleanup(patcher.stop)
 
     # -----------------------------------------------------------------------------------------------------------------------------------
     async def test_get_user_by_email(self):
         email = "test@example.com"
         expected_user = User(email=email)
-        self.session.query.return_value.filter.return_value.first.return_value = expected_user
+        self.session.execute.return_value.scalars.return_value.first.return_value = expected_user
         result = await get_user_by_email(email=email, db=self.session)
         self.assertEqual(result, expected_user)
 
@@ -36,7 +44,16 @@ class TestUsers(unittest.IsolatedAsyncioTestCase):
         created_user = await create_user(body=user_data, db=self.session)
         self.assertEqual(created_user.username, expected_user.username)
         self.assertEqual(created_user.email, expected_user.email)
-        self.session.commit.assert_called_once()
+        self.assertEqual(created_user.avatar, "https://www.gravatar.com/avatar/55502f40dc8b7c769880b10874abc9d0")
+        self.session.commit.assert_awaited_once()
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    async def test_create_user_without_gravatar(self):
+        user_data = UserModel(username='Pavlo', email="test@example.com", password='123456789')
+        with patch("src.services.gravatar.gravatar_image", side_effect=ValueError("boom")):
+            created_user = await create_user(body=user_data, db=self.session)
+        self.assertIsNone(created_user.avatar)
+        self.session.commit.assert_awaited_once()
 
     # -----------------------------------------------------------------------------------------------------------------------------------
     async def test_update_token(self):
@@ -44,16 +61,16 @@ class TestUsers(unittest.IsolatedAsyncioTestCase):
         token = "new_token"
         await update_token(user=user, token=token, db=self.session)
         self.assertEqual(user.refresh_token, token)
-        self.session.commit.assert_called_once()
+        self.session.commit.assert_awaited_once()
 
     # -----------------------------------------------------------------------------------------------------------------------------------
     async def test_confirmed_email(self):
         email = "test@example.com"
         user = User(email=email)
-        self.session.query.return_value.filter.return_value.first.return_value = user
+        self.session.execute.return_value.scalars.return_value.first.return_value = user
         await confirmed_email(email=email, db=self.session)
         self.assertTrue(user.confirmed)
-        self.session.commit.assert_called_once()
+        self.session.commit.assert_awaited_once()
 
     # -----------------------------------------------------------------------------------------------------------------------------------
     async def test_update_avatar(self):
@@ -61,7 +78,8 @@ class TestUsers(unittest.IsolatedAsyncioTestCase):
         url = "img.com"
         upd_user = await update_avatar(user.email, url, db=self.session)
         self.assertEqual(upd_user.avatar, url)
-        self.session.commit.assert_called_once()
+        self.session.commit.assert_awaited_once()
+        self.invalidate_user.assert_awaited_once_with(user.email)
 
     # -----------------------------------------------------------------------------------------------------------------------------------
     async def test_set_new_password(self):
@@ -69,7 +87,32 @@ class TestUsers(unittest.IsolatedAsyncioTestCase):
         password = "new_password"
         upd_user = await set_new_password(user.email, password, db=self.session)
         self.assertEqual(upd_user.password, password)
-        self.session.commit.assert_called_once()
+        self.session.commit.assert_awaited_once()
+        self.revoke_user.assert_awaited_once_with(user.email)
+
+        await set_new_password(user.email, "rehashed", db=self.session, revoke_tokens=False)
+        self.revoke_user.assert_awaited_once()
+
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    async def test_get_users_without_avatar(self):
+        users = [User(id=5), User(id=7)]
+        self.session.execute.return_value.scalars.return_value.all.return_value = users
+        result = await get_users_without_avatar(self.session, after_id=4, limit=2)
+        self.assertEqual(result, users)
+        stmt = self.session.execute.await_args.args[0]
+        self.assertIn("users.avatar IS NULL", str(stmt))
+
+    # -----------------------------------------------------------------------------------------------------------------------------------
+    async def test_update_avatars_bulk(self):
+        await update_avatars_bulk({5: "a.png", 7: "b.png"}, db=self.session)
+        rows = self.session.execute.await_args.args[1]
+        self.assertEqual(rows, [{"id": 5, "avatar": "a.png"}, {"id": 7, "avatar": "b.png"}])
+        self.session.commit.assert_awaited_once()
+
+        self.session.reset_mock()
+        await update_avatars_bulk({}, db=self.session)
+        self.session.execute.assert_not_awaited()
 
 
 if __name__ == "__main__":